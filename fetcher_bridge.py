@@ -17,8 +17,10 @@ import json
 import time
 import logging
 import argparse
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
-from typing import Dict, List, Set
+from typing import Dict, List, Set, Tuple
 from pathlib import Path
 
 # Add riot_fetcher to path
@@ -26,11 +28,19 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'riot_fetcher'))
 
 from riotkit.config import load_settings
 from riotkit.client import RiotClient
+from riotkit.adaptive import ConcurrencyController, through_circuit
 from riotkit.endpoints import (
     account_by_riot_id, summoner_by_puuid, match_ids_by_puuid, 
     match_by_id, match_timeline
 )
 from riotkit.fetcher import parse_riot_id
+from riotkit.storage import CODECS, RecordStore
+from riotkit.writer import FSYNC_POLICIES, BackgroundWriter, atomic_write
+from riotkit.projection import COLD_CODEC, MATCH, TIMELINE
+from riotkit.models import Match
+from riotkit.store import MatchStore
+from riotkit.aggregate import AGGREGATED, StatsAggregator
+from riotkit.corpus import load_corpus
 
 # Configure logging
 logging.basicConfig(
@@ -40,42 +50,98 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class KRAnalysis:
-    def __init__(self, player_riot_id: str, match_depth: int = 10, platform: str = "kr", region: str = "asia"):
+    def __init__(self, player_riot_id: str, match_depth: int = 10, platform: str = "kr", region: str = "asia", workers: int = 8, timeline_format: str = "gzip", db_path: str = "analysis_data/matches.sqlite", incremental: bool = False, compact: bool = False, keep_raw: bool = False, fsync: str = "none", keep_match_rows: bool = True):
         """Initialize the analysis."""
         self.player_riot_id = player_riot_id
         self.match_depth = match_depth
         self.platform = platform
         self.region = region
+        self.workers = max(1, workers)
+        self.incremental = incremental
+        self.compact = compact
         self.settings = load_settings()
         self.client = RiotClient(
             self.settings.api_key, 
             platform_region=platform, 
-            regional_routing=region
+            regional_routing=region,
+            pool_size=max(10, self.workers),
+            # Up to one request in flight per worker, cut back on 429 / 5xx / latency spikes.
+            # Calls go through through_circuit(): while the breaker is open they wait instead of failing.
+            controller=ConcurrencyController(initial=min(4, self.workers), max_limit=self.workers)
         )
         
         # Data storage
         self.downloaded_matches: Set[str] = set()
         self.analyzed_players: Set[str] = set()
-        self.match_data: List[Dict] = []
-        self.timeline_data: List[Dict] = []
+        # Without per-match rows the aggregator's memory stays constant however long the crawl
+        self.aggregator = StatsAggregator(keep_match_rows)
+        self.downloaded_timelines: Set[str] = set()
+        self.known_timelines: Set[str] = set()
+        self.player_checks: Dict[str, int] = {}
+        # puuid -> (listing time, listed match IDs), committed by save_manifest once those matches are saved
+        self.pending_checks: Dict[str, Tuple[int, List[str]]] = {}
         
         # Create single output directory
         self.output_dir = Path("analysis_data")
         self.output_dir.mkdir(exist_ok=True)
-        (self.output_dir / "matches").mkdir(exist_ok=True)
-        (self.output_dir / "timelines").mkdir(exist_ok=True)
         (self.output_dir / "analysis").mkdir(exist_ok=True)
+        # Records are encoded and written on a background thread, so workers go straight back to the network
+        self.writer = BackgroundWriter(max_pending=2 * self.workers, fsync=fsync)
+        self.matches = RecordStore(self.output_dir / "matches", "match", "json", self.writer)
+        self.timelines = RecordStore(self.output_dir / "timelines", "timeline", timeline_format, self.writer)
+        self.manifest_path = self.output_dir / "crawl_manifest.json"
+        # Compact mode: only projected fields are kept in memory and in matches/ and timelines/,
+        # the full payloads optionally go to raw/ (compressed cold storage)
+        self.raw_matches = RecordStore(self.output_dir / "raw" / "matches", "match", COLD_CODEC, self.writer) if compact and keep_raw else None
+        self.raw_timelines = RecordStore(self.output_dir / "raw" / "timelines", "timeline", COLD_CODEC, self.writer) if compact and keep_raw else None
+        self.store = MatchStore(db_path) if db_path else None
         
         logger.info(f"🚀 Analysis initialized for {player_riot_id}")
         logger.info(f"🌍 Platform: {platform} | Region: {region}")
         logger.info(f"📁 Output directory: {self.output_dir.absolute()}")
         logger.info(f"🎯 Match depth: {match_depth}")
+        logger.info(f"🧵 Workers: {self.workers}")
+        logger.info(f"🗜️  Timeline format: {timeline_format}")
+        logger.info(f"🗄️  Match store: {db_path or 'disabled'}")
+        logger.info(f"💾 Background writer: fsync={fsync}")
+        if compact:
+            logger.info(f"✂️  Compact records: projected fields only, raw payloads {'kept in raw/ (' + COLD_CODEC + ')' if keep_raw else 'dropped'}")
+        if incremental:
+            self.load_state()
+
+    def load_state(self):
+        """Rebuild crawl state from the files on disk and the crawl manifest.
+
+        Saved matches are folded into the aggregator too, so complete_analysis.json
+        keeps covering every match on disk and not only the ones this run downloads.
+        """
+        self.downloaded_matches = set(self.matches.keys())
+        self.known_timelines = set(self.timelines.keys())
+        if self.manifest_path.exists():
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.player_checks = json.load(f).get("players", {})
+        self.aggregator.add_matches(load_corpus(self.matches.root, "match", workers=1))
+        logger.info(f"♻️  Incremental mode: {len(self.downloaded_matches)} matches, "
+                    f"{len(self.known_timelines)} timelines, {len(self.player_checks)} players already known")
+
+    def save_manifest(self):
+        """Record when each crawled player's match list was last fully processed.
+
+        A player only counts as checked once every match of that listing is saved; if a
+        download failed, the next incremental run lists the player from the previous check again.
+        """
+        for puuid, (checked, match_ids) in self.pending_checks.items():
+            if all(match_id in self.downloaded_matches for match_id in match_ids):
+                self.player_checks[puuid] = checked
+        self.pending_checks = {}
+        manifest = {"players": self.player_checks, "updated_at": datetime.now().isoformat()}
+        atomic_write(str(self.manifest_path), json.dumps(manifest, indent=2).encode("utf-8"), self.writer.fsync != "none")
 
     def get_player_puuid(self, riot_id: str) -> str:
         """Get PUUID for a player by Riot ID."""
         try:
             game_name, tag_line = parse_riot_id(riot_id)
-            account = account_by_riot_id(self.client, game_name, tag_line)
+            account = through_circuit(account_by_riot_id, self.client, game_name, tag_line)
             puuid = account.get("puuid")
             if not puuid:
                 raise ValueError(f"No PUUID found for {riot_id}")
@@ -87,9 +153,15 @@ class KRAnalysis:
             raise
 
     def get_match_ids(self, puuid: str, count: int) -> List[str]:
-        """Get match IDs for a player."""
+        """Get match IDs for a player (only games since the last check in incremental mode)."""
         try:
-            match_ids = match_ids_by_puuid(self.client, puuid, start=0, count=count)
+            start_time = None
+            if self.incremental and puuid in self.player_checks:
+                # Overlap by an hour so games still running at the last check are not missed
+                start_time = self.player_checks[puuid] - 3600
+            checked = int(time.time())
+            match_ids = through_circuit(match_ids_by_puuid, self.client, puuid, start=0, count=count, start_time=start_time)
+            self.pending_checks[puuid] = (checked, match_ids)
             logger.info(f"📊 Found {len(match_ids)} matches for player")
             return match_ids
         except Exception as e:
@@ -104,39 +176,49 @@ class KRAnalysis:
             
         try:
             logger.info(f"📥 Downloading match {match_id}")
-            match_data = match_by_id(self.client, match_id)
+            match_data = through_circuit(match_by_id, self.client, match_id)
+            if self.compact:
+                if self.raw_matches:
+                    self.raw_matches.save(match_id, match_data)
+                match_data = MATCH(match_data)
             
-            # Save match data
-            filename = f"match_{match_id}.json"
-            filepath = self.output_dir / "matches" / filename
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(match_data, f, indent=2, ensure_ascii=False)
+            # Queue match data for the writer (temp file + rename, so an interrupted run never leaves partial JSON);
+            # the match only counts as downloaded once its write has committed
+            self.matches.submit(match_id, match_data).add_done_callback(partial(self.mark_saved, match_id, (self.downloaded_matches,)))
+            if self.store:
+                self.store.add_match(match_data)
             
-            self.downloaded_matches.add(match_id)
-            self.match_data.append(match_data)
+            self.aggregator.add_match(match_data)
             
-            logger.info(f"✅ Match {match_id} downloaded and saved")
+            logger.info(f"✅ Match {match_id} downloaded")
             return match_data
             
         except Exception as e:
             logger.error(f"❌ Failed to download match {match_id}: {e}")
             return None
 
+    @staticmethod
+    def mark_saved(key: str, sets: Tuple[Set[str], ...], future):
+        """Writer callback: add key to the given sets once its record is on disk (a failed write is retried next run)."""
+        if future.exception() is None:
+            for done in sets:
+                done.add(key)
+
     def download_timeline(self, match_id: str) -> Dict:
         """Download match timeline data."""
         try:
             logger.info(f"⏰ Downloading timeline for match {match_id}")
-            timeline_data = match_timeline(self.client, match_id)
+            timeline_data = through_circuit(match_timeline, self.client, match_id)
+            if self.compact:
+                if self.raw_timelines:
+                    self.raw_timelines.save(match_id, timeline_data)
+                timeline_data = TIMELINE(timeline_data)
             
-            # Save timeline data
-            filename = f"timeline_{match_id}.json"
-            filepath = self.output_dir / "timelines" / filename
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(timeline_data, f, indent=2, ensure_ascii=False)
+            # Queue timeline data for the writer
+            self.timelines.submit(match_id, timeline_data).add_done_callback(
+                partial(self.mark_saved, match_id, (self.known_timelines, self.downloaded_timelines)))
             
-            self.timeline_data.append(timeline_data)
-            
-            logger.info(f"✅ Timeline {match_id} downloaded and saved")
+            logger.info(f"✅ Timeline {match_id} downloaded")
             return timeline_data
             
         except Exception as e:
@@ -148,39 +230,30 @@ class KRAnalysis:
         teammates = []
         
         try:
-            participants = match_data.get("info", {}).get("participants", [])
+            match = Match.from_api(match_data)
             
             # Find player's team
-            player_team_id = None
-            for participant in participants:
-                if participant.get("puuid") == player_puuid:
-                    player_team_id = participant.get("teamId")
-                    break
-            
-            if not player_team_id:
+            if match.participant(player_puuid) is None:
                 logger.warning("❌ Could not find player's team in match")
                 return []
             
             # Extract teammates from the same team
-            for participant in participants:
-                if (participant.get("teamId") == player_team_id and 
-                    participant.get("puuid") != player_puuid):
-                    
-                    teammate_info = {
-                        "puuid": participant.get("puuid"),
-                        "summonerName": f"Player_{participant.get('puuid', '')[:8]}",
-                        "championId": participant.get("championId"),
-                        "championName": participant.get("championName"),
-                        "teamPosition": participant.get("teamPosition"),
-                        "kills": participant.get("kills", 0),
-                        "deaths": participant.get("deaths", 0),
-                        "assists": participant.get("assists", 0),
-                        "goldEarned": participant.get("goldEarned", 0),
-                        "totalDamageDealtToChampions": participant.get("totalDamageDealtToChampions", 0),
-                        "visionScore": participant.get("visionScore", 0),
-                        "totalMinionsKilled": participant.get("totalMinionsKilled", 0)
-                    }
-                    teammates.append(teammate_info)
+            for participant in match.teammates(player_puuid):
+                teammate_info = {
+                    "puuid": participant.puuid,
+                    "summonerName": f"Player_{participant.puuid[:8]}",
+                    "championId": participant.champion_id,
+                    "championName": participant.champion_name,
+                    "teamPosition": participant.team_position,
+                    "kills": participant.kills,
+                    "deaths": participant.deaths,
+                    "assists": participant.assists,
+                    "goldEarned": participant.gold_earned,
+                    "totalDamageDealtToChampions": participant.damage_to_champions,
+                    "visionScore": participant.vision_score,
+                    "totalMinionsKilled": participant.minions_killed
+                }
+                teammates.append(teammate_info)
             
             logger.info(f"👥 Found {len(teammates)} teammates")
             return teammates
@@ -190,94 +263,82 @@ class KRAnalysis:
             return []
 
     def analyze_data(self) -> Dict:
-        """Analyze the collected data."""
-        analysis = {
-            "summary": {
-                "player": self.player_riot_id,
-                "match_depth": self.match_depth,
-                "total_matches": len(self.match_data),
-                "total_timelines": len(self.timeline_data),
-                "unique_players": len(self.analyzed_players),
-                "downloaded_at": datetime.now().isoformat()
-            },
-            "player_stats": {},
-            "champion_stats": {},
-            "match_analysis": []
-        }
-        
-        # Analyze each match
-        for match in self.match_data:
-            match_info = match.get("info", {})
-            participants = match_info.get("participants", [])
-            
-            # Extract key metrics
-            match_analysis = {
-                "matchId": match.get("metadata", {}).get("matchId"),
-                "gameDuration": match_info.get("gameDuration"),
-                "gameMode": match_info.get("gameMode"),
-                "queueId": match_info.get("queueId"),
-                "participants": []
-            }
-            
-            for participant in participants:
-                player_puuid = participant.get("puuid")
-                if player_puuid:
-                    # Update player stats
-                    if player_puuid not in analysis["player_stats"]:
-                        analysis["player_stats"][player_puuid] = {
-                            "matches_played": 0,
-                            "total_kills": 0,
-                            "total_deaths": 0,
-                            "total_assists": 0,
-                            "total_gold": 0,
-                            "total_damage": 0,
-                            "champions_played": set()
-                        }
-                    
-                    stats = analysis["player_stats"][player_puuid]
-                    stats["matches_played"] += 1
-                    stats["total_kills"] += participant.get("kills", 0)
-                    stats["total_deaths"] += participant.get("deaths", 0)
-                    stats["total_assists"] += participant.get("assists", 0)
-                    stats["total_gold"] += participant.get("goldEarned", 0)
-                    stats["total_damage"] += participant.get("totalDamageDealtToChampions", 0)
-                    stats["champions_played"].add(participant.get("championName", "Unknown"))
-                    
-                    # Champion stats
-                    champion = participant.get("championName")
-                    if champion not in analysis["champion_stats"]:
-                        analysis["champion_stats"][champion] = {
-                            "times_played": 0,
-                            "total_kills": 0,
-                            "total_deaths": 0,
-                            "total_assists": 0
-                        }
-                    
-                    champ_stats = analysis["champion_stats"][champion]
-                    champ_stats["times_played"] += 1
-                    champ_stats["total_kills"] += participant.get("kills", 0)
-                    champ_stats["total_deaths"] += participant.get("deaths", 0)
-                    champ_stats["total_assists"] += participant.get("assists", 0)
-                
-                match_analysis["participants"].append({
-                    "puuid": participant.get("puuid"),
-                    "championName": participant.get("championName"),
-                    "teamPosition": participant.get("teamPosition"),
-                    "kills": participant.get("kills", 0),
-                    "deaths": participant.get("deaths", 0),
-                    "assists": participant.get("assists", 0),
-                    "goldEarned": participant.get("goldEarned", 0),
-                    "totalDamageDealtToChampions": participant.get("totalDamageDealtToChampions", 0),
-                    "visionScore": participant.get("visionScore", 0)
-                })
-            
-            analysis["match_analysis"].append(match_analysis)
-        
-        # Convert sets to lists for JSON serialization
-        for player in analysis["player_stats"]:
-            analysis["player_stats"][player]["champions_played"] = list(analysis["player_stats"][player]["champions_played"])
-        
-        return analysis
+        """Analyze the collected data (aggregated as each match was downloaded)."""
+        return build_analysis(self.aggregator, {
+            "player": self.player_riot_id,
+            "match_depth": self.match_depth,
+            "total_matches": self.aggregator.matches,
+            "total_timelines": len(self.downloaded_timelines),
+            "unique_players": len(self.analyzed_players),
+        })
+
+    def download_bundle(self, match_id: str) -> Dict:
+        """Download a match and, if it is new, its timeline."""
+        match_data = self.download_match(match_id)
+        if match_data and match_id not in self.known_timelines:
+            self.download_timeline(match_id)
+        return match_data
+
+    def resume_bundle(self, match_id: str) -> Dict:
+        """Load an already saved match from disk and fetch its timeline if it is missing.
+
+        The match itself is already in the aggregator (load_state).
+        """
+        if match_id not in self.known_timelines:
+            self.download_timeline(match_id)
+        try:
+            return self.matches.load(match_id)
+        except Exception as e:
+            logger.error(f"❌ Failed to load saved match {match_id}: {e}")
+            return None
+
+    def crawl(self, player_puuid: str, player_match_ids: List[str]):
+        """Download the player's matches and their teammates' matches on a worker pool.
+
+        Every request goes through the shared client, so all workers draw from the
+        same rate budget. Each match is fetched at most once per crawl because only this
+        coordinating thread reads and adds to `queued`. downloaded_matches is shared: workers
+        read it, and writer callbacks (mark_saved) add to it once a record is on disk.
+        """
+        queued: Set[str] = set()
+        pending = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            def queue_match(match_id: str, is_player_match: bool):
+                if match_id in queued:
+                    return
+                task = self.download_bundle
+                if match_id in self.downloaded_matches:
+                    if not self.incremental or not (is_player_match or match_id not in self.known_timelines):
+                        return
+                    task = self.resume_bundle
+                queued.add(match_id)
+                pending[pool.submit(task, match_id)] = ("match", is_player_match)
+
+            for match_id in player_match_ids:
+                queue_match(match_id, True)
+
+            try:
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        kind, is_player_match = pending.pop(future)
+                        result = future.result()
+                        if kind == "ids":
+                            for tm_match_id in result:
+                                queue_match(tm_match_id, False)
+                        elif result and is_player_match:
+                            for teammate in self.extract_teammates(result, player_puuid):
+                                teammate_puuid = teammate.get("puuid")
+                                if teammate_puuid and teammate_puuid not in self.analyzed_players:
+                                    logger.info(f"👥 Analyzing teammate: {teammate.get('summonerName')}")
+                                    self.analyzed_players.add(teammate_puuid)
+                                    pending[pool.submit(self.get_match_ids, teammate_puuid, self.match_depth)] = ("ids", False)
+            except KeyboardInterrupt:
+                logger.warning("🛑 Interrupted: finishing in-flight requests, saved files are kept for --incremental")
+                for future in pending:
+                    future.cancel()
+                raise
 
     def run_analysis(self):
         """Run the complete analysis."""
@@ -292,46 +353,20 @@ class KRAnalysis:
             logger.info(f"📊 Getting {self.player_riot_id}'s last {self.match_depth} matches...")
             player_match_ids = self.get_match_ids(player_puuid, self.match_depth)
             
-            # Step 3: Download player's matches
+            # Steps 3-4: Download player's and teammates' matches
             logger.info("📥 Downloading player's matches...")
-            for match_id in player_match_ids:
-                match_data = self.download_match(match_id)
-                if match_data:
-                    # Download timeline for each match
-                    self.download_timeline(match_id)
-                    
-                    # Extract teammates
-                    teammates = self.extract_teammates(match_data, player_puuid)
-                    
-                    # Step 4: Download teammates' matches
-                    for teammate in teammates:
-                        teammate_puuid = teammate.get("puuid")
-                        teammate_name = teammate.get("summonerName")
-                        
-                        if teammate_puuid and teammate_puuid not in self.analyzed_players:
-                            logger.info(f"👥 Analyzing teammate: {teammate_name}")
-                            self.analyzed_players.add(teammate_puuid)
-                            
-                            # Get teammate's last matches
-                            teammate_match_ids = self.get_match_ids(teammate_puuid, self.match_depth)
-                            
-                            # Download teammate's matches
-                            for tm_match_id in teammate_match_ids:
-                                if tm_match_id not in self.downloaded_matches:
-                                    self.download_match(tm_match_id)
-                                    self.download_timeline(tm_match_id)
-                                    
-                                    # Small delay to respect rate limits
-                                    time.sleep(0.1)
+            self.crawl(player_puuid, player_match_ids)
+            # Records must be on disk before the manifest marks their players as done:
+            # a failed write keeps its match out of downloaded_matches, so its player is not marked
+            self.report_write_failures(self.writer.flush())
+            self.save_manifest()
             
             # Step 5: Analyze all collected data
             logger.info("📈 Analyzing collected data...")
             analysis = self.analyze_data()
             
             # Save analysis
-            analysis_file = self.output_dir / "analysis" / "complete_analysis.json"
-            with open(analysis_file, 'w', encoding='utf-8') as f:
-                json.dump(analysis, f, indent=2, ensure_ascii=False)
+            save_analysis(analysis, self.output_dir)
             
             # Save summary
             summary = {
@@ -339,7 +374,7 @@ class KRAnalysis:
                     "player": self.player_riot_id,
                     "match_depth": self.match_depth,
                     "total_matches_downloaded": len(self.downloaded_matches),
-                    "total_timelines_downloaded": len(self.timeline_data),
+                    "total_timelines_downloaded": len(self.downloaded_timelines),
                     "unique_players_analyzed": len(self.analyzed_players),
                     "completion_time": datetime.now().isoformat(),
                     "output_directory": str(self.output_dir.absolute())
@@ -352,8 +387,7 @@ class KRAnalysis:
             }
             
             summary_file = self.output_dir / "analysis" / "download_summary.json"
-            with open(summary_file, 'w', encoding='utf-8') as f:
-                json.dump(summary, f, indent=2, ensure_ascii=False)
+            atomic_write(str(summary_file), json.dumps(summary, indent=2, ensure_ascii=False).encode("utf-8"))
             
             logger.info("🎉 Analysis complete!")
             logger.info(f"📊 Downloaded {len(self.downloaded_matches)} matches")
@@ -365,18 +399,117 @@ class KRAnalysis:
         except Exception as e:
             logger.error(f"❌ Analysis failed: {e}")
             raise
+        finally:
+            self.report_write_failures(self.writer.flush())
+            self.save_metrics()
+            self.close()
+
+    def close(self):
+        """Stop the background writer and close the match store (safe to call twice)."""
+        self.writer.close()
+        if self.store:
+            self.store.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def report_write_failures(self, failed: List[Tuple[str, Exception]]):
+        """Log how many records the background writer could not save (each failure is logged by the writer)."""
+        if failed:
+            logger.error(f"❌ {len(failed)} records not saved (first: {failed[0][0]}), they will be fetched again by --incremental")
+
+    def save_metrics(self):
+        """Dump request counters, latency histograms, backoff time and rate-limit state."""
+        path = self.output_dir / "analysis" / "request_metrics.json"
+        stats = self.client.stats()
+        stats["writer"] = dict(self.writer.stats)
+        atomic_write(str(path), json.dumps(stats, indent=2).encode("utf-8"))
+        t = stats["totals"]
+        limits = ", ".join(f"{h}={c['limit']:g}/{c['state']}" for h, c in stats.get("concurrency", {}).items()) or "-"
+        logger.info(f"📡 {t['requests']} requests, {t['bytes'] / 1e6:.1f} MB, {t['rate_limited']} x 429, {t['coalesced']} coalesced, {t['backoff_sleep_s']}s waiting, concurrency {limits} -> {path}")
+        return path
+
+def build_analysis(aggregator: StatsAggregator, summary: Dict) -> Dict:
+    """Assemble complete_analysis.json from an aggregator and summary fields."""
+    return {
+        "summary": dict(summary, downloaded_at=datetime.now().isoformat()),
+        **aggregator.result()
+    }
+
+def save_analysis(analysis: Dict, output_dir: Path) -> Path:
+    """Write complete_analysis.json."""
+    analysis_file = Path(output_dir) / "analysis" / "complete_analysis.json"
+    analysis_file.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write(str(analysis_file), json.dumps(analysis, indent=2, ensure_ascii=False).encode("utf-8"))
+    return analysis_file
+
+def analyze_saved_matches(output_dir: str = "analysis_data", player: str = None, keep_match_rows: bool = True, engine: str = "stream", workers: int = None) -> Dict:
+    """Re-aggregate every saved match without any API call.
+
+    engine="stream" folds matches one at a time (constant memory); engine="pandas"
+    flattens them into one DataFrame and adds per-position/queue/patch breakdowns.
+    Files are decoded on `workers` processes (default: one per CPU).
+    """
+    output_dir = Path(output_dir)
+    logger.info(f"📂 Re-aggregating saved matches from {output_dir / 'matches'} ({engine})")
+    if engine == "pandas":
+        from riotkit import analytics
+        df = analytics.load_frame(output_dir / "matches", workers)
+        sections = analytics.complete_analysis(df, keep_match_rows)
+        total_matches = int(df["match_id"].nunique())
+    else:
+        # Workers project each match to the aggregated fields, so full payloads are never pickled back
+        aggregator = StatsAggregator(keep_match_rows).add_matches(load_corpus(output_dir / "matches", "match", AGGREGATED, workers))
+        sections = aggregator.result()
+        total_matches = aggregator.matches
+    analysis = {
+        "summary": {
+            "player": player,
+            "match_depth": None,
+            "total_matches": total_matches,
+            "total_timelines": len(RecordStore(output_dir / "timelines", "timeline").paths()),
+            "unique_players": len(sections["player_stats"]),
+            "downloaded_at": datetime.now().isoformat()
+        },
+        **sections
+    }
+    logger.info(f"📁 Analysis saved to: {save_analysis(analysis, output_dir)}")
+    return analysis
 
 def main():
     """Main function."""
     parser = argparse.ArgumentParser(description="Multi-Server Analysis Script - All-in-One")
-    parser.add_argument("--player", required=True, help="Player Riot ID (e.g., 'Sard#CASS')")
+    parser.add_argument("--player", help="Player Riot ID (e.g., 'Sard#CASS')")
     parser.add_argument("--depth", type=int, default=10, help="Match depth (default: 10)")
     parser.add_argument("--platform", default="kr", help="Platform (kr, euw1, na1, eun1, etc.)")
     parser.add_argument("--region", default="asia", help="Region (asia, europe, americas)")
     parser.add_argument("--test", action="store_true", help="Run test mode (depth=2)")
+    parser.add_argument("--timeline-format", default="gzip", choices=sorted(CODECS), help="Timeline storage format (default: gzip)")
+    parser.add_argument("--db", default="analysis_data/matches.sqlite", help="SQLite match store ('' to disable)")
+    parser.add_argument("--incremental", action="store_true", help="Resume from analysis_data/: skip saved matches/timelines, only list games since the last run")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent download workers (default: 8, 1 = sequential)")
+    parser.add_argument("--compact", action="store_true", help="Keep only the projected match/timeline fields (riotkit/projection.py) in memory and on disk")
+    parser.add_argument("--keep-raw", action="store_true", help="With --compact, also keep the full payloads compressed in analysis_data/raw/")
+    parser.add_argument("--fsync", default="none", choices=FSYNC_POLICIES, help="Durability of saved records: none (atomic renames only), batch (fsync per written batch), always (fsync every file)")
+    parser.add_argument("--metrics-port", type=int, help="Serve live request metrics on http://127.0.0.1:PORT/metrics (Prometheus text) and /metrics.json")
+    
+    parser.add_argument("--from-disk", action="store_true", help="Only re-aggregate analysis_data/matches into complete_analysis.json (no API calls)")
+    parser.add_argument("--engine", default="stream", choices=("stream", "pandas"), help="With --from-disk: streaming aggregator or vectorized pandas engine (adds per-position/queue/patch breakdowns)")
+    parser.add_argument("--load-workers", type=int, help="With --from-disk: processes decoding the saved files (default: one per CPU)")
+    parser.add_argument("--no-match-rows", action="store_true", help="Omit per-match rows from complete_analysis.json to keep memory constant")
     
     args = parser.parse_args()
     
+    if args.from_disk:
+        analysis = analyze_saved_matches("analysis_data", args.player, not args.no_match_rows, args.engine, args.load_workers)
+        print(f"Re-aggregated {analysis['summary']['total_matches']} matches")
+        return
+    if not args.player:
+        parser.error("--player is required unless --from-disk is used")
+    
     # Override depth for test mode
     if args.test:
         args.depth = 2
@@ -385,18 +518,25 @@ def main():
     print(f"Analysis for {args.player}")
     print(f"Server: {args.platform}/{args.region}")
     print(f"Match depth: {args.depth}")
+    print(f"Workers: {args.workers}")
     print(f"Output: analysis_data/")
     print("=" * 50)
     
     try:
-        analyzer = KRAnalysis(args.player, args.depth, args.platform, args.region)
-        analysis = analyzer.run_analysis()
+        with KRAnalysis(args.player, args.depth, args.platform, args.region, args.workers, args.timeline_format, args.db, args.incremental, args.compact, args.keep_raw, args.fsync, not args.no_match_rows) as analyzer:
+            if args.metrics_port:
+                analyzer.client.metrics.serve(args.metrics_port, limiter=analyzer.client.limiter, cache=analyzer.client.cache, controller=analyzer.client.controller)
+                print(f"Metrics: http://127.0.0.1:{args.metrics_port}/metrics")
+            analysis = analyzer.run_analysis()
         
         print("\nAnalysis Complete!")
         print(f"Total matches: {len(analyzer.downloaded_matches)}")
         print(f"Unique players: {len(analyzer.analyzed_players)}")
         print(f"Output directory: {analyzer.output_dir.absolute()}")
         
+    except KeyboardInterrupt:
+        print("\nInterrupted. Saved data is kept; re-run with --incremental to resume.")
+        sys.exit(130)
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
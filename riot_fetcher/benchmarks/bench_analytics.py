@@ -0,0 +1,65 @@
+"""Compare the dict-based StatsAggregator with the vectorized pandas engine.
+
+Usage (from riot_fetcher/):
+    python -m benchmarks.bench_analytics
+    python -m benchmarks.bench_analytics --matches-dir ../analysis_data/matches --synthetic 100000
+"""
+import argparse
+import random
+import time
+from riotkit.aggregate import StatsAggregator, iter_match_files
+from riotkit import analytics
+
+POSITIONS = ("TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY")
+
+
+def synthetic_matches(n: int, players: int = 50000, champions: int = 170, seed: int = 7):
+    rnd = random.Random(seed)
+    pool = [f"puuid-{i:06d}" for i in range(players)]
+    names = [f"Champ{i}" for i in range(champions)]
+    for i in range(n):
+        out = []
+        for j, puuid in enumerate(rnd.sample(pool, 10)):
+            out.append({
+                "puuid": puuid, "championName": rnd.choice(names), "teamPosition": POSITIONS[j % 5],
+                "teamId": 100 if j < 5 else 200, "win": j < 5, "kills": rnd.randint(0, 15), "deaths": rnd.randint(0, 12),
+                "assists": rnd.randint(0, 20), "goldEarned": rnd.randint(5000, 20000),
+                "totalDamageDealtToChampions": rnd.randint(3000, 60000), "visionScore": rnd.randint(0, 80),
+            })
+        yield {
+            "metadata": {"matchId": f"KR_{i}"},
+            "info": {"queueId": rnd.choice((420, 440, 450)), "gameMode": "CLASSIC", "gameDuration": rnd.randint(900, 2400),
+                     "gameVersion": f"15.{rnd.randint(17, 20)}.1.1", "participants": out},
+        }
+
+
+def timed(fn):
+    t = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t
+
+
+def run(label: str, matches):
+    _, t_dict = timed(lambda: StatsAggregator().add_matches(matches).result())
+    df, t_flat = timed(lambda: analytics.flatten(matches))
+    _, t_vec = timed(lambda: analytics.complete_analysis(df))
+    _, t_vec_nr = timed(lambda: analytics.complete_analysis(df, keep_match_rows=False))
+    print(f"{label}: {len(matches)} matches, {len(df)} participant rows")
+    print(f"  dict aggregator            {t_dict:8.3f}s")
+    print(f"  flatten to DataFrame       {t_flat:8.3f}s")
+    print(f"  vectorized (with rows)     {t_vec:8.3f}s  x{t_dict / t_vec:.1f}")
+    print(f"  vectorized (no match rows) {t_vec_nr:8.3f}s  x{t_dict / t_vec_nr:.1f}  (+ per-position/queue/patch breakdowns)")
+
+
+def main():
+    p = argparse.ArgumentParser(description="Analytics engine benchmark")
+    p.add_argument("--matches-dir", default="../analysis_data/matches")
+    p.add_argument("--synthetic", type=int, default=100000)
+    a = p.parse_args()
+    run("corpus", list(iter_match_files(a.matches_dir)))
+    if a.synthetic:
+        run("synthetic", list(synthetic_matches(a.synthetic)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Corpus loading throughput: riotkit.corpus.load_corpus by worker count, JSON decoder and transform.
+
+Usage (from riot_fetcher/):
+    python -m benchmarks.bench_corpus
+    python -m benchmarks.bench_corpus --kind timeline --workers 1 2 4 8
+"""
+import argparse
+import json
+import os
+import time
+from riotkit import storage
+from riotkit.aggregate import AGGREGATED
+from riotkit.corpus import load_corpus, participant_rows, to_match, to_timeline
+
+TRANSFORMS = {
+    "match": (("payload", None), ("aggregated", AGGREGATED), ("rows", participant_rows), ("models", to_match)),
+    "timeline": (("payload", None), ("models", to_timeline)),
+}
+
+
+def main():
+    p = argparse.ArgumentParser(description="Corpus loader benchmark")
+    p.add_argument("--data", default=os.path.join("..", "analysis_data"))
+    p.add_argument("--kind", default="match", choices=sorted(TRANSFORMS))
+    p.add_argument("--workers", type=int, nargs="+", default=sorted({1, os.cpu_count() or 1}))
+    p.add_argument("--chunk", type=int, default=16)
+    a = p.parse_args()
+    directory = os.path.join(a.data, a.kind + "es" if a.kind == "match" else a.kind + "s")
+    size = sum(e.stat().st_size for e in os.scandir(directory) if e.is_file())
+    print(f"{directory}: {size / 1e6:.0f} MB, {os.cpu_count()} CPUs")
+    decoders = [("json", json.loads)] + ([("orjson", storage.orjson.loads)] if storage.orjson is not None else [])
+    for dec_name, dec in decoders:
+        storage.loads = dec  # forked workers inherit it
+        for name, fn in TRANSFORMS[a.kind]:
+            for w in a.workers:
+                t = time.perf_counter()
+                n = sum(1 for _ in load_corpus(directory, a.kind, fn, w, a.chunk))
+                dt = time.perf_counter() - t
+                print(f"  {dec_name:7s} {name:10s} workers={w:<3d} {n} records {dt:7.2f}s  {size / 1e6 / dt:6.0f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""End-to-end fetch throughput against the local mock Riot API (benchmarks/mock_riot.py).
+
+The mock replays analysis_data in its own process. Every scenario runs in a fresh child
+process, so CPU time and peak RSS are those of the code under test only:
+
+    fetch_profile   riotkit.fetcher.fetch_profile for the players with the most recorded games
+    run_analysis    fetcher_bridge.KRAnalysis.run_analysis (player + teammates crawl, timelines)
+                    in a temporary directory
+    cli_batch       main.py batch match-get over every recorded match ID
+    cli_match_get   single main.py match get invocations (latency includes interpreter start)
+
+Latency percentiles are exact, taken from every response seen by the client (per invocation
+for cli_match_get). Matches/s counts match payloads fetched, timelines excluded.
+
+Usage (from riot_fetcher/):
+    python -m benchmarks.bench_fetch
+    python -m benchmarks.bench_fetch --latency 0.03 --jitter 0.02 --p429 0.01 --p5xx 0.01 --json out.json
+    python -m benchmarks.bench_fetch --scenario fetch_profile --players 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from riotkit.storage import split_ext
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("fetch_profile", "run_analysis", "cli_batch", "cli_match_get")
+
+
+def percentile(values: List[float], q: float):
+    if not values:
+        return None
+    s = sorted(values)
+    return s[min(len(s) - 1, int(q * len(s)))]
+
+
+def fmt(v) -> str:
+    return "-" if v is None else f"{v:.1f}"
+
+
+def collect(client) -> List[float]:
+    latencies: List[float] = []
+    client.metrics.add_hook(lambda e: e["event"] == "response" and latencies.append(e["latency"]))
+    return latencies
+
+
+# Child side: one scenario per process, result as JSON on stdout
+
+def child_fetch_profile(base_url: str, players: List[str], count: int, workers: int) -> Dict:
+    from riotkit.client import RiotClient
+    from riotkit.fetcher import fetch_profile
+    c = RiotClient("bench", "euw1", "europe", pool_size=max(10, workers), base_url=base_url)
+    latencies = collect(c)
+    t = time.perf_counter()
+    matches = sum(len(fetch_profile(c, p, count, workers)["matches"]) for p in players)
+    return {"wall": time.perf_counter() - t, "matches": matches, "latencies": latencies, "totals": c.stats()["totals"]}
+
+
+def child_run_analysis(base_url: str, players: List[str], count: int, workers: int) -> Dict:
+    sys.path.insert(0, os.path.dirname(ROOT))
+    import logging
+    from fetcher_bridge import KRAnalysis
+    from riotkit.client import RiotClient
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        a = KRAnalysis(players[0], match_depth=count, workers=workers, db_path="")
+        a.client = RiotClient("bench", a.platform, a.region, pool_size=max(10, a.workers), base_url=base_url)
+        latencies = collect(a.client)
+        t = time.perf_counter()
+        a.run_analysis()
+        wall = time.perf_counter() - t
+        os.chdir(ROOT)
+    return {"wall": wall, "matches": len(a.downloaded_matches), "timelines": len(a.downloaded_timelines),
+            "latencies": latencies, "totals": a.client.stats()["totals"]}
+
+
+CHILDREN = {"fetch_profile": child_fetch_profile, "run_analysis": child_run_analysis}
+
+
+# Parent side
+
+def run_measured(cmd: List[str], env=None, stdin=None, stdout=subprocess.PIPE) -> Dict:
+    """Run cmd and return its wall time, CPU seconds and peak RSS (MB) from wait4()."""
+    t = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdin=stdin, stdout=stdout, stderr=subprocess.DEVNULL)
+    out = proc.stdout.read() if stdout is subprocess.PIPE else b""
+    _, status, ru = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return {"process_wall": time.perf_counter() - t, "cpu_s": ru.ru_utime + ru.ru_stime,
+            "peak_rss_mb": ru.ru_maxrss / 1024, "returncode": proc.returncode, "stdout": out}
+
+
+def start_mock(a) -> Tuple[subprocess.Popen, str, List[str]]:
+    """Start the mock in its own process; (process, base_url, busiest players' Riot IDs)."""
+    cmd = [sys.executable, "-m", "benchmarks.mock_riot", "--data", a.data, "--port", "0", "--players", str(a.players), "--latency", str(a.latency),
+           "--jitter", str(a.jitter), "--p429", str(a.p429), "--p5xx", str(a.p5xx), "--retry-after", str(a.retry_after)]
+    proc = subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    if not line.startswith("listening on "):
+        proc.kill()
+        raise RuntimeError(f"mock server did not start: {line!r}")
+    players = list(iter(lambda: proc.stdout.readline().rstrip("\n"), ""))
+    return proc, line.split()[2], players
+
+
+def scenario(name: str, base_url: str, a, players: List[str], match_ids: List[str]) -> Dict:
+    env = dict(os.environ, RIOT_API_KEY="bench")
+    if name in CHILDREN:
+        cmd = [sys.executable, "-m", "benchmarks.bench_fetch", "--child", name, "--base-url", base_url,
+               "--count", str(a.count), "--workers", str(a.workers), "--"] + players
+        m = run_measured(cmd, env)
+        if m["returncode"]:
+            raise RuntimeError(f"{name} failed with exit code {m['returncode']}")
+        res = json.loads(m.pop("stdout"))
+    elif name == "cli_batch":
+        with tempfile.TemporaryFile() as ids:
+            ids.write("\n".join(match_ids).encode())
+            ids.seek(0)
+            m = run_measured([sys.executable, "main.py", "--base-url", base_url, "--no-cache", "--log-level", "ERROR",
+                              "batch", "match-get", "--workers", str(a.workers)], env, stdin=ids)
+        out = m.pop("stdout").decode().splitlines()
+        res = {"wall": m["process_wall"], "matches": sum('"data"' in line[:64] for line in out), "latencies": []}
+    else:
+        res = {"matches": 0, "latencies": [], "cpu_s": 0.0, "peak_rss_mb": 0.0}
+        t = time.perf_counter()
+        for mid in match_ids[:a.invocations]:
+            m = run_measured([sys.executable, "main.py", "--base-url", base_url, "--no-cache", "--log-level", "ERROR",
+                              "match", "get", "--match-id", mid, "--stdout"], env)
+            res["latencies"].append(m["process_wall"])
+            res["matches"] += m["returncode"] == 0
+            res["cpu_s"] += m["cpu_s"]
+            res["peak_rss_mb"] = max(res["peak_rss_mb"], m["peak_rss_mb"])
+        res["wall"] = time.perf_counter() - t
+        m = {}
+    res.update(m)
+    lat = res.pop("latencies")
+    res.update({
+        "matches_per_s": round(res["matches"] / res["wall"], 1) if res["wall"] else None,
+        "requests": res.get("totals", {}).get("requests"),
+        "p50_ms": round(percentile(lat, 0.5) * 1000, 1) if lat else None,
+        "p99_ms": round(percentile(lat, 0.99) * 1000, 1) if lat else None,
+    })
+    return res
+
+
+def main():
+    p = argparse.ArgumentParser(description="Fetch throughput benchmark against a local mock Riot API")
+    p.add_argument("--data", default=os.path.join(os.path.dirname(ROOT), "analysis_data"))
+    p.add_argument("--scenario", action="append", choices=SCENARIOS, help="Scenario to run (repeatable, default: all)")
+    p.add_argument("--players", type=int, default=3, help="fetch_profile: number of players")
+    p.add_argument("--count", type=int, default=20, help="Matches listed per player")
+    p.add_argument("--workers", type=int, default=8)
+    p.add_argument("--invocations", type=int, default=10, help="cli_match_get: number of CLI runs")
+    p.add_argument("--latency", type=float, default=0.0, help="Mock server delay per response (s)")
+    p.add_argument("--jitter", type=float, default=0.0)
+    p.add_argument("--p429", type=float, default=0.0)
+    p.add_argument("--retry-after", type=int, default=1)
+    p.add_argument("--p5xx", type=float, default=0.0)
+    p.add_argument("--json", help="Also write the results to this file")
+    p.add_argument("--child", choices=sorted(CHILDREN), help=argparse.SUPPRESS)
+    p.add_argument("--base-url", help=argparse.SUPPRESS)
+    p.add_argument("ids", nargs="*", help=argparse.SUPPRESS)
+    a = p.parse_args()
+    if a.child:
+        print(json.dumps(CHILDREN[a.child](a.base_url, a.ids, a.count, a.workers)))
+        return
+
+    # The parent stays small: forked children would otherwise report its RSS as their peak
+    match_ids = sorted(split_ext(f)[0][len("match_"):] for f in os.listdir(os.path.join(a.data, "matches")) if f.startswith("match_"))
+    mock, base_url, players = start_mock(a)
+    results = {}
+    try:
+        for name in a.scenario or SCENARIOS:
+            results[name] = r = scenario(name, base_url, a, players, match_ids)
+            print(f"{name:14s} {r['matches']:5d} matches {r['wall']:7.2f} s {r['matches_per_s'] or 0:8.1f} matches/s  "
+                  f"p50 {fmt(r['p50_ms'])} ms  p99 {fmt(r['p99_ms'])} ms  cpu {r['cpu_s']:.2f} s  rss {r['peak_rss_mb']:.0f} MB", flush=True)
+    finally:
+        mock.terminate()
+        mock.wait()
+    if a.json:
+        with open(a.json, "w", encoding="utf-8") as f:
+            json.dump({"config": {k: v for k, v in vars(a).items() if k not in ("child", "base_url", "ids")}, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
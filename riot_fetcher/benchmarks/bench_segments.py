@@ -0,0 +1,70 @@
+"""Read a corpus from one file per record vs. packed segments (riotkit/segments.py).
+
+The recorded matches are projected and copied under new IDs up to --records, then written
+once as match_*.json files and once as a segment store. Reported: the time to load every
+record, a random subset, and the raw bytes alone (no JSON decoding), i.e. the cost of
+opening files vs. slicing one mmap.
+
+Usage (from riot_fetcher/):
+    python -m benchmarks.bench_segments
+    python -m benchmarks.bench_segments --records 50000 --subset 5000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from riotkit.aggregate import iter_match_files
+from riotkit.projection import MATCH
+from riotkit.segments import SegmentStore
+from riotkit.storage import RecordStore, read_record
+
+
+def timed(fn):
+    t = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t
+
+
+def raw_files(paths):
+    n = 0
+    for p in paths:
+        with open(p, "rb") as fh:
+            n += len(fh.read())
+    return n
+
+
+def main():
+    p = argparse.ArgumentParser(description="File-per-record vs segment store read benchmark")
+    p.add_argument("--matches-dir", default="../analysis_data/matches")
+    p.add_argument("--records", type=int, default=20000)
+    p.add_argument("--subset", type=int, default=2000)
+    a = p.parse_args()
+    base = [MATCH(m) for m in iter_match_files(a.matches_dir)]
+    rnd = random.Random(7)
+    with tempfile.TemporaryDirectory() as d:
+        files = RecordStore(os.path.join(d, "files"), "match", "json")
+        items = [(f"KR_{i}", base[i % len(base)]) for i in range(a.records)]
+        _, t_write_files = timed(lambda: [files.save(k, m) for k, m in items])
+        seg = SegmentStore(os.path.join(d, "segments"))
+        _, t_write_seg = timed(lambda: seg.put_many(items))
+        keys = [k for k, _ in items]
+        subset = rnd.sample(keys, min(a.subset, len(keys)))
+        paths = files.paths()
+
+        print(f"{a.records} projected matches, subset {len(subset)}")
+        print(f"  write     files {t_write_files:7.2f}s   segments {t_write_seg:7.2f}s")
+        _, t1 = timed(lambda: list(iter_match_files(files.root)))
+        _, t2 = timed(lambda: list(seg.values()))
+        print(f"  load all  files {t1:7.2f}s   segments {t2:7.2f}s")
+        _, t1 = timed(lambda: [read_record(paths[k]) for k in subset])
+        _, t2 = timed(lambda: list(seg.get_many(subset)))
+        print(f"  subset    files {t1:7.2f}s   segments {t2:7.2f}s")
+        _, t1 = timed(lambda: raw_files(paths[k] for k in keys))
+        _, t2 = timed(lambda: sum(len(seg.get_raw(k)) for k in keys))
+        print(f"  raw bytes files {t1:7.2f}s   segments {t2:7.2f}s  ({len(paths)} opens vs {seg.stats()['segments']} maps)")
+        seg.close()
+
+
+if __name__ == "__main__":
+    main()
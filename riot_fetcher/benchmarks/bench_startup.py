@@ -0,0 +1,61 @@
+"""Wall time of short main.py invocations (interpreter start, imports, parser build).
+
+Usage (from riot_fetcher/):
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 50 --importtime
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def cases(tmp: str):
+    return {
+        "python -c pass": ["-c", "pass"],
+        "main.py --help": ["main.py", "--help"],
+        "main.py match get --help": ["main.py", "match", "get", "--help"],
+        "main.py storage prune-cache": ["main.py", "storage", "prune-cache", "--dir", tmp],
+    }
+
+
+def measure(args, runs: int):
+    out = []
+    for _ in range(runs):
+        t = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        out.append(time.perf_counter() - t)
+    return out
+
+
+def importtime(args, top: int = 8):
+    r = subprocess.run([sys.executable, "-X", "importtime"] + args, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    rows = []
+    for line in r.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    p = argparse.ArgumentParser(description="CLI startup benchmark")
+    p.add_argument("--runs", type=int, default=20)
+    p.add_argument("--importtime", action="store_true", help="Also list the slowest imports of main.py --help")
+    a = p.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, args in cases(tmp).items():
+            t = measure(args, a.runs)
+            print(f"{label:32s} mean {statistics.mean(t) * 1000:7.1f} ms  p50 {statistics.median(t) * 1000:7.1f} ms  min {min(t) * 1000:7.1f} ms")
+    if a.importtime:
+        for us, name in importtime(["main.py", "--help"]):
+            print(f"  {us / 1000:8.1f} ms {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Local stand-in for the Riot API replaying recorded analysis_data.
+
+Serves account, summoner, match-ID, match and timeline endpoints from the files in
+analysis_data/matches and analysis_data/timelines (any storage codec), with optional
+latency, random 429s (with Retry-After), random 5xx and an enforced app rate limit.
+
+Usage (from riot_fetcher/):
+    python -m benchmarks.mock_riot --data ../analysis_data --port 8089 --latency 0.03 --p429 0.01
+    python main.py --base-url "http://127.0.0.1:8089/{host}" batch match-get < ids.txt
+"""
+import argparse
+import collections
+import json
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Tuple
+from urllib.parse import unquote
+from riotkit.ratelimit import parse_limits
+from riotkit.storage import read_record, split_ext
+from tests.stub_server import StubRiotServer
+
+MATCH = "/lol/match/v5/matches/"
+NOT_FOUND = (404, {"status": {"message": "Data not found", "status_code": 404}})
+
+
+class ReplayRiotServer(StubRiotServer):
+    def __init__(self, data_dir, latency: float = 0.0, jitter: float = 0.0, p429: float = 0.0, retry_after: int = 1,
+                 p5xx: float = 0.0, app_limits: str = "10000:1", enforce_limits: bool = False, seed: int = 7, port: int = 0):
+        super().__init__(port=port)
+        self.latency = latency
+        self.jitter = jitter
+        self.p429 = p429
+        self.retry_after = retry_after
+        self.p5xx = p5xx
+        self.app_limits = app_limits
+        self.enforce = enforce_limits
+        self.windows = [(n, float(w)) for n, w in parse_limits(app_limits)]
+        self.hits: Dict[str, collections.deque] = collections.defaultdict(collections.deque)
+        self.rnd = random.Random(seed)
+        self.rnd_lock = threading.Lock()
+        self.faults = collections.Counter()
+        self.matches: Dict[str, str] = {}
+        self.timelines: Dict[str, str] = {}
+        self.by_puuid: Dict[str, List[Tuple[int, int, str]]] = collections.defaultdict(list)
+        self.accounts: Dict[str, Dict] = {}
+        self.riot_ids: Dict[Tuple[str, str], str] = {}
+        self._index(str(data_dir))
+
+    def _index(self, data_dir: str):
+        for sub, prefix, target in (("matches", "match_", self.matches), ("timelines", "timeline_", self.timelines)):
+            d = os.path.join(data_dir, sub)
+            if not os.path.isdir(d):
+                continue
+            for entry in os.scandir(d):
+                stem, ext = split_ext(entry.name)
+                if ext and stem.startswith(prefix):
+                    target.setdefault(stem[len(prefix):], entry.path)
+        for mid, path in self.matches.items():
+            info = read_record(path).get("info", {})
+            for p in info.get("participants", []):
+                puuid = p.get("puuid")
+                if not puuid:
+                    continue
+                self.by_puuid[puuid].append((info.get("gameCreation", 0), info.get("queueId"), mid))
+                if puuid not in self.accounts:
+                    name, tag = p.get("riotIdGameName") or p.get("summonerName") or "", p.get("riotIdTagline") or ""
+                    self.accounts[puuid] = {"puuid": puuid, "gameName": name, "tagLine": tag,
+                                            "summonerLevel": p.get("summonerLevel", 1), "profileIconId": p.get("profileIcon", 0)}
+                    self.riot_ids[(name.lower(), tag.lower())] = puuid
+        for games in self.by_puuid.values():
+            games.sort(reverse=True)
+
+    def riot_id_of(self, puuid: str) -> str:
+        a = self.accounts[puuid]
+        return f"{a['gameName']}#{a['tagLine']}"
+
+    def busiest_players(self, n: int = 1) -> List[str]:
+        return sorted(self.by_puuid, key=lambda p: -len(self.by_puuid[p]))[:n]
+
+    @staticmethod
+    def _file(path: str) -> bytes:
+        if split_ext(path)[1] == ".json":
+            with open(path, "rb") as fh:
+                return fh.read()
+        return json.dumps(read_record(path), separators=(",", ":")).encode()
+
+    def _limited(self, host: str) -> Tuple[bool, Dict[str, str]]:
+        """Count the request against the host's app windows; (over_limit, rate-limit headers)."""
+        now = time.monotonic()
+        with self.lock:
+            q = self.hits[host]
+            q.append(now)
+            longest = max(w for _, w in self.windows)
+            while q and q[0] <= now - longest:
+                q.popleft()
+            counts = [(n, w, sum(1 for t in q if t > now - w)) for n, w in self.windows]
+        headers = {"X-App-Rate-Limit": self.app_limits,
+                   "X-App-Rate-Limit-Count": ",".join(f"{c}:{int(w)}" for _, w, c in counts)}
+        if self.enforce:
+            for n, w, c in counts:
+                if c > n:
+                    return True, dict(headers, **{"Retry-After": str(int(w)), "X-Rate-Limit-Type": "application"})
+        return False, headers
+
+    def respond(self, host, path, query=None):
+        with self.lock:
+            self.requests.append((host, path))
+        query = query or {}
+        with self.rnd_lock:
+            delay = self.latency + (self.rnd.random() * self.jitter if self.jitter else 0.0)
+            roll = self.rnd.random()
+        if delay:
+            time.sleep(delay)
+        limited, headers = self._limited(host)
+        if limited:
+            self.faults["429_enforced"] += 1
+            return 429, {"status": {"message": "Rate limit exceeded", "status_code": 429}}, headers
+        if roll < self.p429:
+            self.faults["429"] += 1
+            return 429, {"status": {"message": "Rate limit exceeded", "status_code": 429}}, dict(headers, **{"Retry-After": str(self.retry_after), "X-Rate-Limit-Type": "method"})
+        if roll < self.p429 + self.p5xx:
+            self.faults["503"] += 1
+            return 503, {"status": {"message": "Service unavailable", "status_code": 503}}, headers
+        status, payload = self.route(host, path, query)
+        return status, payload, headers
+
+    def route(self, host: str, path: str, query: Dict[str, str]):
+        parts = [unquote(p) for p in path.strip("/").split("/")]
+        if path.startswith("/lol/status/v4/platform-data"):
+            return 200, {"id": host.upper(), "name": host, "maintenances": [], "incidents": []}
+        if path.startswith("/riot/account/v1/accounts/by-riot-id/") and len(parts) == 7:
+            puuid = self.riot_ids.get((parts[5].lower(), parts[6].lower()))
+            return (200, {k: self.accounts[puuid][k] for k in ("puuid", "gameName", "tagLine")}) if puuid else NOT_FOUND
+        if path.startswith("/riot/account/v1/accounts/by-puuid/"):
+            a = self.accounts.get(parts[-1])
+            return (200, {k: a[k] for k in ("puuid", "gameName", "tagLine")}) if a else NOT_FOUND
+        if path.startswith("/lol/summoner/v4/summoners/by-puuid/"):
+            a = self.accounts.get(parts[-1])
+            return (200, {"puuid": a["puuid"], "summonerLevel": a["summonerLevel"], "profileIconId": a["profileIconId"], "revisionDate": 0}) if a else NOT_FOUND
+        if path.startswith(MATCH + "by-puuid/") and path.endswith("/ids"):
+            games = self.by_puuid.get(parts[-2], [])
+            start, count = int(query.get("start", 0)), int(query.get("count", 20))
+            lo, hi = query.get("startTime"), query.get("endTime")
+            q = query.get("queue")
+            ids = [mid for created, queue_id, mid in games
+                   if (lo is None or created >= int(lo) * 1000) and (hi is None or created < int(hi) * 1000)
+                   and (q is None or queue_id == int(q))]
+            return 200, ids[start:start + count]
+        if path.startswith(MATCH) and path.endswith("/timeline"):
+            f = self.timelines.get(parts[-2])
+            return (200, self._file(f)) if f else NOT_FOUND
+        if path.startswith(MATCH):
+            f = self.matches.get(parts[-1])
+            return (200, self._file(f)) if f else NOT_FOUND
+        return NOT_FOUND
+
+
+def main():
+    p = argparse.ArgumentParser(description="Replay analysis_data as a local Riot API")
+    p.add_argument("--data", default="../analysis_data")
+    p.add_argument("--port", type=int, default=8089)
+    p.add_argument("--latency", type=float, default=0.0, help="Fixed delay per response (s)")
+    p.add_argument("--jitter", type=float, default=0.0, help="Extra uniform random delay (s)")
+    p.add_argument("--p429", type=float, default=0.0, help="Probability of a 429 with Retry-After")
+    p.add_argument("--retry-after", type=int, default=1)
+    p.add_argument("--p5xx", type=float, default=0.0, help="Probability of a 503")
+    p.add_argument("--app-limits", default="10000:1", help="X-App-Rate-Limit advertised (and enforced with --enforce)")
+    p.add_argument("--enforce", action="store_true", help="Answer 429 once the advertised app limit is exceeded")
+    p.add_argument("--players", type=int, default=0, help="Also print the Riot IDs of the N players with the most games, then a blank line")
+    a = p.parse_args()
+    server = ReplayRiotServer(a.data, a.latency, a.jitter, a.p429, a.retry_after, a.p5xx, a.app_limits, a.enforce, port=a.port)
+    with server:
+        print(f"listening on {server.base_url} ({len(server.matches)} matches, {len(server.timelines)} timelines, {len(server.accounts)} players)", flush=True)
+        if a.players:
+            print("\n".join(server.riot_id_of(pu) for pu in server.busiest_players(a.players)) + "\n", flush=True)
+        try:
+            server.thread.join()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -3,236 +3,356 @@ import sys
 import json
 import logging
 import argparse
-from riotkit.config import load_settings
-from riotkit.client import RiotClient
-from riotkit.endpoints import *
-from riotkit.fetcher import diagnose, fetch_profile
-from riotkit.io import save_json
+from contextlib import ExitStack
+from importlib import import_module
+from typing import Callable, NamedTuple, Optional, Tuple, Union
 
 def build_logger(level: str):
     logging.basicConfig(level=getattr(logging, level.upper(), 20), format="%(asctime)s %(levelname)s %(message)s")
 
-def main():
-    p = argparse.ArgumentParser(description="Riot API CLI - Complete endpoint coverage")
-    p.add_argument("--platform", default="euw1", help="Platform region (euw1, na1, etc.)")
-    p.add_argument("--region", default="europe", help="Regional routing (europe, americas, asia)")
-    p.add_argument("--log-level", default="INFO", help="Log level (DEBUG, INFO, WARNING, ERROR)")
-    sub = p.add_subparsers(dest="cmd", help="Available commands")
+def arg(*flags, **kw):
+    return flags, kw
 
-    # Diagnose
-    sp = sub.add_parser("diagnose", help="Check API key and platform status")
-    sp.add_argument("--stdout", action="store_true", help="Print output to stdout")
+# Shared arguments
+OUTPUT = (arg("--save", action="store_true", help="Save to file"), arg("--stdout", action="store_true", help="Print output to stdout"))
+RIOT_ID = arg("--riot-id", required=True, help="Riot ID (Name#Tag)")
+PUUID = arg("--puuid", required=True, help="Player PUUID")
+SUMMONER_ID = arg("--summoner-id", required=True, help="Summoner ID")
+MATCH_ID = arg("--match-id", required=True, help="Match ID")
+QUEUE = arg("--queue", required=True, help="Queue type")
+PAGE = arg("--page", type=int, default=1, help="Page number")
+WORKERS = arg("--workers", type=int, default=8, help="Parallel requests (default: 8)")
+COMPACT = arg("--compact", action="store_true", help="Keep only the projected fields (riotkit/projection.py)")
 
-    # Account
-    ap = sub.add_parser("account", help="Account operations")
-    asp = ap.add_subparsers(dest="sub", help="Account subcommands")
-    a1 = asp.add_parser("by-riot-id", help="Get account by Riot ID")
-    a1.add_argument("--riot-id", required=True, help="Riot ID (Name#Tag)")
-    a1.add_argument("--save", action="store_true", help="Save to file")
-    a1.add_argument("--stdout", action="store_true", help="Print output to stdout")
-    a2 = asp.add_parser("by-puuid", help="Get account by PUUID")
-    a2.add_argument("--puuid", required=True, help="Player PUUID")
-    a2.add_argument("--save", action="store_true", help="Save to file")
-    a2.add_argument("--stdout", action="store_true", help="Print output to stdout")
-    a3 = asp.add_parser("active-shard", help="Get active shard")
-    a3.add_argument("--game", default="lol", help="Game (default: lol)")
-    a3.add_argument("--puuid", required=True, help="Player PUUID")
-    a3.add_argument("--save", action="store_true", help="Save to file")
-    a3.add_argument("--stdout", action="store_true", help="Print output to stdout")
+class Command(NamedTuple):
+    name: str
+    sub: Optional[str]
+    help: str
+    # "module:function" called as function(client, *params), imported only when dispatched,
+    # or a handler(args) below for commands that do more than one call
+    target: Union[str, Callable]
+    params: Tuple[str, ...] = ()
+    args: Tuple = OUTPUT
+    category: Optional[str] = None
+    stem: Optional[str] = None
 
-    # Summoner
-    su = sub.add_parser("summoner", help="Summoner operations")
-    ssp = su.add_subparsers(dest="sub", help="Summoner subcommands")
-    s1 = ssp.add_parser("by-puuid", help="Get summoner by PUUID")
-    s1.add_argument("--puuid", required=True, help="Player PUUID")
-    s1.add_argument("--save", action="store_true", help="Save to file")
-    s1.add_argument("--stdout", action="store_true", help="Print output to stdout")
-    s2 = ssp.add_parser("by-id", help="Get summoner by ID")
-    s2.add_argument("--summoner-id", required=True, help="Summoner ID")
-    s2.add_argument("--save", action="store_true", help="Save to file")
-    s2.add_argument("--stdout", action="store_true", help="Print output to stdout")
+GROUPS = {
+    "account": ("Account operations", "Account subcommands"),
+    "summoner": ("Summoner operations", "Summoner subcommands"),
+    "champion": ("Champion operations", "Champion subcommands"),
+    "cm": ("Champion mastery operations", "Champion mastery subcommands"),
+    "match": ("Match operations", "Match subcommands"),
+    "league": ("League operations", "League subcommands"),
+    "league-exp": ("League EXP operations", "League EXP subcommands"),
+    "storage": ("Local storage maintenance (no API key needed)", "Storage subcommands"),
+}
 
-    # Champion
-    ch = sub.add_parser("champion", help="Champion operations")
-    chsp = ch.add_subparsers(dest="sub", help="Champion subcommands")
-    cr = chsp.add_parser("rotation", help="Get champion rotations")
-    cr.add_argument("--save", action="store_true", help="Save to file")
-    cr.add_argument("--stdout", action="store_true", help="Print output to stdout")
+# Handlers
 
-    # Champion Mastery
-    cm = sub.add_parser("cm", help="Champion mastery operations")
-    cmsp = cm.add_subparsers(dest="sub", help="Champion mastery subcommands")
-    cma = cmsp.add_parser("all", help="Get all champion masteries")
-    cma.add_argument("--puuid", required=True, help="Player PUUID")
-    cma.add_argument("--save", action="store_true", help="Save to file")
-    cma.add_argument("--stdout", action="store_true", help="Print output to stdout")
-    cmb = cmsp.add_parser("by-champion", help="Get mastery for specific champion")
-    cmb.add_argument("--puuid", required=True, help="Player PUUID")
-    cmb.add_argument("--champion-id", type=int, required=True, help="Champion ID")
-    cmb.add_argument("--save", action="store_true", help="Save to file")
-    cmb.add_argument("--stdout", action="store_true", help="Print output to stdout")
-    cmt = cmsp.add_parser("top", help="Get top champion masteries")
-    cmt.add_argument("--puuid", required=True, help="Player PUUID")
-    cmt.add_argument("--count", type=int, default=3, help="Number of top champions")
-    cmt.add_argument("--save", action="store_true", help="Save to file")
-    cmt.add_argument("--stdout", action="store_true", help="Print output to stdout")
-    cms = cmsp.add_parser("score", help="Get total mastery score")
-    cms.add_argument("--puuid", required=True, help="Player PUUID")
-    cms.add_argument("--save", action="store_true", help="Save to file")
-    cms.add_argument("--stdout", action="store_true", help="Print output to stdout")
+def client_extra(r, pool_size: int) -> dict:
+    extra = {"base_url": r.base_url} if r.base_url else {}
+    if not r.no_adaptive:
+        from riotkit.adaptive import ConcurrencyController
+        extra["controller"] = ConcurrencyController(initial=min(4, pool_size), max_limit=pool_size)
+    return extra
 
-    # Match
-    m = sub.add_parser("match", help="Match operations")
-    msp = m.add_subparsers(dest="sub", help="Match subcommands")
-    mi = msp.add_parser("ids", help="Get match IDs")
-    mi.add_argument("--puuid", required=True, help="Player PUUID")
-    mi.add_argument("--start", type=int, default=0, help="Start index")
-    mi.add_argument("--count", type=int, default=20, help="Number of matches")
-    mi.add_argument("--save", action="store_true", help="Save to file")
-    mi.add_argument("--stdout", action="store_true", help="Print output to stdout")
-    mg = msp.add_parser("get", help="Get match details")
-    mg.add_argument("--match-id", required=True, help="Match ID")
-    mg.add_argument("--save", action="store_true", help="Save to file")
-    mg.add_argument("--stdout", action="store_true", help="Print output to stdout")
-    mt = msp.add_parser("timeline", help="Get match timeline")
-    mt.add_argument("--match-id", required=True, help="Match ID")
-    mt.add_argument("--save", action="store_true", help="Save to file")
-    mt.add_argument("--stdout", action="store_true", help="Print output to stdout")
+def make_client(r, pool_size: int = 10):
+    from riotkit.config import load_settings
+    from riotkit.cache import DiskCache, ResponseCache
+    from riotkit.client import RiotClient
+    s = load_settings()
+    cache = None if r.no_cache else ResponseCache(DiskCache(r.cache_dir))
+    return RiotClient(s.api_key, r.platform, r.region, pool_size=pool_size, cache=cache, **client_extra(r, pool_size))
 
-    # League
-    l = sub.add_parser("league", help="League operations")
-    lsp = l.add_subparsers(dest="sub", help="League subcommands")
-    l1 = lsp.add_parser("by-summoner", help="Get league entries by summoner")
-    l1.add_argument("--summoner-id", required=True, help="Summoner ID")
-    l1.add_argument("--save", action="store_true", help="Save to file")
-    l1.add_argument("--stdout", action="store_true", help="Print output to stdout")
-    l2 = lsp.add_parser("entries", help="Get league entries by queue/tier/division")
-    l2.add_argument("--queue", required=True, help="Queue type (RANKED_SOLO_5x5, etc.)")
-    l2.add_argument("--tier", required=True, help="Tier (DIAMOND, PLATINUM, etc.)")
-    l2.add_argument("--division", required=True, help="Division (I, II, III, IV)")
-    l2.add_argument("--page", type=int, default=1, help="Page number")
-    l2.add_argument("--save", action="store_true", help="Save to file")
-    l2.add_argument("--stdout", action="store_true", help="Print output to stdout")
-    l3 = lsp.add_parser("by-league-id", help="Get league by ID")
-    l3.add_argument("--league-id", required=True, help="League ID")
-    l3.add_argument("--save", action="store_true", help="Save to file")
-    l3.add_argument("--stdout", action="store_true", help="Print output to stdout")
-    lc = lsp.add_parser("challenger", help="Get challenger league")
-    lc.add_argument("--queue", required=True, help="Queue type")
-    lc.add_argument("--save", action="store_true", help="Save to file")
-    lc.add_argument("--stdout", action="store_true", help="Print output to stdout")
-    lg = lsp.add_parser("grandmaster", help="Get grandmaster league")
-    lg.add_argument("--queue", required=True, help="Queue type")
-    lg.add_argument("--save", action="store_true", help="Save to file")
-    lg.add_argument("--stdout", action="store_true", help="Print output to stdout")
-    lm = lsp.add_parser("master", help="Get master league")
-    lm.add_argument("--queue", required=True, help="Queue type")
-    lm.add_argument("--save", action="store_true", help="Save to file")
-    lm.add_argument("--stdout", action="store_true", help="Print output to stdout")
+def make_router(r, pool_size: int = 10):
+    from riotkit.config import load_settings
+    from riotkit.cache import DiskCache, ResponseCache
+    from riotkit.regions import RegionRouter
+    s = load_settings()
+    cache = None if r.no_cache else ResponseCache(DiskCache(r.cache_dir))
+    return RegionRouter(s.api_key, pool_size=pool_size, cache=cache, **client_extra(r, pool_size))
 
-    # League EXP
-    le = sub.add_parser("league-exp", help="League EXP operations")
-    les = le.add_subparsers(dest="sub", help="League EXP subcommands")
-    le1 = les.add_parser("entries", help="Get league EXP entries")
-    le1.add_argument("--queue", required=True, help="Queue type")
-    le1.add_argument("--tier", required=True, help="Tier")
-    le1.add_argument("--division", required=True, help="Division")
-    le1.add_argument("--page", type=int, default=1, help="Page number")
-    le1.add_argument("--save", action="store_true", help="Save to file")
-    le1.add_argument("--stdout", action="store_true", help="Print output to stdout")
+def emit(r, data, category, stem):
+    if getattr(r, "stdout", False):
+        print(json.dumps(data, indent=2, ensure_ascii=False))
+    else:
+        from riotkit.io import save_json
+        filename = save_json(category, stem, data)
+        print(f"Saved to {filename}")
+
+def run_match_get(r):
+    from riotkit.endpoints import match_by_id
+    out = match_by_id(make_client(r), r.match_id)
+    if r.db:
+        from riotkit.io import store_match
+        store_match(out, r.db)
+    emit(r, out, "match", f"get_{r.match_id}")
+
+def run_crawl(r):
+    from riotkit.crawler import CrawlConfig, Crawler, Frontier
+    from riotkit.endpoints import account_by_riot_id
+    from riotkit.store import MatchStore
+    from riotkit.storage import RecordStore
+    c = make_client(r, max(10, r.workers))
+    cfg = CrawlConfig(max_hops=r.hops, matches_per_player=r.per_player, fanout=r.fanout, max_matches=r.max_matches,
+                      queues=tuple(r.queue), patches=tuple(r.patch), workers=r.workers, compact=r.compact)
+    timelines = RecordStore(r.timelines, "timeline") if r.timelines else None
+    with MatchStore(r.db) as st:
+        cr = Crawler(c, st, Frontier(r.frontier), cfg, timelines)
+        seeds = list(r.seed_puuid)
+        for rid in r.seed:
+            game, tag = rid.split("#", 1)
+            seeds.append(account_by_riot_id(c, game, tag)["puuid"])
+        cr.seed(seeds)
+        out = cr.run()
+        cr.frontier.close()
+    print(json.dumps(out, indent=2))
+
+def run_batch_cmd(r):
+    from riotkit.batch import operation, read_ids, run_batch
+    fn = operation(r.op)
+    if r.multi_region and r.op not in ("match-get", "match-timeline"):
+        logging.getLogger("riot").error("--multi-region only applies to match-get and match-timeline")
+        sys.exit(2)
+    c = None if r.multi_region else make_client(r, max(10, r.workers))
+    call = (lambda i: fn(c, i, r.start, r.count)) if r.op == "match-ids" else (lambda i: fn(c, i))
+    ok = failed = 0
+    with ExitStack() as stack:
+        st = None
+        if r.db and r.op == "match-get":
+            from riotkit.store import MatchStore
+            st = stack.enter_context(MatchStore(r.db))
+        src = sys.stdin if r.input == "-" else stack.enter_context(open(r.input, encoding="utf-8"))
+        dst = sys.stdout if r.output == "-" else stack.enter_context(open(r.output, "w", encoding="utf-8"))
+        ids = read_ids(src, dedup=not r.no_dedup)
+        if r.multi_region:
+            results = make_router(r, max(10, r.workers)).map(fn, ids, workers=r.workers)
+        else:
+            results = run_batch(call, ids, r.workers)
+        for i, data, err in results:
+            if err is not None:
+                failed += 1
+                line = {"id": i, "error": str(err)}
+            elif st is not None:
+                ok += 1
+                line = {"id": i, "stored": st.add_match(data)}
+            else:
+                ok += 1
+                line = {"id": i, "data": data}
+            dst.write(json.dumps(line, ensure_ascii=False) + "\n")
+            dst.flush()
+    logging.getLogger("riot").info("batch %s ok=%s failed=%s", r.op, ok, failed)
+    if failed:
+        sys.exit(1)
+
+def run_ladder(r):
+    from riotkit.ladder import DIVISIONS, QUEUES, TIERS, LadderCrawler, LadderSnapshots
+    c = make_client(r, max(10, r.workers))
+    lc = LadderCrawler(c, r.queue or QUEUES, r.tier or TIERS, r.division or DIVISIONS, apex=not r.no_apex, exp=r.exp,
+                       workers=r.workers, max_pages=r.max_pages)
+    rows = lc.run()
+    out = LadderSnapshots(r.out, r.platform).save(rows, {"queues": lc.queues, "tiers": lc.tiers, "apex": lc.apex, "exp": r.exp}, lc.lost)
+    print(json.dumps(dict(out, stats=lc.stats), indent=2))
+
+def run_migrate(r):
+    from riotkit.storage import migrate
+    print(json.dumps(migrate(r.dir, r.codec, r.keep), indent=2))
+
+def run_project(r):
+    from riotkit.projection import project_dir
+    print(json.dumps(project_dir(r.dir, r.kind, r.raw_dir), indent=2))
+
+def run_pack(r):
+    from riotkit.segments import pack_dir
+    print(json.dumps(pack_dir(r.dir, r.out, r.kind, r.codec, r.segment_mb << 20), indent=2))
+
+def run_compact(r):
+    from riotkit.segments import SegmentStore
+    with SegmentStore(r.dir, r.kind) as st:
+        print(json.dumps(st.compact(), indent=2))
 
+def run_index(r):
+    from riotkit.store import MatchStore
+    with MatchStore(r.db) as st:
+        print(json.dumps({"indexed": st.import_dir(r.dir)}, indent=2))
+
+def run_frames(r):
+    from riotkit.frames import build_cache
+    print(json.dumps({"cached": build_cache(r.dir, r.refresh)}, indent=2))
+
+def run_prune_cache(r):
+    from riotkit.cache import DiskCache
+    print(json.dumps({"pruned": DiskCache(r.dir).prune()}, indent=2))
+
+# Registry: one entry per command, the parser and the dispatch are both built from it.
+# Kept free of riotkit imports so `--help` and offline commands never load requests.
+
+EP = "riotkit.endpoints:"
+BATCH_OPS = ("account-by-puuid", "cm-all", "cm-score", "league-by-summoner", "match-get", "match-ids", "match-timeline", "summoner-by-id", "summoner-by-puuid")
+CODEC_NAMES = ("gzip", "json", "msgpack", "zstd")
+
+COMMANDS = (
+    Command("diagnose", None, "Check API key and platform status", "riotkit.fetcher:diagnose", (), (OUTPUT[1],), "status", "diagnose"),
+    # Account
+    Command("account", "by-riot-id", "Get account by Riot ID", EP + "account_by_riot_id", ("game", "tag"), (RIOT_ID,) + OUTPUT, "account", "by-riot-id_{game}_{tag}"),
+    Command("account", "by-puuid", "Get account by PUUID", EP + "account_by_puuid", ("puuid",), (PUUID,) + OUTPUT, "account", "by-puuid_{puuid}"),
+    Command("account", "active-shard", "Get active shard", EP + "account_active_shard", ("game", "puuid"),
+            (arg("--game", default="lol", help="Game (default: lol)"), PUUID) + OUTPUT, "account", "active-shard_{game}_{puuid}"),
+    # Summoner
+    Command("summoner", "by-puuid", "Get summoner by PUUID", EP + "summoner_by_puuid", ("puuid",), (PUUID,) + OUTPUT, "summoner", "by-puuid_{puuid}"),
+    Command("summoner", "by-id", "Get summoner by ID", EP + "summoner_by_id", ("summoner_id",), (SUMMONER_ID,) + OUTPUT, "summoner", "by-id_{summoner_id}"),
+    # Champion
+    Command("champion", "rotation", "Get champion rotations", EP + "champion_rotation", (), OUTPUT, "champion", "rotations"),
+    # Champion Mastery
+    Command("cm", "all", "Get all champion masteries", EP + "champion_mastery_all", ("puuid",), (PUUID,) + OUTPUT, "champion-mastery", "all_{puuid}"),
+    Command("cm", "by-champion", "Get mastery for specific champion", EP + "champion_mastery_by_champion", ("puuid", "champion_id"),
+            (PUUID, arg("--champion-id", type=int, required=True, help="Champion ID")) + OUTPUT, "champion-mastery", "one_{puuid}_{champion_id}"),
+    Command("cm", "top", "Get top champion masteries", EP + "champion_mastery_top", ("puuid", "count"),
+            (PUUID, arg("--count", type=int, default=3, help="Number of top champions")) + OUTPUT, "champion-mastery", "top_{puuid}_{count}"),
+    Command("cm", "score", "Get total mastery score", EP + "champion_mastery_score", ("puuid",), (PUUID,) + OUTPUT, "champion-mastery", "score_{puuid}"),
+    # Match
+    Command("match", "ids", "Get match IDs", EP + "match_ids_by_puuid", ("puuid", "start", "count"),
+            (PUUID, arg("--start", type=int, default=0, help="Start index"), arg("--count", type=int, default=20, help="Number of matches")) + OUTPUT,
+            "match", "ids_{puuid}_{start}_{count}"),
+    Command("match", "get", "Get match details", run_match_get, (),
+            (MATCH_ID, arg("--db", help="Also index the match into this SQLite store (e.g. data/matches.sqlite)")) + OUTPUT),
+    Command("match", "timeline", "Get match timeline", EP + "match_timeline", ("match_id",), (MATCH_ID,) + OUTPUT, "match", "timeline_{match_id}"),
+    # League
+    Command("league", "by-summoner", "Get league entries by summoner", EP + "league_by_summoner", ("summoner_id",), (SUMMONER_ID,) + OUTPUT, "league", "entries_summ_{summoner_id}"),
+    Command("league", "entries", "Get league entries by queue/tier/division", EP + "league_entries", ("queue", "tier", "division", "page"),
+            (arg("--queue", required=True, help="Queue type (RANKED_SOLO_5x5, etc.)"), arg("--tier", required=True, help="Tier (DIAMOND, PLATINUM, etc.)"),
+             arg("--division", required=True, help="Division (I, II, III, IV)"), PAGE) + OUTPUT, "league", "entries_{queue}_{tier}_{division}_{page}"),
+    Command("league", "by-league-id", "Get league by ID", EP + "league_by_league_id", ("league_id",),
+            (arg("--league-id", required=True, help="League ID"),) + OUTPUT, "league", "by-league-id_{league_id}"),
+    Command("league", "challenger", "Get challenger league", EP + "league_challenger", ("queue",), (QUEUE,) + OUTPUT, "league", "challenger_{queue}"),
+    Command("league", "grandmaster", "Get grandmaster league", EP + "league_grandmaster", ("queue",), (QUEUE,) + OUTPUT, "league", "grandmaster_{queue}"),
+    Command("league", "master", "Get master league", EP + "league_master", ("queue",), (QUEUE,) + OUTPUT, "league", "master_{queue}"),
+    # League EXP
+    Command("league-exp", "entries", "Get league EXP entries", EP + "league_exp_entries", ("queue", "tier", "division", "page"),
+            (QUEUE, arg("--tier", required=True, help="Tier"), arg("--division", required=True, help="Division"), PAGE) + OUTPUT,
+            "league-exp", "entries_{queue}_{tier}_{division}_{page}"),
     # Profile (legacy)
-    pf = sub.add_parser("profile", help="Get complete profile (legacy)")
-    pf.add_argument("--riot-id", required=True, help="Riot ID (Name#Tag)")
-    pf.add_argument("--count", type=int, default=10, help="Number of matches")
-    pf.add_argument("--save", action="store_true", help="Save to file")
-    pf.add_argument("--stdout", action="store_true", help="Print output to stdout")
+    Command("profile", None, "Get complete profile (legacy)", "riotkit.fetcher:fetch_profile", ("riot_id", "count", "workers", "compact"),
+            (RIOT_ID, arg("--count", type=int, default=10, help="Number of matches"), WORKERS, COMPACT) + OUTPUT, "profile", "profile_{riot_id}"),
+    # Crawl
+    Command("crawl", None, "Multi-hop crawl from seed players into a SQLite store", run_crawl, (), (
+        arg("--seed", nargs="+", default=[], help="Seed Riot IDs (Name#Tag)"),
+        arg("--seed-puuid", nargs="+", default=[], help="Seed PUUIDs"),
+        arg("--hops", type=int, default=2, help="Max hops from the seeds (default: 2)"),
+        arg("--per-player", type=int, default=20, help="Match IDs listed per player (default: 20)"),
+        arg("--fanout", type=int, default=9, help="New players queued per match (default: 9)"),
+        arg("--max-matches", type=int, help="Stop after this many matches"),
+        arg("--queue", type=int, action="append", default=[], help="Keep only this queue ID (repeatable)"),
+        arg("--patch", action="append", default=[], help="Keep only this patch, e.g. 15.20 (repeatable)"),
+        arg("--db", default="data/matches.sqlite", help="SQLite match store"),
+        arg("--frontier", default="data/frontier.sqlite", help="Frontier database (resumable)"),
+        arg("--timelines", help="Also save timelines into this directory"),
+        WORKERS,
+        COMPACT,
+    )),
+    # Batch
+    Command("batch", None, "Run one operation over many IDs (file or stdin) with one pooled client", run_batch_cmd, (), (
+        arg("op", choices=BATCH_OPS, help="Operation to run for every ID"),
+        arg("--input", default="-", help="File with one ID per line (default: stdin)"),
+        arg("--output", default="-", help="JSON lines output file (default: stdout)"),
+        WORKERS,
+        arg("--start", type=int, default=0, help="match-ids: start index"),
+        arg("--count", type=int, default=20, help="match-ids: IDs per player"),
+        arg("--db", help="match-get: write matches into this SQLite store instead of printing them"),
+        arg("--multi-region", action="store_true", help="match-get/match-timeline: route each ID by its prefix (EUW1_, KR_, ...) and run regions in parallel"),
+        arg("--no-dedup", action="store_true", help="Keep duplicate IDs instead of remembering every ID seen (constant memory on endless inputs)"),
+    )),
+    # Ladder
+    Command("ladder", None, "Snapshot the full ranked ladder (all tiers/divisions, pages fetched concurrently) and diff it with the previous one", run_ladder, (), (
+        arg("--queue", action="append", default=[], help="Queue type (repeatable, default: RANKED_SOLO_5x5 and RANKED_FLEX_SR)"),
+        arg("--tier", action="append", default=[], help="Tier below master (repeatable, default: DIAMOND to IRON)"),
+        arg("--division", action="append", default=[], help="Division (repeatable, default: I to IV)"),
+        arg("--no-apex", action="store_true", help="Skip the challenger/grandmaster/master leagues"),
+        arg("--exp", action="store_true", help="Use league-exp entries instead of league entries"),
+        arg("--max-pages", type=int, help="Stop each bracket after this many pages (capped brackets are listed as lost)"),
+        arg("--out", default=os.path.join("data", "ladder"), help="Snapshot directory (default: data/ladder)"),
+        WORKERS,
+    )),
+    # Storage (offline)
+    Command("storage", "migrate", "Convert a directory of records (e.g. analysis_data/timelines) to another format", run_migrate, (), (
+        arg("--dir", required=True, help="Directory to migrate"),
+        arg("--codec", default="gzip", choices=CODEC_NAMES, help="Target format (default: gzip)"),
+        arg("--keep", action="store_true", help="Keep the original files"),
+    )),
+    Command("storage", "project", "Strip saved matches or timelines down to the projected fields, in place", run_project, (), (
+        arg("--dir", required=True, help="Directory of match_* or timeline_* records"),
+        arg("--kind", required=True, choices=("match", "timeline"), help="Record kind"),
+        arg("--raw-dir", help="Keep a compressed copy of the full payloads here first"),
+    )),
+    Command("storage", "pack", "Append a directory of match/timeline files to an append-only segment store", run_pack, (), (
+        arg("--dir", required=True, help="Directory of match_* or timeline_* records"),
+        arg("--out", required=True, help="Segment store directory (created or appended to)"),
+        arg("--kind", default="match", choices=("match", "timeline"), help="Record kind (default: match)"),
+        arg("--codec", default="json", choices=CODEC_NAMES, help="Record encoding for a new store (default: json, compact)"),
+        arg("--segment-mb", type=int, default=256, help="Segment file size (default: 256 MB)"),
+    )),
+    Command("storage", "compact", "Rewrite a segment store without superseded records", run_compact, (), (
+        arg("--dir", required=True, help="Segment store directory"),
+        arg("--kind", default="match", choices=("match", "timeline"), help="Record kind (default: match)"),
+    )),
+    Command("storage", "index", "Index a directory of match files into a SQLite store", run_index, (), (
+        arg("--dir", required=True, help="Matches directory (e.g. analysis_data/matches)"),
+        arg("--db", required=True, help="SQLite store path (e.g. analysis_data/matches.sqlite)"),
+    )),
+    Command("storage", "frames", "Build the .npz frame array cache for a timelines directory", run_frames, (), (
+        arg("--dir", required=True, help="Timelines directory"),
+        arg("--refresh", action="store_true", help="Rebuild existing caches"),
+    )),
+    Command("storage", "prune-cache", "Delete expired entries from the response cache", run_prune_cache, (), (
+        arg("--dir", default=os.path.join("data", "cache"), help="Response cache directory"),
+    )),
+)
 
-    r = p.parse_args()
-    build_logger(r.log_level)
-    s = load_settings()
-    c = RiotClient(s.api_key, r.platform, r.region)
+REGISTRY = {(c.name, c.sub): c for c in COMMANDS}
 
-    # Helper function to save data
-    def save_data(data, category, stem):
-        if getattr(r, 'stdout', False):
-            print(json.dumps(data, indent=2, ensure_ascii=False))
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Riot API CLI - Complete endpoint coverage")
+    p.add_argument("--platform", default="euw1", help="Platform region (euw1, na1, etc.)")
+    p.add_argument("--region", default="europe", help="Regional routing (europe, americas, asia)")
+    p.add_argument("--log-level", default="INFO", help="Log level (DEBUG, INFO, WARNING, ERROR)")
+    p.add_argument("--cache-dir", default=os.path.join("data", "cache"), help="Response cache directory (default: data/cache)")
+    p.add_argument("--no-cache", action="store_true", help="Always query the API")
+    p.add_argument("--base-url", help="API URL template with a {host} placeholder (e.g. a local mock server)")
+    p.add_argument("--no-adaptive", action="store_true", help="Disable adaptive concurrency and the per-host circuit breaker")
+    sub = p.add_subparsers(dest="cmd", help="Available commands")
+    groups = {}
+    for c in COMMANDS:
+        if c.sub is None:
+            sp = sub.add_parser(c.name, help=c.help)
         else:
-            filename = save_json(category, stem, data)
-            print(f"Saved to {filename}")
-
-    # Route commands
-    if r.cmd == "diagnose":
-        out = diagnose(c)
-        save_data(out, "status", "diagnose")
-    elif r.cmd == "account" and r.sub == "by-riot-id":
-        game, tag = r.riot_id.split("#", 1)
-        out = account_by_riot_id(c, game, tag)
-        save_data(out, "account", f"by-riot-id_{game}_{tag}")
-    elif r.cmd == "account" and r.sub == "by-puuid":
-        out = account_by_puuid(c, r.puuid)
-        save_data(out, "account", f"by-puuid_{r.puuid}")
-    elif r.cmd == "account" and r.sub == "active-shard":
-        out = account_active_shard(c, r.game, r.puuid)
-        save_data(out, "account", f"active-shard_{r.game}_{r.puuid}")
-    elif r.cmd == "summoner" and r.sub == "by-puuid":
-        out = summoner_by_puuid(c, r.puuid)
-        save_data(out, "summoner", f"by-puuid_{r.puuid}")
-    elif r.cmd == "summoner" and r.sub == "by-id":
-        out = summoner_by_id(c, r.summoner_id)
-        save_data(out, "summoner", f"by-id_{r.summoner_id}")
-    elif r.cmd == "champion" and r.sub == "rotation":
-        out = champion_rotation(c)
-        save_data(out, "champion", "rotations")
-    elif r.cmd == "cm" and r.sub == "all":
-        out = champion_mastery_all(c, r.puuid)
-        save_data(out, "champion-mastery", f"all_{r.puuid}")
-    elif r.cmd == "cm" and r.sub == "by-champion":
-        out = champion_mastery_by_champion(c, r.puuid, r.champion_id)
-        save_data(out, "champion-mastery", f"one_{r.puuid}_{r.champion_id}")
-    elif r.cmd == "cm" and r.sub == "top":
-        out = champion_mastery_top(c, r.puuid, r.count)
-        save_data(out, "champion-mastery", f"top_{r.puuid}_{r.count}")
-    elif r.cmd == "cm" and r.sub == "score":
-        out = champion_mastery_score(c, r.puuid)
-        save_data(out, "champion-mastery", f"score_{r.puuid}")
-    elif r.cmd == "match" and r.sub == "ids":
-        out = match_ids_by_puuid(c, r.puuid, r.start, r.count)
-        save_data(out, "match", f"ids_{r.puuid}_{r.start}_{r.count}")
-    elif r.cmd == "match" and r.sub == "get":
-        out = match_by_id(c, r.match_id)
-        save_data(out, "match", f"get_{r.match_id}")
-    elif r.cmd == "match" and r.sub == "timeline":
-        out = match_timeline(c, r.match_id)
-        save_data(out, "match", f"timeline_{r.match_id}")
-    elif r.cmd == "league" and r.sub == "by-summoner":
-        out = league_by_summoner(c, r.summoner_id)
-        save_data(out, "league", f"entries_summ_{r.summoner_id}")
-    elif r.cmd == "league" and r.sub == "entries":
-        out = league_entries(c, r.queue, r.tier, r.division, r.page)
-        save_data(out, "league", f"entries_{r.queue}_{r.tier}_{r.division}_{r.page}")
-    elif r.cmd == "league" and r.sub == "by-league-id":
-        out = league_by_league_id(c, r.league_id)
-        save_data(out, "league", f"by-league-id_{r.league_id}")
-    elif r.cmd == "league" and r.sub == "challenger":
-        out = league_challenger(c, r.queue)
-        save_data(out, "league", f"challenger_{r.queue}")
-    elif r.cmd == "league" and r.sub == "grandmaster":
-        out = league_grandmaster(c, r.queue)
-        save_data(out, "league", f"grandmaster_{r.queue}")
-    elif r.cmd == "league" and r.sub == "master":
-        out = league_master(c, r.queue)
-        save_data(out, "league", f"master_{r.queue}")
-    elif r.cmd == "league-exp" and r.sub == "entries":
-        out = league_exp_entries(c, r.queue, r.tier, r.division, r.page)
-        save_data(out, "league-exp", f"entries_{r.queue}_{r.tier}_{r.division}_{r.page}")
-    elif r.cmd == "profile":
-        out = fetch_profile(c, r.riot_id, r.count)
-        save_data(out, "profile", f"profile_{r.riot_id.replace('#', '_')}")
-    else:
+            if c.name not in groups:
+                group_help, sub_help = GROUPS[c.name]
+                groups[c.name] = sub.add_parser(c.name, help=group_help).add_subparsers(dest="sub", help=sub_help)
+            sp = groups[c.name].add_parser(c.sub, help=c.help)
+        for flags, kw in c.args:
+            sp.add_argument(*flags, **kw)
+    return p
+
+def resolve(target: str) -> Callable:
+    module, _, name = target.partition(":")
+    return getattr(import_module(module), name)
+
+def main(argv=None):
+    p = build_parser()
+    r = p.parse_args(argv)
+    build_logger(r.log_level)
+
+    cmd = REGISTRY.get((r.cmd, getattr(r, "sub", None)))
+    if cmd is None:
         logging.getLogger("riot").error("Invalid command")
         p.print_help()
         sys.exit(2)
+    if callable(cmd.target):
+        return cmd.target(r)
+    if "tag" in cmd.params:
+        r.game, r.tag = r.riot_id.split("#", 1)
+    out = resolve(cmd.target)(make_client(r), *[getattr(r, k) for k in cmd.params])
+    emit(r, out, cmd.category, cmd.stem.format(**vars(r)))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -3,6 +3,8 @@ __all__ = [
     "Settings",
     "load_settings",
     "RiotClient",
+    "RateLimiter",
+    "AsyncRiotClient",
     # Status
     "status_probe",
     # Account
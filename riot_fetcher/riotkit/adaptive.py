@@ -0,0 +1,181 @@
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+from . import RiotError
+
+# release() outcomes: any answer from the server but 429 / 5xx, a 429, a 5xx or network error
+OK, THROTTLED, ERROR = "ok", "throttled", "error"
+
+
+def backoff(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """Exponential backoff with full-range jitter: uniform in [d/2, d], d = min(cap, base * 2**attempt)."""
+    d = min(cap, base * 2 ** attempt)
+    return random.uniform(d / 2, d)
+
+
+class CircuitOpenError(RiotError):
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"circuit open for {host}, retry in {retry_in:.1f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+def through_circuit(fn: Callable, *args, **kwargs):
+    """fn(*args, **kwargs), sleeping out CircuitOpenError instead of failing.
+
+    For work that must not be dropped while a host's circuit is open (crawls): the call
+    is made again once the cooldown is over, when one of the waiting calls becomes the probe.
+    """
+    while True:
+        try:
+            return fn(*args, **kwargs)
+        except CircuitOpenError as e:
+            logging.getLogger("riot").debug("%s: waiting", e)
+            time.sleep(max(e.retry_in, 0.05))
+
+
+class HostState:
+    """AIMD concurrency limit, latency averages and circuit breaker for one routing host."""
+
+    __slots__ = ("limit", "inflight", "fast", "slow", "samples", "last_cut", "failures", "state", "opened_at", "cooldown",
+                 "probing", "cuts", "trips")
+
+    def __init__(self, limit: float):
+        self.limit = limit
+        self.inflight = 0
+        self.fast = 0.0
+        self.slow = 0.0
+        self.samples = 0
+        self.last_cut = float("-inf")
+        self.failures = 0
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.cooldown = 0.0
+        self.probing = False
+        self.cuts = 0
+        self.trips = 0
+
+
+class ConcurrencyController:
+    """Per-host adaptive concurrency (AIMD) with a circuit breaker.
+
+    Each routing host has a limit on requests in flight. A healthy response that used the
+    whole limit raises it by 1 until the first cut (slow start), then by 1/limit (about +1
+    per round of requests). A 429, a 5xx or network error, or a latency spike (short
+    latency average above `latency_tolerance` times the long one) multiplies it by
+    `decrease`, at most once per long-average latency so one burst of failures counts
+    once. The rate limiter still enforces Riot's budgets; this only decides how many
+    requests are worth having in flight.
+
+    `failure_threshold` consecutive 5xx/network errors on a host open its circuit: calls
+    fail fast with CircuitOpenError for `cooldown` seconds (doubling on each re-trip, up to
+    `max_cooldown`), then one probe is let through, and its success closes the circuit.
+    Other hosts are unaffected. CircuitOpenError is transient: callers that must not drop
+    work wrap their calls in through_circuit().
+    """
+
+    def __init__(self, initial: int = 4, min_limit: int = 1, max_limit: int = 32, decrease: float = 0.7,
+                 latency_tolerance: float = 2.5, failure_threshold: int = 5, cooldown: float = 5.0, max_cooldown: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.initial = max(min_limit, min(initial, max_limit))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock
+        self.hosts: Dict[str, HostState] = {}
+        self.cond = threading.Condition()
+        self.log = logging.getLogger("riot")
+
+    def _host(self, host: str) -> HostState:
+        st = self.hosts.get(host)
+        if st is None:
+            st = self.hosts[host] = HostState(float(self.initial))
+        return st
+
+    def _admit(self, st: HostState, host: str) -> bool:
+        """True to send now, False to wait for a slot; raises while the circuit is open."""
+        if st.state == "open":
+            remaining = st.opened_at + st.cooldown - self.clock()
+            if remaining > 0:
+                raise CircuitOpenError(host, remaining)
+            st.state = "half_open"
+        if st.state == "half_open":
+            if st.probing:
+                raise CircuitOpenError(host, 0.0)
+            st.probing = True
+            st.inflight += 1
+            return True
+        if st.inflight < int(st.limit):
+            st.inflight += 1
+            return True
+        return False
+
+    def try_acquire(self, host: str) -> bool:
+        with self.cond:
+            return self._admit(self._host(host), host)
+
+    def acquire(self, host: str, timeout: Optional[float] = None) -> float:
+        """Block until a slot is free on host; returns the seconds waited."""
+        t0 = time.monotonic()
+        with self.cond:
+            st = self._host(host)
+            while not self._admit(st, host):
+                left = None if timeout is None else timeout - (time.monotonic() - t0)
+                if left is not None and left <= 0:
+                    raise RiotError(f"no concurrency slot for {host} after {timeout}s")
+                self.cond.wait(left)
+        return time.monotonic() - t0
+
+    def release(self, host: str, latency: float, outcome: str = OK):
+        now = self.clock()
+        with self.cond:
+            st = self._host(host)
+            st.inflight = max(0, st.inflight - 1)
+            full = st.inflight + 1 >= int(st.limit)
+            if outcome != THROTTLED:
+                st.samples += 1
+                st.fast = latency if st.samples == 1 else st.fast + 0.3 * (latency - st.fast)
+                st.slow = latency if st.samples == 1 else st.slow + 0.05 * (latency - st.slow)
+            spike = st.samples >= 10 and st.fast > self.latency_tolerance * st.slow
+            if outcome == ERROR:
+                st.failures += 1
+                if st.state == "half_open" or (st.state == "closed" and st.failures >= self.failure_threshold):
+                    self._trip(st, host, now)
+            elif outcome == OK:
+                st.failures = 0
+                if st.state == "half_open":
+                    st.state, st.probing, st.cooldown = "closed", False, 0.0
+                    self.log.info("circuit closed host=%s", host)
+            elif st.state == "half_open":
+                st.probing = False  # a 429 says nothing about health: let another probe through
+            if outcome != OK or spike:
+                if now - st.last_cut >= max(st.slow, 0.05):
+                    st.limit = max(float(self.min_limit), st.limit * self.decrease)
+                    st.last_cut = now
+                    st.cuts += 1
+            elif full:
+                # slow start: +1 per response until the first cut, then +1 per round
+                st.limit = min(float(self.max_limit), st.limit + (1.0 if not st.cuts else 1.0 / st.limit))
+            self.cond.notify_all()
+
+    def _trip(self, st: HostState, host: str, now: float):
+        st.cooldown = min(self.max_cooldown, st.cooldown * 2 if st.cooldown else self.base_cooldown)
+        st.state, st.opened_at, st.probing = "open", now, False
+        st.failures = 0
+        st.trips += 1
+        self.log.warning("circuit open host=%s cooldown=%.1fs", host, st.cooldown)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self.cond:
+            return {
+                h: {"limit": round(st.limit, 2), "inflight": st.inflight, "state": st.state,
+                    "latency_fast_ms": round(st.fast * 1000, 1), "latency_slow_ms": round(st.slow * 1000, 1),
+                    "cuts": st.cuts, "trips": st.trips}
+                for h, st in sorted(self.hosts.items())
+            }
@@ -0,0 +1,120 @@
+import os
+import threading
+from typing import Dict, Iterable, Iterator, Optional
+from .projection import Projection
+from .storage import read_record, split_ext
+
+# Every field StatsAggregator.add_match() reads. Projecting matches to them first (e.g. as the
+# load_corpus transform) sends a few hundred bytes per match back from the worker processes.
+AGGREGATED_FIELDS = ("metadata.matchId", "info.gameDuration", "info.gameMode", "info.queueId") + tuple(
+    "info.participants." + f for f in ("puuid", "championName", "teamPosition", "kills", "deaths", "assists", "goldEarned",
+                                       "totalDamageDealtToChampions", "visionScore"))
+AGGREGATED = Projection(AGGREGATED_FIELDS)
+
+
+class StatsAggregator:
+    """Single-pass player/champion aggregates in the complete_analysis.json layout.
+
+    Matches are folded in as they arrive and then dropped; only the aggregates
+    (and, if keep_match_rows, the small per-match summary rows) stay in memory.
+    """
+
+    def __init__(self, keep_match_rows: bool = True):
+        self.keep_match_rows = keep_match_rows
+        self.matches = 0
+        self.player_stats: Dict[str, Dict] = {}
+        self.champion_stats: Dict[str, Dict] = {}
+        self.match_analysis = []
+        self.lock = threading.Lock()
+
+    def add_match(self, match: Dict):
+        info = match.get("info", {})
+        participants = info.get("participants", [])
+        rows = []
+        with self.lock:
+            self.matches += 1
+            for p in participants:
+                puuid = p.get("puuid")
+                if puuid:
+                    st = self.player_stats.get(puuid)
+                    if st is None:
+                        st = self.player_stats[puuid] = {
+                            "matches_played": 0,
+                            "total_kills": 0,
+                            "total_deaths": 0,
+                            "total_assists": 0,
+                            "total_gold": 0,
+                            "total_damage": 0,
+                            "champions_played": set(),
+                        }
+                    st["matches_played"] += 1
+                    st["total_kills"] += p.get("kills", 0)
+                    st["total_deaths"] += p.get("deaths", 0)
+                    st["total_assists"] += p.get("assists", 0)
+                    st["total_gold"] += p.get("goldEarned", 0)
+                    st["total_damage"] += p.get("totalDamageDealtToChampions", 0)
+                    st["champions_played"].add(p.get("championName", "Unknown"))
+
+                    champion = p.get("championName")
+                    cs = self.champion_stats.get(champion)
+                    if cs is None:
+                        cs = self.champion_stats[champion] = {"times_played": 0, "total_kills": 0, "total_deaths": 0, "total_assists": 0}
+                    cs["times_played"] += 1
+                    cs["total_kills"] += p.get("kills", 0)
+                    cs["total_deaths"] += p.get("deaths", 0)
+                    cs["total_assists"] += p.get("assists", 0)
+
+                if self.keep_match_rows:
+                    rows.append({
+                        "puuid": p.get("puuid"),
+                        "championName": p.get("championName"),
+                        "teamPosition": p.get("teamPosition"),
+                        "kills": p.get("kills", 0),
+                        "deaths": p.get("deaths", 0),
+                        "assists": p.get("assists", 0),
+                        "goldEarned": p.get("goldEarned", 0),
+                        "totalDamageDealtToChampions": p.get("totalDamageDealtToChampions", 0),
+                        "visionScore": p.get("visionScore", 0),
+                    })
+            if self.keep_match_rows:
+                self.match_analysis.append({
+                    "matchId": match.get("metadata", {}).get("matchId"),
+                    "gameDuration": info.get("gameDuration"),
+                    "gameMode": info.get("gameMode"),
+                    "queueId": info.get("queueId"),
+                    "participants": rows,
+                })
+
+    def add_matches(self, matches: Iterable[Dict]) -> "StatsAggregator":
+        for m in matches:
+            self.add_match(m)
+        return self
+
+    def result(self) -> Dict:
+        with self.lock:
+            players = {k: dict(v, champions_played=list(v["champions_played"])) for k, v in self.player_stats.items()}
+            return {
+                "player_stats": players,
+                "champion_stats": {k: dict(v) for k, v in self.champion_stats.items()},
+                "match_analysis": list(self.match_analysis),
+            }
+
+
+def iter_match_files(directory, prefix: str = "match_") -> Iterator[Dict]:
+    """Yield match payloads one at a time from a directory of records (any storage codec) or a packed segment store."""
+    from .segments import SegmentStore, is_segment_dir
+    kind = prefix.rstrip("_")
+    if is_segment_dir(directory, kind):
+        with SegmentStore(directory, kind, readonly=True) as st:
+            yield from st.values()
+        return
+    for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+        if entry.name.startswith(prefix) and split_ext(entry.name)[1]:
+            yield read_record(entry.path)
+
+
+def iter_store_matches(store, match_ids: Optional[Iterable[str]] = None) -> Iterator[Dict]:
+    for mid in (match_ids if match_ids is not None else sorted(store.match_ids())):
+        m = store.get_match(mid)
+        if m is not None:
+            yield m
@@ -0,0 +1,187 @@
+import json
+import time
+import asyncio
+from typing import Any, Dict, List, Optional
+from . import RiotError
+from . import endpoints as ep
+from .adaptive import ERROR, OK, THROTTLED, ConcurrencyController, backoff
+from .cache import ResponseCache, cache_key
+from .client import BASE_URL, BaseClient, retry_after
+from .flight import AsyncSingleFlight
+from .metrics import Metrics
+from .ratelimit import RateLimiter
+
+try:
+    import aiohttp
+except Exception:
+    aiohttp = None
+
+class AsyncRiotClient(BaseClient):
+    def __init__(self, api_key: str, platform_region: str, regional_routing: str, user_agent: str = "riot-docfirst-kit/1.0", timeout: int = 15, limiter: Optional[RateLimiter] = None, pool_size: int = 100, keepalive: float = 30, base_url: str = BASE_URL, cache: Optional[ResponseCache] = None, metrics: Optional[Metrics] = None, coalesce: bool = True, controller: Optional[ConcurrencyController] = None):
+        if aiohttp is None:
+            raise RuntimeError("AsyncRiotClient requires aiohttp (pip install aiohttp)")
+        super().__init__(api_key, platform_region, regional_routing, timeout, limiter, base_url, cache, metrics, coalesce, controller)
+        self.flights = AsyncSingleFlight() if coalesce else None
+        self.pool_size = pool_size
+        self.keepalive = keepalive
+        self.headers = {"User-Agent": user_agent, "X-Riot-Token": api_key}
+        self.s = None
+
+    def _session(self):
+        if self.s is None or self.s.closed:
+            conn = aiohttp.TCPConnector(limit=self.pool_size, limit_per_host=self.pool_size, keepalive_timeout=self.keepalive)
+            self.s = aiohttp.ClientSession(connector=conn, headers=self.headers, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self.s
+
+    async def close(self):
+        if self.s is not None:
+            await self.s.close()
+            self.s = None
+
+    async def __aenter__(self):
+        self._session()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _acquire(self, host: str, method: str) -> float:
+        waited = 0.0
+        while True:
+            w = self.limiter.try_acquire(host, method)
+            if w <= 0:
+                return waited
+            await asyncio.sleep(w)
+            waited += w
+
+    async def _slot(self, host: str):
+        # The controller is shared with threads: poll it instead of blocking the loop
+        while not self.controller.try_acquire(host):
+            await asyncio.sleep(0.005)
+
+    async def _get(self, url: str, params: Optional[Dict[str, Any]] = None, retry: int = 3, method: Optional[str] = None) -> Dict[str, Any]:
+        if self.flights is None:
+            return await self._fetch(url, params, retry, method)
+        data, shared = await self.flights.do(cache_key(url, params), lambda: self._fetch(url, params, retry, method))
+        if shared:
+            self.metrics.coalesced(method or url, self._host(url))
+        return data
+
+    async def _fetch(self, url: str, params: Optional[Dict[str, Any]], retry: int, method: Optional[str]) -> Dict[str, Any]:
+        host = self._host(url)
+        method = method or url
+        key, entry = self._cached(url, params, method)
+        if entry is not None and entry.fresh(self.cache.clock()):
+            return entry.payload
+        headers = {"If-None-Match": entry.etag} if entry is not None and entry.etag else None
+        s = self._session()
+        for i in range(retry):
+            if self.controller is not None:
+                await self._slot(host)
+            outcome, t, dt = ERROR, time.perf_counter(), 0.0
+            try:
+                waited = await self._acquire(host, method)
+                if waited:
+                    self.log.debug("throttled wait=%.2f host=%s method=%s", waited, host, method)
+                    self.metrics.sleep("throttle", waited, method, host)
+                t = time.perf_counter()
+                async with s.get(url, params=params, headers=headers) as r:
+                    self.limiter.update(host, method, r.headers)
+                    body = await r.read()
+                dt = time.perf_counter() - t
+                outcome = THROTTLED if r.status == 429 else ERROR if r.status >= 500 else OK
+            finally:
+                if self.controller is not None:
+                    self.controller.release(host, dt or time.perf_counter() - t, outcome)
+            self.metrics.record(method, host, r.status, dt, len(body), i)
+            if r.status == 304 and entry is not None:
+                return self.cache.revalidate(method, key, entry).payload
+            if r.status == 429:
+                w = retry_after(r.headers, i)
+                self.log.warning("429 wait=%s attempt=%s url=%s", w, i + 1, url)
+                self.metrics.limited(method, host, w, r.headers.get("X-Rate-Limit-Type"))
+                self.limiter.penalize(host, method, w, r.headers.get("X-Rate-Limit-Type"))
+                continue
+            if 200 <= r.status < 300:
+                data = json.loads(body) if body else {}
+                if key is not None:
+                    self.cache.store(method, key, data, r.headers.get("ETag"))
+                return data
+            if 400 <= r.status < 500:
+                raise RiotError(f"client {r.status} {body[:300].decode('utf-8', 'replace')}")
+            w = backoff(i)
+            self.log.warning("server status=%s attempt=%s wait=%.1f", r.status, i + 1, w)
+            self.metrics.sleep("server_error", w, method, host)
+            await asyncio.sleep(w)
+        raise RiotError("max retries")
+
+# Status
+async def status_probe(c: AsyncRiotClient) -> Dict:
+    return await ep.status_probe(c)
+
+# Account
+async def account_by_riot_id(c: AsyncRiotClient, game_name: str, tag_line: str) -> Dict:
+    return await ep.account_by_riot_id(c, game_name, tag_line)
+
+async def account_by_puuid(c: AsyncRiotClient, puuid: str) -> Dict:
+    return await ep.account_by_puuid(c, puuid)
+
+async def account_active_shard(c: AsyncRiotClient, game: str, puuid: str) -> Dict:
+    return await ep.account_active_shard(c, game, puuid)
+
+# Summoner
+async def summoner_by_puuid(c: AsyncRiotClient, puuid: str) -> Dict:
+    return await ep.summoner_by_puuid(c, puuid)
+
+async def summoner_by_id(c: AsyncRiotClient, summoner_id: str) -> Dict:
+    return await ep.summoner_by_id(c, summoner_id)
+
+# Champion
+async def champion_rotation(c: AsyncRiotClient) -> Dict:
+    return await ep.champion_rotation(c)
+
+# Champion Mastery
+async def champion_mastery_all(c: AsyncRiotClient, puuid: str) -> List[Dict]:
+    return await ep.champion_mastery_all(c, puuid)
+
+async def champion_mastery_by_champion(c: AsyncRiotClient, puuid: str, champion_id: int) -> Dict:
+    return await ep.champion_mastery_by_champion(c, puuid, champion_id)
+
+async def champion_mastery_top(c: AsyncRiotClient, puuid: str, count: int) -> List[Dict]:
+    return await ep.champion_mastery_top(c, puuid, count)
+
+async def champion_mastery_score(c: AsyncRiotClient, puuid: str) -> int:
+    return await ep.champion_mastery_score(c, puuid)
+
+# Match
+async def match_ids_by_puuid(c: AsyncRiotClient, puuid: str, start: int, count: int, start_time: Optional[int] = None, end_time: Optional[int] = None, queue: Optional[int] = None) -> List[str]:
+    return await ep.match_ids_by_puuid(c, puuid, start, count, start_time, end_time, queue)
+
+async def match_by_id(c: AsyncRiotClient, match_id: str) -> Dict:
+    return await ep.match_by_id(c, match_id)
+
+async def match_timeline(c: AsyncRiotClient, match_id: str) -> Dict:
+    return await ep.match_timeline(c, match_id)
+
+# League
+async def league_by_summoner(c: AsyncRiotClient, summoner_id: str) -> List[Dict]:
+    return await ep.league_by_summoner(c, summoner_id)
+
+async def league_entries(c: AsyncRiotClient, queue: str, tier: str, division: str, page: int) -> List[Dict]:
+    return await ep.league_entries(c, queue, tier, division, page)
+
+async def league_by_league_id(c: AsyncRiotClient, league_id: str) -> Dict:
+    return await ep.league_by_league_id(c, league_id)
+
+async def league_challenger(c: AsyncRiotClient, queue: str) -> Dict:
+    return await ep.league_challenger(c, queue)
+
+async def league_grandmaster(c: AsyncRiotClient, queue: str) -> Dict:
+    return await ep.league_grandmaster(c, queue)
+
+async def league_master(c: AsyncRiotClient, queue: str) -> Dict:
+    return await ep.league_master(c, queue)
+
+# League EXP
+async def league_exp_entries(c: AsyncRiotClient, queue: str, tier: str, division: str, page: int) -> List[Dict]:
+    return await ep.league_exp_entries(c, queue, tier, division, page)
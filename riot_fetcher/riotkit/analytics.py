@@ -0,0 +1,147 @@
+import math
+from itertools import chain
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+import pandas as pd
+from .corpus import load_corpus, participant_rows
+
+MATCH_COLUMNS = ("match_id", "queue_id", "game_mode", "game_duration", "patch")
+PARTICIPANT_COLUMNS = ("puuid", "champion_name", "team_position", "win", "kills", "deaths", "assists", "gold_earned", "total_damage", "vision_score")
+COLUMNS = MATCH_COLUMNS + PARTICIPANT_COLUMNS
+
+SUMS = (
+    ("total_kills", "kills"),
+    ("total_deaths", "deaths"),
+    ("total_assists", "assists"),
+    ("total_gold", "gold_earned"),
+    ("total_damage", "total_damage"),
+)
+
+
+def flatten(matches: Iterable[Dict]) -> pd.DataFrame:
+    """One row per participant of every match, in match order."""
+    rows = []
+    for m in matches:
+        rows.extend(participant_rows(m))
+    return pd.DataFrame.from_records(rows, columns=COLUMNS)
+
+
+def load_frame(directory, workers: Optional[int] = None) -> pd.DataFrame:
+    """flatten() of a whole matches directory (or segment store), decoded and flattened on a process pool."""
+    rows = chain.from_iterable(load_corpus(directory, "match", participant_rows, workers))
+    return pd.DataFrame.from_records(rows, columns=COLUMNS)
+
+
+def store_frame(store) -> pd.DataFrame:
+    """Same layout as flatten(), read straight from a MatchStore with one SQL join."""
+    sql = (
+        "SELECT m.match_id, m.queue_id, m.game_mode, m.game_duration, m.patch, p.puuid, p.champion_name, p.team_position,"
+        " p.win, p.kills, p.deaths, p.assists, p.gold_earned, p.total_damage, p.vision_score"
+        " FROM participants p JOIN matches m ON m.match_id = p.match_id ORDER BY m.rowid, p.participant_id"
+    )
+    with store.lock:
+        df = pd.read_sql_query(sql, store.db)
+    df["win"] = df["win"].astype(bool)
+    return df
+
+
+def _py(v):
+    if isinstance(v, float) and math.isnan(v):
+        return None
+    return v
+
+
+def _played(df: pd.DataFrame) -> pd.DataFrame:
+    return df[df["puuid"].notna() & (df["puuid"] != "")]
+
+
+def player_stats(df: pd.DataFrame) -> Dict[str, Dict]:
+    played = _played(df)
+    pc, puuids = pd.factorize(played["puuid"])
+    cc, champs = pd.factorize(played["champion_name"].fillna("Unknown"))
+    n, nc = len(puuids), max(len(champs), 1)
+    counts = np.bincount(pc, minlength=n).tolist()
+    cols = [np.bincount(pc, weights=played[c].to_numpy(), minlength=n).astype(np.int64).tolist() for _, c in SUMS]
+    pairs = np.sort(pc.astype(np.int64) * nc + cc)
+    pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]] if len(pairs) else pairs
+    owners = pairs // nc
+    names = np.asarray(champs, dtype=object)[pairs % nc]
+    played_lists = [a.tolist() for a in np.split(names, np.flatnonzero(np.diff(owners)) + 1)] if len(pairs) else []
+    out = {}
+    for i, puuid in enumerate(puuids.tolist()):
+        st = {"matches_played": counts[i]}
+        for (name, _), col in zip(SUMS, cols):
+            st[name] = col[i]
+        st["champions_played"] = played_lists[i]
+        out[puuid] = st
+    return out
+
+
+def champion_stats(df: pd.DataFrame) -> Dict[str, Dict]:
+    played = _played(df)
+    agg = played.groupby("champion_name", sort=False, dropna=False).agg(
+        times_played=("kills", "size"),
+        total_kills=("kills", "sum"),
+        total_deaths=("deaths", "sum"),
+        total_assists=("assists", "sum"),
+    )
+    keys = [_py(k) for k in agg.index.tolist()]
+    return {k: dict(zip(agg.columns, map(int, row))) for k, row in zip(keys, agg.itertuples(index=False))}
+
+
+def breakdown(df: pd.DataFrame, by: str) -> Dict[str, Dict]:
+    agg = df.groupby(by, sort=True).agg(
+        games=("kills", "size"),
+        win_rate=("win", "mean"),
+        avg_kills=("kills", "mean"),
+        avg_deaths=("deaths", "mean"),
+        avg_assists=("assists", "mean"),
+        avg_gold=("gold_earned", "mean"),
+        avg_damage=("total_damage", "mean"),
+        avg_vision=("vision_score", "mean"),
+    )
+    out = {}
+    for key, row in zip(agg.index.tolist(), agg.to_dict("records")):
+        row["games"] = int(row["games"])
+        out[str(_py(key))] = {k: (v if k == "games" else round(float(v), 4)) for k, v in row.items()}
+    return out
+
+
+ROW_KEYS = (
+    ("puuid", "puuid"),
+    ("championName", "champion_name"),
+    ("teamPosition", "team_position"),
+    ("kills", "kills"),
+    ("deaths", "deaths"),
+    ("assists", "assists"),
+    ("goldEarned", "gold_earned"),
+    ("totalDamageDealtToChampions", "total_damage"),
+    ("visionScore", "vision_score"),
+)
+
+
+def match_rows(df: pd.DataFrame) -> List[Dict]:
+    if not len(df):
+        return []
+    keys = [k for k, _ in ROW_KEYS]
+    rows = [dict(zip(keys, t)) for t in zip(*[df[c].tolist() for _, c in ROW_KEYS])]
+    mids = df["match_id"].to_numpy()
+    starts = np.flatnonzero(np.r_[True, mids[1:] != mids[:-1]]).tolist()
+    ends = starts[1:] + [len(rows)]
+    meta = [df[c].to_numpy()[starts].tolist() for c in ("match_id", "game_duration", "game_mode", "queue_id")]
+    return [
+        {"matchId": mid, "gameDuration": _py(dur), "gameMode": mode, "queueId": _py(q), "participants": rows[a:b]}
+        for mid, dur, mode, q, a, b in zip(*meta, starts, ends)
+    ]
+
+
+def complete_analysis(df: pd.DataFrame, keep_match_rows: bool = True) -> Dict:
+    """complete_analysis.json sections plus per-position, per-queue and per-patch breakdowns."""
+    return {
+        "player_stats": player_stats(df),
+        "champion_stats": champion_stats(df),
+        "match_analysis": match_rows(df) if keep_match_rows else [],
+        "by_position": breakdown(df, "team_position"),
+        "by_queue": breakdown(df, "queue_id"),
+        "by_patch": breakdown(df, "patch"),
+    }
@@ -0,0 +1,62 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, Iterator, Optional, TextIO, Tuple
+
+# batch operation -> riotkit.endpoints function (resolved on use, keeps the import light for the CLI parser)
+OPERATIONS = {
+    "match-get": "match_by_id",
+    "match-timeline": "match_timeline",
+    "match-ids": "match_ids_by_puuid",
+    "account-by-puuid": "account_by_puuid",
+    "summoner-by-puuid": "summoner_by_puuid",
+    "summoner-by-id": "summoner_by_id",
+    "cm-all": "champion_mastery_all",
+    "cm-score": "champion_mastery_score",
+    "league-by-summoner": "league_by_summoner",
+}
+
+
+def operation(name: str) -> Callable:
+    from . import endpoints
+    return getattr(endpoints, OPERATIONS[name])
+
+
+def read_ids(stream: TextIO, dedup: bool = True) -> Iterator[str]:
+    """One ID per line; blank lines and `#` comments are skipped, duplicates dropped.
+
+    Dropping duplicates keeps every distinct ID in a set, so memory grows with the input
+    (about 100 bytes per ID). dedup=False streams IDs in constant memory.
+    """
+    seen = set()
+    for line in stream:
+        i = line.split("#", 1)[0].strip()
+        if not i:
+            continue
+        if dedup:
+            if i in seen:
+                continue
+            seen.add(i)
+        yield i
+
+
+def run_batch(fn: Callable[[str], Any], ids: Iterable[str], workers: int = 8) -> Iterator[Tuple[str, Any, Optional[Exception]]]:
+    """Call fn on every id with at most 2*workers in flight; yields (id, result, error) as they complete.
+
+    ids is consumed lazily, so a pipe of any length streams through in bounded memory
+    (read_ids(stream, dedup=False) keeps the input side bounded too).
+    """
+    it = iter(ids)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = {}
+        for i in it:
+            pending[pool.submit(fn, i)] = i
+            if len(pending) >= 2 * max(1, workers):
+                break
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                i = pending.pop(f)
+                e = f.exception()
+                yield i, (None if e else f.result()), e
+                nxt = next(it, None)
+                if nxt is not None:
+                    pending[pool.submit(fn, nxt)] = nxt
@@ -0,0 +1,180 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+from .storage import read_record, write_record
+
+FOREVER = None
+WEEK = 7 * 86400
+
+# Seconds a response stays fresh, per endpoint method name; missing or 0 means never cached.
+# Matches never change, but a finite TTL lets prune-cache reclaim their disk space.
+DEFAULT_TTLS: Dict[str, Optional[float]] = {
+    "match_by_id": WEEK,
+    "match_timeline": WEEK,
+    "account_by_riot_id": 86400,
+    "account_by_puuid": 86400,
+    "summoner_by_puuid": 3600,
+    "summoner_by_id": 3600,
+    "champion_rotation": 3600,
+    "champion_mastery_all": 3600,
+    "champion_mastery_by_champion": 3600,
+    "champion_mastery_top": 3600,
+    "champion_mastery_score": 3600,
+    "league_by_summoner": 600,
+    "league_entries": 600,
+    "league_exp_entries": 600,
+    "league_by_league_id": 600,
+    "league_challenger": 600,
+    "league_grandmaster": 600,
+    "league_master": 600,
+}
+
+# Payloads too large for the memory tier (a timeline is several MB): cached on disk only.
+# Concurrent requests for the same one are already coalesced by the client.
+DISK_ONLY = frozenset({"match_by_id", "match_timeline"})
+
+
+def cache_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+    if not params:
+        return url
+    return url + "?" + "&".join(f"{k}={params[k]}" for k in sorted(params) if params[k] is not None)
+
+
+class Entry:
+    __slots__ = ("payload", "expires", "etag")
+
+    def __init__(self, payload, expires: Optional[float], etag: Optional[str] = None):
+        self.payload = payload
+        self.expires = expires
+        self.etag = etag
+
+    def fresh(self, now: float) -> bool:
+        return self.expires is None or now < self.expires
+
+
+class DiskCache:
+    """One gzip record per key under `root`, named by the key's SHA-1."""
+
+    def __init__(self, root):
+        self.root = str(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def stem(self, key: str) -> str:
+        h = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, h[:2], h)
+
+    def get(self, key: str) -> Optional[Entry]:
+        f = self.stem(key) + ".json.gz"
+        try:
+            rec = read_record(f)
+        except (OSError, ValueError):
+            return None
+        if rec.get("key") != key:
+            return None
+        return Entry(rec.get("payload"), rec.get("expires"), rec.get("etag"))
+
+    def put(self, key: str, e: Entry):
+        stem = self.stem(key)
+        os.makedirs(os.path.dirname(stem), exist_ok=True)
+        write_record(stem, {"key": key, "expires": e.expires, "etag": e.etag, "payload": e.payload}, "gzip")
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Delete expired records; returns how many were removed."""
+        now = time.time() if now is None else now
+        n = 0
+        for d, _, files in os.walk(self.root):
+            for name in files:
+                f = os.path.join(d, name)
+                try:
+                    exp = read_record(f).get("expires")
+                except (OSError, ValueError):
+                    exp = 0
+                if exp is not None and exp <= now:
+                    os.remove(f)
+                    n += 1
+        return n
+
+
+class ResponseCache:
+    """In-memory LRU in front of an optional DiskCache, with per-method TTLs.
+
+    Methods in `disk_only` skip the LRU (which is bounded by entry count, not bytes)
+    and are not cached at all without a DiskCache. Payloads are shared between callers
+    and must be treated as read-only.
+    """
+
+    def __init__(self, disk: Optional[DiskCache] = None, ttls: Optional[Dict[str, Optional[float]]] = None, max_items: int = 1024, clock=time.time,
+                 disk_only: Iterable[str] = DISK_ONLY):
+        self.disk = disk
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.max_items = max_items
+        self.disk_only = frozenset(disk_only)
+        self.clock = clock
+        self.mem: "OrderedDict[str, Entry]" = OrderedDict()
+        self.counters = {"hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0, "stores": 0, "evictions": 0, "revalidated": 0}
+        self.lock = threading.Lock()
+
+    def cacheable(self, method: str) -> bool:
+        if method in self.disk_only and self.disk is None:
+            return False
+        return method in self.ttls and self.ttls[method] != 0
+
+    def _remember(self, method: str, key: str, e: Entry):
+        if method in self.disk_only:
+            return
+        self.mem[key] = e
+        self.mem.move_to_end(key)
+        while len(self.mem) > self.max_items:
+            self.mem.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def lookup(self, method: str, key: str) -> Optional[Entry]:
+        """Return the entry for key, fresh or stale (stale ones may carry an ETag); counts a hit only when fresh."""
+        now = self.clock()
+        with self.lock:
+            e = self.mem.get(key)
+            if e is not None:
+                self.mem.move_to_end(key)
+                if e.fresh(now):
+                    self.counters["hits"] += 1
+                    self.counters["memory_hits"] += 1
+                    return e
+        if self.disk is not None:
+            d = self.disk.get(key)
+            if d is not None and (e is None or d.fresh(now)):
+                e = d
+                with self.lock:
+                    self._remember(method, key, e)
+                    if e.fresh(now):
+                        self.counters["hits"] += 1
+                        self.counters["disk_hits"] += 1
+                        return e
+        with self.lock:
+            self.counters["misses"] += 1
+        return e
+
+    def store(self, method: str, key: str, payload, etag: Optional[str] = None) -> Entry:
+        ttl = self.ttls.get(method, 0)
+        e = Entry(payload, None if ttl is FOREVER else self.clock() + ttl, etag)
+        with self.lock:
+            self._remember(method, key, e)
+            self.counters["stores"] += 1
+        if self.disk is not None:
+            self.disk.put(key, e)
+        return e
+
+    def revalidate(self, method: str, key: str, e: Entry) -> Entry:
+        """Server answered 304 Not Modified: keep the payload for another TTL."""
+        with self.lock:
+            self.counters["revalidated"] += 1
+        return self.store(method, key, e.payload, e.etag)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            out = dict(self.counters, size=len(self.mem))
+        total = out["hits"] + out["misses"]
+        out["hit_rate"] = round(out["hits"] / total, 4) if total else 0.0
+        return out
@@ -3,36 +3,112 @@ import logging
 import requests
 from typing import Any, Dict, Optional
 from . import RiotError
+from .adaptive import ERROR, OK, THROTTLED, ConcurrencyController, backoff
+from .cache import ResponseCache, cache_key
+from .flight import SingleFlight
+from .metrics import Metrics
+from .ratelimit import RateLimiter
 
-class RiotClient:
-    def __init__(self, api_key: str, platform_region: str, regional_routing: str, user_agent: str = "riot-docfirst-kit/1.0", timeout: int = 15):
+BASE_URL = "https://{host}.api.riotgames.com"
+
+def retry_after(headers, attempt: int) -> int:
+    ra = headers.get("Retry-After")
+    return int(ra) if ra and ra.isdigit() else (2 ** attempt)
+
+class BaseClient:
+    def __init__(self, api_key: str, platform_region: str, regional_routing: str, timeout: int = 15, limiter: Optional[RateLimiter] = None, base_url: str = BASE_URL, cache: Optional[ResponseCache] = None, metrics: Optional[Metrics] = None, coalesce: bool = True, controller: Optional[ConcurrencyController] = None):
         self.api_key = api_key
         self.platform_region = platform_region
         self.regional_routing = regional_routing
         self.timeout = timeout
+        self.base_url = base_url
+        self.limiter = limiter if limiter is not None else RateLimiter()
+        self.cache = cache
+        self.metrics = metrics if metrics is not None else Metrics()
+        # Identical concurrent GETs (same URL and params) share one request
+        self.flights = SingleFlight() if coalesce else None
+        # Optional per-host in-flight limit (AIMD) and circuit breaker
+        self.controller = controller
+        self.log = logging.getLogger("riot")
+
+    def stats(self) -> Dict[str, Any]:
+        return self.metrics.snapshot(self.limiter, self.cache, self.controller)
+
+    def _host(self, url: str) -> str:
+        return self.regional_routing if url.startswith(self.regional_url("")) else self.platform_region
+
+    def platform_url(self, path: str) -> str:
+        return self.base_url.format(host=self.platform_region) + path
+
+    def regional_url(self, path: str) -> str:
+        return self.base_url.format(host=self.regional_routing) + path
+
+    def _cached(self, url: str, params: Optional[Dict[str, Any]], method: str):
+        """(key, entry) for a cacheable call, key None otherwise; a fresh entry means no request is needed."""
+        if self.cache is None or not self.cache.cacheable(method):
+            return None, None
+        key = cache_key(url, params)
+        return key, self.cache.lookup(method, key)
+
+class RiotClient(BaseClient):
+    def __init__(self, api_key: str, platform_region: str, regional_routing: str, user_agent: str = "riot-docfirst-kit/1.0", timeout: int = 15, limiter: Optional[RateLimiter] = None, pool_size: int = 10, base_url: str = BASE_URL, cache: Optional[ResponseCache] = None, metrics: Optional[Metrics] = None, coalesce: bool = True, controller: Optional[ConcurrencyController] = None):
+        super().__init__(api_key, platform_region, regional_routing, timeout, limiter, base_url, cache, metrics, coalesce, controller)
         self.s = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.s.mount("https://", adapter)
+        self.s.mount("http://", adapter)
         self.s.headers.update({"User-Agent": user_agent, "X-Riot-Token": api_key})
-        self.log = logging.getLogger("riot")
 
-    def _get(self, url: str, params: Optional[Dict[str, Any]] = None, retry: int = 3) -> Dict[str, Any]:
+    def _get(self, url: str, params: Optional[Dict[str, Any]] = None, retry: int = 3, method: Optional[str] = None) -> Dict[str, Any]:
+        if self.flights is None:
+            return self._fetch(url, params, retry, method)
+        data, shared = self.flights.do(cache_key(url, params), lambda: self._fetch(url, params, retry, method))
+        if shared:
+            self.metrics.coalesced(method or url, self._host(url))
+        return data
+
+    def _fetch(self, url: str, params: Optional[Dict[str, Any]], retry: int, method: Optional[str]) -> Dict[str, Any]:
+        host = self._host(url)
+        method = method or url
+        key, entry = self._cached(url, params, method)
+        if entry is not None and entry.fresh(self.cache.clock()):
+            return entry.payload
+        headers = {"If-None-Match": entry.etag} if entry is not None and entry.etag else None
         for i in range(retry):
-            r = self.s.get(url, params=params, timeout=self.timeout)
+            if self.controller is not None:
+                self.controller.acquire(host)
+            outcome, t, dt = ERROR, time.perf_counter(), 0.0
+            try:
+                waited = self.limiter.acquire(host, method)
+                if waited:
+                    self.log.debug("throttled wait=%.2f host=%s method=%s", waited, host, method)
+                    self.metrics.sleep("throttle", waited, method, host)
+                t = time.perf_counter()
+                r = self.s.get(url, params=params, timeout=self.timeout, headers=headers)
+                dt = time.perf_counter() - t
+                outcome = THROTTLED if r.status_code == 429 else ERROR if r.status_code >= 500 else OK
+            finally:
+                if self.controller is not None:
+                    self.controller.release(host, dt or time.perf_counter() - t, outcome)
+            self.metrics.record(method, host, r.status_code, dt, len(r.content), i)
+            self.limiter.update(host, method, r.headers)
+            if r.status_code == 304 and entry is not None:
+                return self.cache.revalidate(method, key, entry).payload
             if r.status_code == 429:
-                ra = r.headers.get("Retry-After")
-                w = int(ra) if ra and ra.isdigit() else (2 ** i)
+                w = retry_after(r.headers, i)
                 self.log.warning("429 wait=%s attempt=%s url=%s", w, i + 1, url)
-                time.sleep(w)
+                self.metrics.limited(method, host, w, r.headers.get("X-Rate-Limit-Type"))
+                self.limiter.penalize(host, method, w, r.headers.get("X-Rate-Limit-Type"))
                 continue
             if 200 <= r.status_code < 300:
-                return r.json() if r.text else {}
+                data = r.json() if r.text else {}
+                if key is not None:
+                    self.cache.store(method, key, data, r.headers.get("ETag"))
+                return data
             if 400 <= r.status_code < 500:
                 raise RiotError(f"client {r.status_code} {r.text[:300]}")
-            self.log.warning("server status=%s attempt=%s", r.status_code, i + 1)
-            time.sleep(1 + 2 * i)
+            w = backoff(i)
+            self.log.warning("server status=%s attempt=%s wait=%.1f", r.status_code, i + 1, w)
+            self.metrics.sleep("server_error", w, method, host)
+            time.sleep(w)
         raise RiotError("max retries")
-
-    def platform_url(self, path: str) -> str:
-        return f"https://{self.platform_region}.api.riotgames.com{path}"
-
-    def regional_url(self, path: str) -> str:
-        return f"https://{self.regional_routing}.api.riotgames.com{path}"
@@ -0,0 +1,99 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from .segments import SegmentStore, is_segment_dir
+from .storage import read_record, split_ext
+from .store import patch_of
+
+# Top-level transforms: a transform runs in the worker process, so it must be picklable
+# (a module-level function) and should shrink the record before it is sent back.
+
+
+def participant_rows(m: Dict) -> List[Tuple]:
+    """One analytics.COLUMNS tuple per participant of a match."""
+    info = m.get("info", {})
+    base = (m.get("metadata", {}).get("matchId"), info.get("queueId"), info.get("gameMode"), info.get("gameDuration"), patch_of(info.get("gameVersion")))
+    return [base + (
+        p.get("puuid"), p.get("championName"), p.get("teamPosition"), bool(p.get("win")),
+        p.get("kills", 0), p.get("deaths", 0), p.get("assists", 0), p.get("goldEarned", 0),
+        p.get("totalDamageDealtToChampions", 0), p.get("visionScore", 0),
+    ) for p in info.get("participants", [])]
+
+
+def to_match(m: Dict):
+    from .models import Match
+    return Match.from_api(m)
+
+
+def to_timeline(t: Dict):
+    from .models import Timeline
+    return Timeline.from_api(t)
+
+
+def _identity(x):
+    return x
+
+
+def _sources(directory, kind: str) -> Tuple[Optional[str], List]:
+    """(segment store dir or None, work items): record keys in file order for a store, file paths otherwise."""
+    if is_segment_dir(directory, kind):
+        with SegmentStore(directory, kind, readonly=True) as st:
+            return str(directory), [k for _, k in sorted((loc, k) for k, loc in st.index.items())]
+    head = kind + "_"
+    paths = [e.path for e in sorted(os.scandir(directory), key=lambda e: e.name)
+             if e.name.startswith(head) and split_ext(e.name)[1]]
+    return None, paths
+
+
+_STORES: Dict[Tuple[str, str], SegmentStore] = {}
+
+
+def _load_chunk(store: Optional[str], kind: str, items: List, transform: Callable) -> List:
+    if store is None:
+        return [transform(read_record(p)) for p in items]
+    st = _STORES.get((store, kind))
+    if st is None:
+        st = _STORES[(store, kind)] = SegmentStore(store, kind, readonly=True)
+    return [transform(payload) for _, payload in st.get_many(items)]
+
+
+def load_corpus(directory, kind: str = "match", transform: Optional[Callable[[Dict], Any]] = None,
+                workers: Optional[int] = None, chunk: int = 16) -> Iterator[Any]:
+    """Decode every record of a directory (files in any codec, or a segment store) on a process pool.
+
+    Yields transform(record) in file order. Records are read and decoded in chunks of `chunk`
+    by `workers` processes (default: one per CPU), with at most 2 * workers chunks in
+    flight, so memory stays bounded however large the corpus. workers=1 decodes in this
+    process. JSON goes through orjson when it is installed (riotkit.storage.loads).
+
+    A full timeline costs about as much to unpickle in the parent as to parse, so pass a
+    transform that reduces each record (participant_rows, to_match, to_timeline, a
+    projection) to get the parallel speed-up on the parent side too.
+    """
+    transform = transform or _identity
+    store, items = _sources(directory, kind)
+    chunks = [items[i:i + chunk] for i in range(0, len(items), max(1, chunk))]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(chunks)))
+    if workers == 1:
+        if store is None:
+            for p in items:
+                yield transform(read_record(p))
+        else:
+            with SegmentStore(store, kind, readonly=True) as st:
+                for _, payload in st.get_many(items):
+                    yield transform(payload)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: deque = deque()
+        it = iter(chunks)
+        for c in it:
+            pending.append(pool.submit(_load_chunk, store, kind, c, transform))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            out = pending.popleft().result()
+            nxt = next(it, None)
+            if nxt is not None:
+                pending.append(pool.submit(_load_chunk, store, kind, nxt, transform))
+            yield from out
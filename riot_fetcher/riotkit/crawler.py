@@ -0,0 +1,233 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from .adaptive import through_circuit
+from .endpoints import match_by_id, match_ids_by_puuid, match_timeline
+from .projection import MATCH, TIMELINE
+from .store import MatchStore, patch_of
+
+FRONTIER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    puuid TEXT PRIMARY KEY,
+    hop INTEGER NOT NULL,
+    priority REAL NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'queued',
+    added_at REAL
+);
+CREATE TABLE IF NOT EXISTS frontier_matches (
+    match_id TEXT PRIMARY KEY,
+    hop INTEGER NOT NULL,
+    priority REAL NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'queued',
+    added_at REAL,
+    recency INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ix_players_next ON players (state, hop, priority DESC);
+"""
+# after the recency column is added to frontiers created before it existed
+FRONTIER_INDEXES = """
+DROP INDEX IF EXISTS ix_frontier_matches_next;
+CREATE INDEX IF NOT EXISTS ix_frontier_matches_rank ON frontier_matches (state, hop, priority DESC, recency DESC);
+"""
+
+
+def match_number(match_id: str) -> int:
+    """Numeric part of a match ID; it grows with time on every platform."""
+    tail = match_id.rsplit("_", 1)[-1]
+    return int(tail) if tail.isdigit() else 0
+
+
+class Frontier:
+    """Persistent queue of players and match IDs, ordered by hop then priority (higher first).
+
+    Matches with the same priority go newest first (match_number of the ID).
+    """
+
+    def __init__(self, path: str):
+        d = os.path.dirname(str(path))
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self.db = sqlite3.connect(str(path), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(FRONTIER_SCHEMA)
+        if "recency" not in {r[1] for r in self.db.execute("PRAGMA table_info(frontier_matches)")}:
+            self.db.execute("ALTER TABLE frontier_matches ADD COLUMN recency INTEGER NOT NULL DEFAULT 0")
+        self.db.executescript(FRONTIER_INDEXES)
+        self.lock = threading.Lock()
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def add_players(self, items: Iterable[Tuple[str, int, float]], limit: Optional[int] = None) -> int:
+        """Queue unseen players in the given order; stop once `limit` new ones were added."""
+        n = 0
+        with self.lock, self.db:
+            for p, h, pr in items:
+                if limit is not None and n >= limit:
+                    break
+                n += self.db.execute("INSERT OR IGNORE INTO players (puuid, hop, priority, added_at) VALUES (?,?,?,?)", (p, h, pr, time.time())).rowcount
+        return n
+
+    def add_matches(self, items: Iterable[Tuple[str, int, float]]) -> int:
+        """Queue match IDs; a queued match listed again keeps the higher of its two priorities."""
+        with self.lock, self.db:
+            cur = self.db.executemany(
+                "INSERT INTO frontier_matches (match_id, hop, priority, added_at, recency) VALUES (?,?,?,?,?) "
+                "ON CONFLICT (match_id) DO UPDATE SET priority=excluded.priority WHERE state='queued' AND excluded.priority > priority",
+                [(m, h, pr, time.time(), match_number(m)) for m, h, pr in items])
+            return cur.rowcount
+
+    def _next(self, table: str, key: str, n: int, order: str = "hop, priority DESC") -> List[Tuple[str, int, float]]:
+        with self.lock:
+            return self.db.execute(f"SELECT {key}, hop, priority FROM {table} WHERE state='queued' ORDER BY {order} LIMIT ?", (n,)).fetchall()
+
+    def next_players(self, n: int) -> List[Tuple[str, int, float]]:
+        return self._next("players", "puuid", n)
+
+    def next_matches(self, n: int) -> List[Tuple[str, int, float]]:
+        return self._next("frontier_matches", "match_id", n, "hop, priority DESC, recency DESC")
+
+    def mark(self, table: str, key: str, ids: Sequence[str], state: str):
+        with self.lock, self.db:
+            self.db.executemany(f"UPDATE {table} SET state=? WHERE {key}=?", [(state, i) for i in ids])
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        with self.lock:
+            out = {}
+            for table in ("players", "frontier_matches"):
+                out[table] = dict(self.db.execute(f"SELECT state, COUNT(*) FROM {table} GROUP BY state").fetchall())
+            return out
+
+
+@dataclass
+class CrawlConfig:
+    max_hops: int = 2
+    matches_per_player: int = 20
+    fanout: int = 9
+    max_matches: Optional[int] = None
+    queues: Tuple[int, ...] = ()
+    patches: Tuple[str, ...] = ()
+    workers: int = 8
+    # Keep only projection.MATCH_FIELDS / TIMELINE_FIELDS of fetched payloads
+    compact: bool = False
+    # Extra score for a newly found player (added to the score of the match it came from)
+    player_score: Optional[Callable[[Dict, Dict], float]] = field(default=None, repr=False)
+
+
+class Crawler:
+    """Multi-hop BFS crawl from seed players into a MatchStore.
+
+    Hop 0 is the seed players and their matches; players met in hop-h matches are
+    hop h+1. Within a hop, higher priority goes first: a match takes the priority of the
+    player it was listed for, a player met in a match takes that match's priority plus
+    player_score(match, participant), and seeds can be given a rank-based priority.
+    Ties go to the newest match IDs. A player whose match list could not be fetched is
+    marked failed, like a match that could not be fetched. Fan-out per match and the total match
+    budget are bounded so the rate budget goes to the most useful games. While a host's
+    circuit breaker is open, requests wait for it to close instead of failing.
+    """
+
+    def __init__(self, client, store: MatchStore, frontier: Frontier, config: Optional[CrawlConfig] = None, timeline_store=None):
+        self.c = client
+        self.store = store
+        self.frontier = frontier
+        self.cfg = config or CrawlConfig()
+        self.timeline_store = timeline_store
+        self.stats = {"matches": 0, "filtered": 0, "players": 0, "errors": 0}
+        self.lock = threading.Lock()
+        self.log = logging.getLogger("riot")
+
+    def seed(self, puuids: Iterable[str], priority: float = 0.0) -> int:
+        return self.frontier.add_players((p, 0, priority) for p in puuids)
+
+    def _list(self, puuid: str) -> Optional[List[str]]:
+        queue = self.cfg.queues[0] if len(self.cfg.queues) == 1 else None
+        try:
+            return through_circuit(match_ids_by_puuid, self.c, puuid, 0, self.cfg.matches_per_player, queue=queue)
+        except Exception as e:
+            self.log.error("crawl ids error puuid=%s %s", puuid, e)
+            with self.lock:
+                self.stats["errors"] += 1
+            return None
+
+    def _fetch(self, match_id: str) -> Optional[Dict]:
+        try:
+            m = through_circuit(match_by_id, self.c, match_id)
+            if self.cfg.compact:
+                m = MATCH(m)
+            if self.timeline_store is not None and self._wanted(m) and not self.timeline_store.exists(match_id):
+                tl = through_circuit(match_timeline, self.c, match_id)
+                self.timeline_store.save(match_id, TIMELINE(tl) if self.cfg.compact else tl)
+            return m
+        except Exception as e:
+            self.log.error("crawl match error id=%s %s", match_id, e)
+            with self.lock:
+                self.stats["errors"] += 1
+            return None
+
+    def _wanted(self, m: Dict) -> bool:
+        info = m.get("info", {})
+        if self.cfg.queues and info.get("queueId") not in self.cfg.queues:
+            return False
+        if self.cfg.patches and patch_of(info.get("gameVersion")) not in self.cfg.patches:
+            return False
+        return True
+
+    def _expand_players(self, pool, players: List[Tuple[str, int, float]]):
+        done, failed = [], []
+        for (puuid, hop, priority), ids in zip(players, pool.map(self._list, [p for p, _, _ in players])):
+            if ids is None:
+                failed.append(puuid)
+                continue
+            self.frontier.add_matches((mid, hop, priority) for mid in ids if not self.store.has_match(mid))
+            done.append(puuid)
+            self.stats["players"] += 1
+        self.frontier.mark("players", "puuid", done, "done")
+        self.frontier.mark("players", "puuid", failed, "failed")
+
+    def _process_matches(self, pool, batch: List[Tuple[str, int, float]]):
+        done, failed = [], []
+        for (mid, hop, priority), m in zip(batch, pool.map(self._fetch, [m for m, _, _ in batch])):
+            if m is None:
+                failed.append(mid)
+                continue
+            done.append(mid)
+            self.stats["matches"] += 1
+            if not self._wanted(m):
+                self.stats["filtered"] += 1
+                continue
+            self.store.add_match(m)
+            if hop < self.cfg.max_hops:
+                found = []
+                for p in m.get("info", {}).get("participants", []):
+                    if p.get("puuid"):
+                        extra = self.cfg.player_score(m, p) if self.cfg.player_score else 0.0
+                        found.append((p["puuid"], hop + 1, priority + extra))
+                found.sort(key=lambda x: -x[2])
+                self.frontier.add_players(found, self.cfg.fanout)
+        self.frontier.mark("frontier_matches", "match_id", done, "done")
+        self.frontier.mark("frontier_matches", "match_id", failed, "failed")
+
+    def run(self) -> Dict:
+        batch_size = max(1, self.cfg.workers) * 2
+        with ThreadPoolExecutor(max_workers=max(1, self.cfg.workers)) as pool:
+            while True:
+                budget = None if self.cfg.max_matches is None else self.cfg.max_matches - self.stats["matches"]
+                if budget is not None and budget <= 0:
+                    break
+                matches = self.frontier.next_matches(batch_size if budget is None else min(batch_size, budget))
+                players = self.frontier.next_players(batch_size)
+                if not matches and not players:
+                    break
+                if matches and (not players or matches[0][1] <= players[0][1]):
+                    self._process_matches(pool, matches)
+                else:
+                    self._expand_players(pool, players)
+                self.log.info("crawl matches=%s players=%s filtered=%s", self.stats["matches"], self.stats["players"], self.stats["filtered"])
+        return dict(self.stats, frontier=self.frontier.counts())
@@ -1,8 +1,10 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Tuple
 from . import RiotError
 from .client import RiotClient
 from .endpoints import status_probe, account_by_riot_id, summoner_by_puuid, match_ids_by_puuid, match_by_id
+from .projection import PARTICIPANT
 
 def parse_riot_id(riot_id: str) -> Tuple[str, str]:
     if "#" not in riot_id:
@@ -20,23 +22,45 @@ def diagnose(c: RiotClient) -> Dict:
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
-def fetch_profile(c: RiotClient, riot_id: str, count: int) -> Dict:
+def profile_match(m: Dict, mid: str, puuid: str, compact: bool = False) -> Dict:
+    info = m.get("info", {})
+    part = [p for p in info.get("participants", []) if p.get("puuid") == puuid]
+    p = part[0] if part else None
+    if compact and p is not None:
+        p = PARTICIPANT(p)
+    return {"match_id": mid, "participant": p, "duration": info.get("gameDuration")}
+
+def fetch_profile(c: RiotClient, riot_id: str, count: int, workers: int = 8, compact: bool = False) -> Dict:
+    """Account, summoner and the player's last `count` matches.
+
+    The summoner lookup overlaps the match-ID listing, and matches are fetched on `workers`
+    threads sharing the client's rate limiter; they come back in match-ID order. With
+    `compact`, each participant keeps only projection.PARTICIPANT_FIELDS.
+    """
     log = logging.getLogger("riot")
     n, t = parse_riot_id(riot_id)
     acc = account_by_riot_id(c, n, t)
     puuid = acc.get("puuid")
     log.info("account gameName=%s tag=%s", acc.get("gameName"), acc.get("tagLine"))
-    summ = summoner_by_puuid(c, puuid)
-    log.info("summoner id=%s level=%s", summ.get("id"), summ.get("summonerLevel"))
-    ids: List[str] = match_ids_by_puuid(c, puuid, 0, count)
-    log.info("match_ids=%s", len(ids))
-    out = []
-    for i, mid in enumerate(ids):
+
+    def one(mid: str):
         try:
-            m = match_by_id(c, mid)
-            part = [p for p in m.get("info", {}).get("participants", []) if p.get("puuid") == puuid]
-            out.append({"match_id": mid, "participant": part[0] if part else None, "duration": m.get("info", {}).get("gameDuration")})
-            log.debug("fetched %s/%s id=%s", i + 1, len(ids), mid)
+            return profile_match(match_by_id(c, mid), mid, puuid, compact)
         except Exception as e:
             log.error("match error id=%s %s", mid, str(e))
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        summ_f = pool.submit(summoner_by_puuid, c, puuid)
+        ids: List[str] = match_ids_by_puuid(c, puuid, 0, count)
+        log.info("match_ids=%s", len(ids))
+        futures = [pool.submit(one, mid) for mid in ids]
+        summ = summ_f.result()
+        log.info("summoner id=%s level=%s", summ.get("id"), summ.get("summonerLevel"))
+        out = []
+        for i, f in enumerate(futures):
+            r = f.result()
+            if r is not None:
+                out.append(r)
+                log.debug("fetched %s/%s id=%s", i + 1, len(ids), r["match_id"])
     return {"account": acc, "summoner": summ, "matches": out}
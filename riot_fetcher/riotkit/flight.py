@@ -0,0 +1,107 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Concurrent do(key, fn) calls with the same key share one fn() call.
+
+    The first caller runs fn; callers arriving while it runs wait for it and get the
+    same result object (or exception). Nothing is kept once the call returns, so a
+    later call with the same key runs fn again. Results are shared, not copied: treat
+    them as read-only, as with cached responses.
+    """
+
+    def __init__(self):
+        self.calls: Dict[Hashable, _Call] = {}
+        self.lock = threading.Lock()
+        self.stats = {"calls": 0, "shared": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """(result, shared): shared is True when this caller waited on another caller's fn()."""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+                self.stats["calls"] += 1
+            else:
+                self.stats["shared"] += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self.lock:
+            return len(self.calls)
+
+
+class _AsyncCall:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines on one event loop.
+
+    fn() runs in its own task and every caller awaits it through asyncio.shield, so a
+    caller that is cancelled (or times out) leaves the others waiting on the same call.
+    The task itself is cancelled only once no caller is left waiting for it.
+    """
+
+    def __init__(self):
+        self.calls: Dict[Hashable, _AsyncCall] = {}
+        self.stats = {"calls": 0, "shared": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        call = self.calls.get(key)
+        shared = call is not None
+        if shared:
+            self.stats["shared"] += 1
+        else:
+            call = self.calls[key] = _AsyncCall(asyncio.ensure_future(fn()))
+            call.task.add_done_callback(lambda t: self._finished(key, call))
+            self.stats["calls"] += 1
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task), shared
+        except asyncio.CancelledError:
+            if not call.task.cancelled() and call.waiters == 1:
+                self._forget(key, call)
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: Hashable, call: _AsyncCall):
+        if self.calls.get(key) is call:
+            del self.calls[key]
+
+    def _finished(self, key: Hashable, call: _AsyncCall):
+        self._forget(key, call)
+        if not call.task.cancelled():
+            call.task.exception()  # mark retrieved: with no waiter left the task would log "never retrieved"
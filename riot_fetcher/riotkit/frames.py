@@ -0,0 +1,169 @@
+import os
+from typing import Dict, Iterable, Iterator, Tuple
+import numpy as np
+from .storage import read_record, split_ext
+
+PARTICIPANT_STATS = (
+    "totalGold",
+    "currentGold",
+    "xp",
+    "level",
+    "minionsKilled",
+    "jungleMinionsKilled",
+    "position.x",
+    "position.y",
+    "damageStats.totalDamageDoneToChampions",
+    "damageStats.totalDamageTaken",
+    "timeEnemySpentControlled",
+)
+
+EVENT_TYPES = (
+    "OTHER",
+    "ITEM_PURCHASED",
+    "ITEM_SOLD",
+    "ITEM_DESTROYED",
+    "ITEM_UNDO",
+    "SKILL_LEVEL_UP",
+    "LEVEL_UP",
+    "WARD_PLACED",
+    "WARD_KILL",
+    "CHAMPION_KILL",
+    "CHAMPION_SPECIAL_KILL",
+    "CHAMPION_TRANSFORM",
+    "BUILDING_KILL",
+    "TURRET_PLATE_DESTROYED",
+    "ELITE_MONSTER_KILL",
+    "DRAGON_SOUL_GIVEN",
+    "FEAT_UPDATE",
+    "OBJECTIVE_BOUNTY_PRESTART",
+    "OBJECTIVE_BOUNTY_FINISH",
+    "PAUSE_END",
+    "GAME_END",
+)
+EVENT_CODES = {t: i for i, t in enumerate(EVENT_TYPES)}
+
+# value column: the one numeric payload that matters for each event type
+EVENT_VALUE = {
+    "ITEM_PURCHASED": "itemId",
+    "ITEM_SOLD": "itemId",
+    "ITEM_DESTROYED": "itemId",
+    "ITEM_UNDO": "beforeId",
+    "SKILL_LEVEL_UP": "skillSlot",
+    "LEVEL_UP": "level",
+    "CHAMPION_KILL": "bounty",
+    "CHAMPION_SPECIAL_KILL": "multiKillLength",
+    "BUILDING_KILL": "bounty",
+    "ELITE_MONSTER_KILL": "bounty",
+    "FEAT_UPDATE": "featValue",
+}
+
+EVENT_DTYPE = np.dtype([
+    ("frame", "<i2"),
+    ("timestamp", "<i8"),
+    ("type", "<i1"),
+    ("participant", "<i1"),
+    ("victim", "<i1"),
+    ("team", "<i2"),
+    ("assists", "<u4"),
+    ("x", "<i4"),
+    ("y", "<i4"),
+    ("value", "<i4"),
+])
+
+CACHE_VERSION = 1
+
+
+def _stat(pf: Dict, key: str) -> int:
+    v = pf
+    for k in key.split("."):
+        v = v.get(k) if isinstance(v, dict) else None
+    return v if isinstance(v, (int, float)) else 0
+
+
+def _event(fi: int, e: Dict) -> Tuple:
+    pos = e.get("position") or {}
+    assists = 0
+    for p in e.get("assistingParticipantIds") or ():
+        assists |= 1 << p
+    return (
+        fi,
+        e.get("timestamp", 0),
+        EVENT_CODES.get(e.get("type"), 0),
+        e.get("participantId", e.get("killerId", e.get("creatorId", 0))),
+        e.get("victimId", 0),
+        e.get("teamId", e.get("killerTeamId", e.get("winningTeam", 0))),
+        assists,
+        pos.get("x", -1),
+        pos.get("y", -1),
+        e.get(EVENT_VALUE.get(e.get("type")), -1),
+    )
+
+
+def extract(timeline: Dict) -> Dict[str, np.ndarray]:
+    """Turn a match-v5 timeline into dense arrays.
+
+    stats: (frames x participants x len(PARTICIPANT_STATS)) int32, participant i at index i-1.
+    events: structured EVENT_DTYPE array, `assists` is a bitmask of participant ids.
+    """
+    info = timeline.get("info", {})
+    frames = info.get("frames", [])
+    parts = info.get("participants") or []
+    n = max([p.get("participantId", 0) for p in parts] + [len(f.get("participantFrames", {})) for f in frames] + [0])
+    stats = np.zeros((len(frames), n, len(PARTICIPANT_STATS)), dtype=np.int32)
+    events = []
+    for fi, f in enumerate(frames):
+        for pid, pf in f.get("participantFrames", {}).items():
+            row = stats[fi, int(pid) - 1]
+            for si, key in enumerate(PARTICIPANT_STATS):
+                row[si] = _stat(pf, key)
+        events.extend(_event(fi, e) for e in f.get("events", []))
+    puuids = [""] * n
+    for p in parts:
+        if 0 < p.get("participantId", 0) <= n:
+            puuids[p["participantId"] - 1] = p.get("puuid") or ""
+    return {
+        "match_id": np.array(timeline.get("metadata", {}).get("matchId", "")),
+        "frame_interval": np.array(info.get("frameInterval", 60000), dtype=np.int64),
+        "timestamps": np.array([f.get("timestamp", 0) for f in frames], dtype=np.int64),
+        "puuids": np.array(puuids),
+        "stats": stats,
+        "events": np.array(events, dtype=EVENT_DTYPE),
+        "version": np.array(CACHE_VERSION),
+    }
+
+
+def cache_path(raw_path) -> str:
+    stem, _ = split_ext(raw_path)
+    return stem + ".npz"
+
+
+def load_frames(raw_path, refresh: bool = False) -> Dict[str, np.ndarray]:
+    """Arrays for one raw timeline file, read from (or written to) the .npz next to it."""
+    cp = cache_path(raw_path)
+    if not refresh and os.path.exists(cp) and os.path.getmtime(cp) >= os.path.getmtime(raw_path):
+        with np.load(cp) as z:
+            if int(z["version"]) == CACHE_VERSION:
+                return {k: z[k] for k in z.files}
+    arrays = extract(read_record(raw_path))
+    tmp = cp + ".tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, cp)
+    return arrays
+
+
+def timeline_paths(directory) -> Iterator[str]:
+    for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+        if entry.name.startswith("timeline_") and split_ext(entry.name)[1]:
+            yield entry.path
+
+
+def iter_frames(paths: Iterable[str], refresh: bool = False) -> Iterator[Dict[str, np.ndarray]]:
+    for p in paths:
+        yield load_frames(p, refresh)
+
+
+def build_cache(directory, refresh: bool = False) -> int:
+    n = 0
+    for _ in iter_frames(timeline_paths(directory), refresh):
+        n += 1
+    return n
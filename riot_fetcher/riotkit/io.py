@@ -1,5 +1,4 @@
 import os
-import json
 import re
 import time
 
@@ -10,10 +9,21 @@ def _slug(x):
     s = re.sub(r"[^A-Za-z0-9._-]+", "_", str(x)).strip("_")
     return s or "x"
 
-def save_json(category, stem, payload, data_root="data"):
+def save_json(category, stem, payload, data_root="data", writer=None):
+    """Write payload as pretty JSON under data_root/category; with a BackgroundWriter the write is queued."""
+    from .storage import JsonCodec
+    from .writer import atomic_write
     d = os.path.join(data_root, category)
     os.makedirs(d, exist_ok=True)
     f = os.path.join(d, f"{_ts()}_{_slug(stem)}.json")
-    with open(f, "w", encoding="utf-8") as fh:
-        json.dump(payload, fh, indent=2, ensure_ascii=False)
+    if writer is not None:
+        writer.submit(f, payload, JsonCodec())
+    else:
+        atomic_write(f, JsonCodec().dumps(payload))
     return f
+
+def store_match(payload, db_path=os.path.join("data", "matches.sqlite")):
+    from .store import MatchStore
+    with MatchStore(db_path) as st:
+        st.add_match(payload)
+    return db_path
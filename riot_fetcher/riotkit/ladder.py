@@ -0,0 +1,241 @@
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from . import RiotError
+from .endpoints import league_challenger, league_entries, league_exp_entries, league_grandmaster, league_master
+from .storage import RecordStore
+
+QUEUES = ("RANKED_SOLO_5x5", "RANKED_FLEX_SR")
+TIERS = ("DIAMOND", "EMERALD", "PLATINUM", "GOLD", "SILVER", "BRONZE", "IRON")
+DIVISIONS = ("I", "II", "III", "IV")
+APEX = (("CHALLENGER", league_challenger), ("GRANDMASTER", league_grandmaster), ("MASTER", league_master))
+
+COLUMNS = ("queue", "tier", "rank", "puuid", "summoner_id", "league_id", "league_points", "wins", "losses",
+           "hot_streak", "veteran", "fresh_blood", "inactive")
+# Columns compared between two snapshots to report a player as changed
+TRACKED = ("tier", "rank", "league_points", "wins", "losses")
+
+
+def entry_row(e: Dict, queue: Optional[str] = None, tier: Optional[str] = None, league_id: Optional[str] = None) -> Tuple:
+    return (e.get("queueType") or queue, e.get("tier") or tier, e.get("rank"), e.get("puuid"), e.get("summonerId"),
+            e.get("leagueId") or league_id, e.get("leaguePoints", 0), e.get("wins", 0), e.get("losses", 0),
+            bool(e.get("hotStreak")), bool(e.get("veteran")), bool(e.get("freshBlood")), bool(e.get("inactive")))
+
+
+def row_key(row: Tuple) -> Tuple[str, str]:
+    return row[0], row[3] or row[4]
+
+
+def is_client_error(e: Exception) -> bool:
+    """A 4xx from RiotClient/AsyncRiotClient: retrying the same page cannot succeed."""
+    return isinstance(e, RiotError) and str(e).startswith("client ")
+
+
+class LadderCrawler:
+    """Full-ladder fetch: every queue/tier/division bracket is paged concurrently until an empty page.
+
+    At most 2*workers pages are in flight. Once a bracket returns an empty page, no page past it is
+    requested; pages already in flight past the end come back empty and are ignored.
+
+    A failed page is retried up to `retries` times. On a 4xx, or once the retries run out,
+    its bracket is closed and recorded in `lost` as (queue, tier, division, page), division
+    None for an apex league: the snapshot of that bracket is incomplete. A bracket that
+    `max_pages` stopped before an empty page is recorded too, as (queue, tier, division,
+    max_pages + 1).
+    """
+
+    def __init__(self, client, queues: Sequence[str] = QUEUES, tiers: Sequence[str] = TIERS, divisions: Sequence[str] = DIVISIONS,
+                 apex: bool = True, exp: bool = False, workers: int = 8, max_pages: Optional[int] = None,
+                 retries: int = 2):
+        self.c = client
+        self.queues = tuple(queues)
+        self.tiers = tuple(tiers)
+        self.divisions = tuple(divisions)
+        self.apex = apex
+        self.entries = league_exp_entries if exp else league_entries
+        self.workers = max(1, workers)
+        self.max_pages = max_pages
+        self.retries = max(0, retries)
+        self.stats = {"pages": 0, "empty_pages": 0, "entries": 0, "duplicates": 0, "errors": 0, "retries": 0, "lost_pages": 0, "capped_brackets": 0}
+        self.lost: List[Tuple[str, str, Optional[str], int]] = []
+        self.log = logging.getLogger("riot")
+
+    def brackets(self) -> List[Tuple[str, str, str]]:
+        return [(q, t, d) for q in self.queues for t in self.tiers for d in self.divisions]
+
+    def _page(self, bracket: Tuple[str, str, str], page: int) -> List[Dict]:
+        q, t, d = bracket
+        return self.entries(self.c, q, t, d, page)
+
+    def _apex(self, queue: str, tier: str, fn) -> List[Tuple]:
+        league = fn(self.c, queue)
+        lid = league.get("leagueId")
+        return [entry_row(e, league.get("queue") or queue, league.get("tier") or tier, lid) for e in league.get("entries", [])]
+
+    def run(self) -> List[Tuple]:
+        rows: Dict[Tuple[str, str], Tuple] = {}
+
+        def keep(batch: Iterable[Tuple]):
+            for row in batch:
+                self.stats["entries"] += 1
+                k = row_key(row)
+                if k in rows:
+                    self.stats["duplicates"] += 1
+                else:
+                    rows[k] = row
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = {}
+            # apex leagues are tracked as (None, (queue, tier, fn)), bracket pages as (bracket, page)
+            retry: List[Tuple] = []
+            attempts: Dict[Tuple, int] = {}
+            closed: Dict[Tuple[str, str, str], int] = {}  # bracket -> first page past its end (empty or lost)
+
+            def close(b, page):
+                open_brackets.pop(b, None)
+                closed[b] = min(page, closed.get(b, page))
+
+            def submit(b, page):
+                f = pool.submit(self._page, b, page) if b is not None else pool.submit(self._apex, *page)
+                pending[f] = (b, page)
+
+            if self.apex:
+                for q in self.queues:
+                    for tier, fn in APEX:
+                        submit(None, (q, tier, fn))
+            open_brackets = {b: 1 for b in self.brackets()}
+            order = list(open_brackets)
+
+            def refill():
+                while len(pending) < 2 * self.workers and retry:
+                    b, page = retry.pop(0)
+                    if b is None or page < closed.get(b, page + 1):
+                        submit(b, page)
+                while len(pending) < 2 * self.workers and order:
+                    b = order.pop(0)
+                    page = open_brackets.get(b)
+                    if page is None or (self.max_pages is not None and page > self.max_pages):
+                        continue
+                    submit(b, page)
+                    open_brackets[b] = page + 1
+                    order.append(b)
+
+            refill()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    b, page = pending.pop(f)
+                    try:
+                        result = f.result()
+                    except Exception as e:
+                        self.stats["errors"] += 1
+                        if b is not None and page >= closed.get(b, page + 1):
+                            continue  # past the end of its bracket: nothing was lost
+                        where = b + (page,) if b is not None else page[:2] + (None, 1)
+                        tries = attempts.get(where, 0)
+                        if tries < self.retries and not is_client_error(e):
+                            attempts[where] = tries + 1
+                            self.stats["retries"] += 1
+                            self.log.warning("ladder retry page=%s attempt=%s %s", where, tries + 1, e)
+                            retry.append((b, page))
+                            continue
+                        self.log.error("ladder page lost page=%s %s", where, e)
+                        self.stats["lost_pages"] += 1
+                        self.lost.append(where)
+                        if b is not None:
+                            close(b, page)
+                        continue
+                    if b is None:
+                        keep(result)
+                        continue
+                    self.stats["pages"] += 1
+                    if not result:
+                        self.stats["empty_pages"] += 1
+                        close(b, page)
+                        continue
+                    keep(entry_row(e, b[0], b[1]) for e in result)
+                refill()
+            if self.max_pages is not None:
+                for b in self.brackets():
+                    if b not in closed:
+                        self.stats["capped_brackets"] += 1
+                        self.lost.append(b + (self.max_pages + 1,))
+        self.log.info("ladder pages=%s entries=%s unique=%s lost_pages=%s", self.stats["pages"], self.stats["entries"], len(rows),
+                      self.stats["lost_pages"])
+        return list(rows.values())
+
+
+def to_columns(rows: Iterable[Tuple]) -> Dict[str, List]:
+    cols = list(zip(*rows)) or [()] * len(COLUMNS)
+    return {name: list(col) for name, col in zip(COLUMNS, cols)}
+
+
+def from_columns(columns: Dict[str, List]) -> List[Tuple]:
+    return list(zip(*[columns[name] for name in COLUMNS]))
+
+
+def diff_snapshots(old: Dict[str, List], new: Dict[str, List], lost: Iterable[Sequence] = ()) -> Dict:
+    """Players added, removed, or whose tier/rank/LP/wins/losses moved between two columnar snapshots.
+
+    `lost` lists the (queue, tier, division, page) brackets the new snapshot could not fetch
+    completely (LadderCrawler.lost). Players missing from one of them are reported as
+    "unverified" instead of "removed".
+    """
+    idx = [COLUMNS.index(c) for c in TRACKED]
+    incomplete = {tuple(b[:3]) for b in lost}
+    before = {row_key(r): r for r in from_columns(old)}
+    added, changed = [], []
+    seen = set()
+    for r in from_columns(new):
+        k = row_key(r)
+        seen.add(k)
+        prev = before.get(k)
+        if prev is None:
+            added.append(r)
+        elif any(prev[i] != r[i] for i in idx):
+            changed.append(r)
+    removed, unverified = [], []
+    for k, r in before.items():
+        if k not in seen:
+            lost_bracket = (r[0], r[1], r[2]) in incomplete or (r[0], r[1], None) in incomplete
+            (unverified if lost_bracket else removed).append(list(k))
+    return {
+        "counts": {"added": len(added), "changed": len(changed), "removed": len(removed), "unverified": len(unverified)},
+        "added": to_columns(added),
+        "changed": to_columns(changed),
+        "removed": removed,
+        "unverified": unverified,
+    }
+
+
+class LadderSnapshots:
+    """`<root>/<platform>/ladder_<ts>.json.gz` snapshots with a `diff_<ts>` record against the previous one.
+
+    save(rows, meta, lost) keeps the crawler's lost brackets in the snapshot and in the diff.
+    """
+
+    def __init__(self, root, platform: str, codec: str = "gzip"):
+        d = os.path.join(str(root), platform)
+        self.platform = platform
+        self.snapshots = RecordStore(d, "ladder", codec)
+        self.diffs = RecordStore(d, "diff", codec)
+
+    def latest(self) -> Optional[str]:
+        keys = sorted(self.snapshots.keys())
+        return keys[-1] if keys else None
+
+    def save(self, rows: List[Tuple], meta: Optional[Dict] = None, lost: Iterable[Sequence] = ()) -> Dict:
+        key = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+        prev = self.latest()
+        columns = to_columns(rows)
+        lost = [list(b) for b in lost]
+        path = self.snapshots.save(key, {"platform": self.platform, "created": key, "rows": len(rows), "meta": meta or {},
+                                         "lost": lost, "columns": columns})
+        out = {"snapshot": path, "rows": len(rows), "previous": prev, "lost": lost}
+        if prev is not None and prev != key:
+            d = diff_snapshots(self.snapshots.load(prev)["columns"], columns, lost)
+            out["diff"] = self.diffs.save(key, dict(d, previous=prev, current=key))
+            out["counts"] = d["counts"]
+        return out
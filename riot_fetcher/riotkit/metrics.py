@@ -0,0 +1,232 @@
+import bisect
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+# Latency histogram upper bounds, in seconds (Prometheus-style, cumulative on export)
+BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, v: float):
+        self.counts[bisect.bisect_left(BUCKETS, v)] += 1
+        self.sum += v
+        self.count += 1
+        if v > self.max:
+            self.max = v
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation (max for the overflow bucket)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return BUCKETS[i] if i < len(BUCKETS) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "avg": round(self.sum / self.count, 6) if self.count else None,
+            "max": round(self.max, 6),
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": {str(b): n for b, n in zip(BUCKETS + ("+Inf",), self.counts)},
+        }
+
+
+class EndpointStats:
+    __slots__ = ("requests", "status", "retries", "rate_limited", "retry_after", "bytes", "latency", "coalesced")
+
+    def __init__(self):
+        self.requests = 0
+        self.status: Dict[int, int] = {}
+        self.retries = 0
+        self.rate_limited = 0
+        self.retry_after = 0.0
+        self.bytes = 0
+        self.latency = Histogram()
+        self.coalesced = 0
+
+
+class Metrics:
+    """Per-endpoint request counters, latency histograms, bytes and time lost to backoff.
+
+    Clients call record()/sleep()/limited(); every call is also sent to the hooks as an
+    event dict, so callers can forward them elsewhere without polling snapshot().
+    """
+
+    def __init__(self):
+        self.endpoints: Dict[str, EndpointStats] = {}
+        self.sleeps: Dict[str, float] = {}
+        self.hooks: List[Callable[[Dict], None]] = []
+        self.lock = threading.Lock()
+
+    def add_hook(self, fn: Callable[[Dict], None]):
+        self.hooks.append(fn)
+
+    def _emit(self, event: Dict):
+        for fn in self.hooks:
+            fn(event)
+
+    def _ep(self, method: str) -> EndpointStats:
+        st = self.endpoints.get(method)
+        if st is None:
+            st = self.endpoints[method] = EndpointStats()
+        return st
+
+    def record(self, method: str, host: str, status: int, latency: float, nbytes: int, attempt: int = 0):
+        with self.lock:
+            st = self._ep(method)
+            st.requests += 1
+            st.status[status] = st.status.get(status, 0) + 1
+            st.retries += attempt > 0
+            st.bytes += nbytes
+            st.latency.observe(latency)
+        if self.hooks:
+            self._emit({"event": "response", "method": method, "host": host, "status": status, "latency": latency, "bytes": nbytes, "attempt": attempt})
+
+    def limited(self, method: str, host: str, retry_after: float, kind: Optional[str]):
+        with self.lock:
+            st = self._ep(method)
+            st.rate_limited += 1
+            st.retry_after += retry_after
+        if self.hooks:
+            self._emit({"event": "rate_limited", "method": method, "host": host, "retry_after": retry_after, "kind": kind})
+
+    def coalesced(self, method: str, host: str):
+        """A call served by an identical request already in flight (no request sent)."""
+        with self.lock:
+            self._ep(method).coalesced += 1
+        if self.hooks:
+            self._emit({"event": "coalesced", "method": method, "host": host})
+
+    def sleep(self, kind: str, seconds: float, method: Optional[str] = None, host: Optional[str] = None):
+        """Time spent waiting: "throttle" (rate limiter, including 429 penalties) or "server_error" (5xx backoff)."""
+        with self.lock:
+            self.sleeps[kind] = self.sleeps.get(kind, 0.0) + seconds
+        if self.hooks:
+            self._emit({"event": "sleep", "kind": kind, "seconds": seconds, "method": method, "host": host})
+
+    def snapshot(self, limiter=None, cache=None, controller=None) -> Dict[str, Any]:
+        with self.lock:
+            eps = {
+                m: {
+                    "requests": st.requests,
+                    "status": {str(k): v for k, v in sorted(st.status.items())},
+                    "retries": st.retries,
+                    "rate_limited": st.rate_limited,
+                    "retry_after_s": round(st.retry_after, 3),
+                    "bytes": st.bytes,
+                    "coalesced": st.coalesced,
+                    "latency": st.latency.to_dict(),
+                }
+                for m, st in sorted(self.endpoints.items())
+            }
+            sleeps = {k: round(v, 3) for k, v in self.sleeps.items()}
+        out = {
+            "totals": {
+                "requests": sum(e["requests"] for e in eps.values()),
+                "bytes": sum(e["bytes"] for e in eps.values()),
+                "rate_limited": sum(e["rate_limited"] for e in eps.values()),
+                "coalesced": sum(e["coalesced"] for e in eps.values()),
+                "backoff_sleep_s": round(sum(sleeps.values()), 3),
+            },
+            "sleep_s": sleeps,
+            "endpoints": eps,
+        }
+        if limiter is not None:
+            out["rate_limits"] = limiter.snapshot()
+        if cache is not None:
+            out["cache"] = cache.stats()
+        if controller is not None:
+            out["concurrency"] = controller.snapshot()
+        return out
+
+    def prometheus(self, limiter=None, cache=None, prefix: str = "riot", controller=None) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        lines = []
+
+        def metric(name, kind, samples):
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for labels, v in samples:
+                lab = ",".join(f'{k}="{val}"' for k, val in labels.items())
+                lines.append(f"{prefix}_{name}{{{lab}}} {v}" if lab else f"{prefix}_{name} {v}")
+
+        with self.lock:
+            items = sorted(self.endpoints.items())
+            metric("requests_total", "counter", [({"method": m, "status": s}, n) for m, st in items for s, n in sorted(st.status.items())])
+            metric("rate_limited_total", "counter", [({"method": m}, st.rate_limited) for m, st in items])
+            metric("response_bytes_total", "counter", [({"method": m}, st.bytes) for m, st in items])
+            metric("coalesced_total", "counter", [({"method": m}, st.coalesced) for m, st in items])
+            lines.append(f"# TYPE {prefix}_request_latency_seconds histogram")
+            for m, st in items:
+                acc = 0
+                for b, n in zip(BUCKETS + ("+Inf",), st.latency.counts):
+                    acc += n
+                    lines.append(f'{prefix}_request_latency_seconds_bucket{{method="{m}",le="{b}"}} {acc}')
+                lines.append(f'{prefix}_request_latency_seconds_sum{{method="{m}"}} {st.latency.sum}')
+                lines.append(f'{prefix}_request_latency_seconds_count{{method="{m}"}} {st.latency.count}')
+            metric("backoff_sleep_seconds_total", "counter", [({"kind": k}, v) for k, v in sorted(self.sleeps.items())])
+        if limiter is not None:
+            snap = limiter.snapshot()
+            samples = []
+            for scope in ("app", "method"):
+                for key, windows in snap[scope].items():
+                    host, _, method = key.partition(" ")
+                    for lw, used in windows.items():
+                        limit, window = lw.split(":")
+                        labels = {"scope": scope, "host": host, "window": window}
+                        if method:
+                            labels["method"] = method
+                        samples.append((dict(labels, limit=limit), used))
+            metric("rate_limit_used", "gauge", samples)
+        if cache is not None:
+            st = cache.stats()
+            metric("cache_total", "counter", [({"result": k}, st[k]) for k in ("hits", "misses", "evictions", "revalidated")])
+        if controller is not None:
+            hosts = sorted(controller.snapshot().items())
+            metric("concurrency_limit", "gauge", [({"host": h}, st["limit"]) for h, st in hosts])
+            metric("concurrency_inflight", "gauge", [({"host": h}, st["inflight"]) for h, st in hosts])
+            metric("circuit_open", "gauge", [({"host": h}, int(st["state"] != "closed")) for h, st in hosts])
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int = 9108, host: str = "127.0.0.1", limiter=None, cache=None, controller=None) -> ThreadingHTTPServer:
+        """Serve /metrics (Prometheus text) and /metrics.json from a daemon thread; call .shutdown() to stop."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/metrics.json"):
+                    body, ctype = json.dumps(metrics.snapshot(limiter, cache, controller)).encode(), "application/json"
+                elif self.path.startswith("/metrics"):
+                    body, ctype = metrics.prometheus(limiter, cache, controller=controller).encode(), "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        httpd = ThreadingHTTPServer((host, port), Handler)
+        httpd.daemon_threads = True
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        return httpd
@@ -0,0 +1,124 @@
+import os
+from typing import Dict, Iterable, Optional
+from .storage import EXTENSIONS, get_codec, read_record, split_ext, write_record, zstandard
+
+# Fields kept per match participant (match-v5 has ~150 plus a `challenges` object of ~120)
+PARTICIPANT_FIELDS = (
+    "participantId", "puuid", "riotIdGameName", "riotIdTagline", "summonerName", "summonerId", "summonerLevel",
+    "profileIcon", "teamId", "win", "gameEndedInEarlySurrender", "championId", "championName", "champLevel",
+    "teamPosition", "individualPosition", "lane", "role", "kills", "deaths", "assists", "goldEarned",
+    "totalDamageDealtToChampions", "totalDamageTaken", "damageDealtToObjectives", "visionScore", "wardsPlaced",
+    "wardsKilled", "totalMinionsKilled", "neutralMinionsKilled", "timePlayed", "summoner1Id", "summoner2Id",
+    "item0", "item1", "item2", "item3", "item4", "item5", "item6",
+    "challenges.kda", "challenges.killParticipation", "challenges.damagePerMinute", "challenges.goldPerMinute",
+    "challenges.teamDamagePercentage", "challenges.visionScorePerMinute", "challenges.laneMinionsFirst10Minutes",
+)
+TEAM_FIELDS = (
+    "teamId", "win", "bans",
+    "objectives.baron.kills", "objectives.dragon.kills", "objectives.riftHerald.kills", "objectives.horde.kills",
+    "objectives.tower.kills", "objectives.inhibitor.kills", "objectives.champion.kills",
+)
+MATCH_FIELDS = (
+    "metadata.matchId", "metadata.participants",
+    "info.gameId", "info.platformId", "info.queueId", "info.mapId", "info.gameMode", "info.gameType", "info.gameVersion",
+    "info.gameCreation", "info.gameStartTimestamp", "info.gameEndTimestamp", "info.gameDuration", "info.endOfGameResult",
+) + tuple("info.participants." + f for f in PARTICIPANT_FIELDS) + tuple("info.teams." + f for f in TEAM_FIELDS)
+
+# Per-minute participant frame fields (covers frames.PARTICIPANT_STATS)
+PARTICIPANT_FRAME_FIELDS = (
+    "participantId", "totalGold", "currentGold", "goldPerSecond", "xp", "level", "minionsKilled", "jungleMinionsKilled",
+    "position", "timeEnemySpentControlled", "damageStats.totalDamageDoneToChampions", "damageStats.totalDamageTaken",
+)
+# Event fields (covers frames._event); the bulky victimDamageDealt/Received lists are dropped
+EVENT_FIELDS = (
+    "type", "timestamp", "participantId", "killerId", "creatorId", "victimId", "teamId", "killerTeamId", "winningTeam",
+    "assistingParticipantIds", "position", "itemId", "beforeId", "afterId", "skillSlot", "level", "bounty",
+    "shutdownBounty", "multiKillLength", "killType", "featType", "featValue", "monsterType", "monsterSubType",
+    "buildingType", "towerType", "laneType", "wardType",
+)
+TIMELINE_FIELDS = (
+    "metadata.matchId", "metadata.participants", "info.gameId", "info.frameInterval", "info.participants",
+    "info.endOfGameResult", "info.frames.timestamp",
+) + tuple("info.frames.participantFrames.*." + f for f in PARTICIPANT_FRAME_FIELDS) + tuple("info.frames.events." + f for f in EVENT_FIELDS)
+
+# Codec for the optional raw copies kept next to projected records
+COLD_CODEC = "zstd" if zstandard is not None else "gzip"
+
+
+def _compile(fields: Iterable[str]) -> Dict:
+    tree: Dict = {}
+    for f in fields:
+        node = tree
+        *path, last = f.split(".")
+        for k in path:
+            if k in node and node[k] is None:
+                break
+            node = node.setdefault(k, {})
+        else:
+            node[last] = None
+    return tree
+
+
+def _apply(tree: Dict, v):
+    if isinstance(v, list):
+        return [_apply(tree, x) for x in v]
+    if not isinstance(v, dict):
+        return v
+    star = tree.get("*")
+    if star is not None:
+        return {k: _apply(star, x) for k, x in v.items()}
+    return {k: v[k] if sub is None else _apply(sub, v[k]) for k, sub in tree.items() if k in v}
+
+
+class Projection:
+    """Keep only the listed dotted paths of a payload, in the same nested shape.
+
+    A step over a list applies to every element, and `*` matches every key of a dict
+    (timeline participantFrames are keyed "1".."10"). Missing fields are left out, so
+    projecting twice gives the same record.
+    """
+
+    def __init__(self, fields: Iterable[str]):
+        self.fields = tuple(fields)
+        self.tree = _compile(self.fields)
+
+    def __call__(self, payload: Dict) -> Dict:
+        return _apply(self.tree, payload)
+
+
+MATCH = Projection(MATCH_FIELDS)
+PARTICIPANT = Projection(PARTICIPANT_FIELDS)
+TIMELINE = Projection(TIMELINE_FIELDS)
+PROJECTIONS = {"match": MATCH, "timeline": TIMELINE}
+
+
+def project_dir(directory, kind: str, raw_dir: Optional[str] = None) -> Dict:
+    """Project every record of a directory in place, keeping each file's format.
+
+    With raw_dir, the full payload is first copied there in COLD_CODEC. Running it again is
+    safe: records that are already projected are left alone ("unchanged"), and an existing
+    raw copy is never overwritten.
+    """
+    proj = PROJECTIONS[kind]
+    cold = get_codec(COLD_CODEC)
+    if raw_dir:
+        os.makedirs(raw_dir, exist_ok=True)
+    stats = {"projected": 0, "unchanged": 0, "skipped": 0, "bytes_before": 0, "bytes_after": 0, "raw_bytes": 0}
+    for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+        stem, ext = split_ext(entry.name)
+        if ext is None or not stem.startswith(kind + "_"):
+            stats["skipped"] += 1
+            continue
+        raw = read_record(entry.path)
+        projected = proj(raw)
+        if projected == raw:
+            stats["unchanged"] += 1
+            continue
+        if raw_dir and not any(os.path.exists(os.path.join(raw_dir, stem + e)) for e in EXTENSIONS):
+            stats["raw_bytes"] += os.path.getsize(write_record(os.path.join(raw_dir, stem), raw, cold))
+        size = entry.stat().st_size
+        f = write_record(os.path.join(directory, stem), projected, EXTENSIONS[ext]())
+        stats["projected"] += 1
+        stats["bytes_before"] += size
+        stats["bytes_after"] += os.path.getsize(f)
+    return stats
@@ -0,0 +1,143 @@
+import time
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Mapping, Optional, Tuple
+
+DEFAULT_APP_LIMITS = "20:1,100:120"
+
+
+def parse_limits(value: Optional[str]) -> List[Tuple[int, int]]:
+    out = []
+    for part in (value or "").split(","):
+        a, _, b = part.strip().partition(":")
+        if a.isdigit() and b.isdigit():
+            out.append((int(a), int(b)))
+    return out
+
+
+class TokenBucket:
+    """Holds `limit` tokens; each token taken comes back `window` seconds later."""
+
+    def __init__(self, limit: int, window: float, margin: float = 0.05, pad: float = 0.05):
+        self.used: Deque[float] = deque()
+        self.margin = margin
+        self.pad = pad
+        self.resize(limit, window)
+
+    def resize(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self.capacity = max(1, int(limit * (1 - self.margin)))
+
+    def _drain(self, now: float):
+        horizon = now - self.window - self.pad
+        while self.used and self.used[0] <= horizon:
+            self.used.popleft()
+
+    def wait(self, now: float) -> float:
+        self._drain(now)
+        if len(self.used) < self.capacity:
+            return 0.0
+        return self.used[len(self.used) - self.capacity] + self.window + self.pad - now
+
+    def take(self, now: float):
+        self.used.append(now)
+
+    def sync(self, count: int, now: float):
+        self._drain(now)
+        missing = count - len(self.used)
+        if missing > 0:
+            self.used.extend([now] * missing)
+
+
+class RateLimiter:
+    """Proactive limiter keyed on routing host (app limits) and host+method (method limits).
+
+    Limits are learned from the X-App-Rate-Limit / X-Method-Rate-Limit headers and the
+    matching *-Count headers, so requests from other processes sharing the key are
+    accounted for. Until the first response, app limits default to a development key.
+    """
+
+    def __init__(self, margin: float = 0.05, default_app_limits: str = DEFAULT_APP_LIMITS, clock=time.monotonic, sleep=time.sleep):
+        self.margin = margin
+        self.default_app_limits = parse_limits(default_app_limits)
+        self.clock = clock
+        self.sleep = sleep
+        self.app: Dict[str, Dict[int, TokenBucket]] = {}
+        self.method: Dict[Tuple[str, str], Dict[int, TokenBucket]] = {}
+        self.blocked: Dict[object, float] = {}
+        self.lock = threading.Lock()
+
+    def _app(self, host: str) -> Dict[int, TokenBucket]:
+        b = self.app.get(host)
+        if b is None:
+            b = self.app[host] = {w: TokenBucket(n, w, self.margin) for n, w in self.default_app_limits}
+        return b
+
+    def _buckets(self, host: str, method: str) -> List[TokenBucket]:
+        return list(self._app(host).values()) + list(self.method.get((host, method), {}).values())
+
+    def try_acquire(self, host: str, method: str) -> float:
+        with self.lock:
+            now = self.clock()
+            buckets = self._buckets(host, method)
+            w = max([b.wait(now) for b in buckets] + [0.0])
+            for k in (host, (host, method)):
+                w = max(w, self.blocked.get(k, 0.0) - now)
+            if w > 0:
+                return w
+            for b in buckets:
+                b.take(now)
+            return 0.0
+
+    def acquire(self, host: str, method: str) -> float:
+        waited = 0.0
+        while True:
+            w = self.try_acquire(host, method)
+            if w <= 0:
+                return waited
+            self.sleep(w)
+            waited += w
+
+    def _apply(self, buckets: Dict[int, TokenBucket], limits: str, counts: str, now: float):
+        spec = parse_limits(limits)
+        if spec:
+            for n, w in spec:
+                if w in buckets:
+                    buckets[w].resize(n, w)
+                else:
+                    buckets[w] = TokenBucket(n, w, self.margin)
+            for w in [w for w in buckets if w not in {w for _, w in spec}]:
+                del buckets[w]
+        for n, w in parse_limits(counts):
+            if w in buckets:
+                buckets[w].sync(n, now)
+
+    def update(self, host: str, method: str, headers: Mapping[str, str]):
+        with self.lock:
+            now = self.clock()
+            if headers.get("X-App-Rate-Limit") or headers.get("X-App-Rate-Limit-Count"):
+                self._apply(self._app(host), headers.get("X-App-Rate-Limit"), headers.get("X-App-Rate-Limit-Count"), now)
+            if headers.get("X-Method-Rate-Limit") or headers.get("X-Method-Rate-Limit-Count"):
+                self._apply(self.method.setdefault((host, method), {}), headers.get("X-Method-Rate-Limit"), headers.get("X-Method-Rate-Limit-Count"), now)
+
+    def penalize(self, host: str, method: str, wait: float, kind: Optional[str] = None):
+        key = host if kind == "application" else (host, method)
+        with self.lock:
+            until = self.clock() + wait
+            if until > self.blocked.get(key, 0.0):
+                self.blocked[key] = until
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            now = self.clock()
+            def dump(bs):
+                out = {}
+                for w, b in bs.items():
+                    b._drain(now)
+                    out[f"{b.limit}:{w}"] = len(b.used)
+                return out
+            return {
+                "app": {h: dump(bs) for h, bs in self.app.items()},
+                "method": {f"{h} {m}": dump(bs) for (h, m), bs in self.method.items()},
+            }
@@ -0,0 +1,121 @@
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from .adaptive import ConcurrencyController
+from .batch import run_batch
+from .client import BASE_URL, RiotClient
+from .flight import SingleFlight
+from .metrics import Metrics
+from .ratelimit import RateLimiter
+
+# platform -> regional routing used by account-v1 and match-v5
+REGIONAL = {
+    "br1": "americas", "la1": "americas", "la2": "americas", "na1": "americas",
+    "eun1": "europe", "euw1": "europe", "me1": "europe", "ru": "europe", "tr1": "europe",
+    "jp1": "asia", "kr": "asia",
+    "oc1": "sea", "ph2": "sea", "sg2": "sea", "th2": "sea", "tw2": "sea", "vn2": "sea",
+}
+
+
+def platform_of(match_id: str) -> str:
+    """`EUW1_123` -> `euw1`, `KR_123` -> `kr`."""
+    prefix, sep, _ = match_id.partition("_")
+    if not sep:
+        raise ValueError(f"match id without platform prefix: {match_id}")
+    return prefix.lower()
+
+
+class RegionRouter:
+    """One RiotClient per platform, all sharing one RateLimiter.
+
+    The limiter keeps its buckets per routing host, so every host (kr, euw1, asia, europe, ...)
+    spends its own budget, and platforms behind the same regional host (euw1/eun1 -> europe)
+    share it as Riot does. map() runs one worker pool per host, so a throttled region never
+    holds threads another region could use. An optional ConcurrencyController is shared the
+    same way: its limits and circuit breakers are per routing host.
+    """
+
+    def __init__(self, api_key: str, platforms: Iterable[str] = (), limiter: Optional[RateLimiter] = None, pool_size: int = 10,
+                 base_url: str = BASE_URL, cache=None, client_factory: Optional[Callable[[str, str], Any]] = None,
+                 controller: Optional[ConcurrencyController] = None):
+        self.api_key = api_key
+        self.limiter = limiter if limiter is not None else RateLimiter()
+        self.pool_size = pool_size
+        self.base_url = base_url
+        self.cache = cache
+        self.controller = controller
+        self.metrics = Metrics()
+        self.flights = SingleFlight()
+        self.factory = client_factory or self._client
+        self.clients: Dict[str, Any] = {}
+        self.lock = threading.Lock()
+        for p in platforms:
+            self.client(p)
+
+    def _client(self, platform: str, regional: str):
+        c = RiotClient(self.api_key, platform, regional, limiter=self.limiter, pool_size=self.pool_size, base_url=self.base_url, cache=self.cache, metrics=self.metrics,
+                      controller=self.controller)
+        # euw1 and eun1 clients both call europe: share in-flight requests across platforms
+        c.flights = self.flights
+        return c
+
+    def client(self, platform: str):
+        platform = platform.lower()
+        with self.lock:
+            c = self.clients.get(platform)
+            if c is None:
+                if platform not in REGIONAL:
+                    raise ValueError(f"unknown platform: {platform}")
+                c = self.clients[platform] = self.factory(platform, REGIONAL[platform])
+            return c
+
+    def client_for_match(self, match_id: str):
+        return self.client(platform_of(match_id))
+
+    def map(self, fn: Callable, items: Iterable[str], platform: Callable[[str], str] = platform_of, regional: bool = True,
+            workers: int = 8) -> Iterator[Tuple[str, Any, Optional[Exception]]]:
+        """fn(client, item) for every item on the client of platform(item); yields (item, result, error) as they complete.
+
+        Items are grouped by routing host (regional host when `regional`, platform otherwise) and each
+        group runs on its own pool of `workers` threads, all groups at the same time.
+        """
+        groups: Dict[str, List[str]] = {}
+        errors = []
+        for item in items:
+            try:
+                p = platform(item).lower()
+                self.client(p)
+            except ValueError as e:
+                errors.append((item, None, e))
+                continue
+            groups.setdefault(REGIONAL[p] if regional else p, []).append(item)
+        yield from errors
+        out: "queue.Queue" = queue.Queue()
+        done = object()
+
+        def drain(ids: List[str]):
+            try:
+                for res in run_batch(lambda i: fn(self.client(platform(i)), i), ids, workers):
+                    out.put(res)
+            finally:
+                out.put(done)
+
+        threads = [threading.Thread(target=drain, args=(ids,), daemon=True) for ids in groups.values()]
+        for t in threads:
+            t.start()
+        remaining = len(threads)
+        while remaining:
+            res = out.get()
+            if res is done:
+                remaining -= 1
+            else:
+                yield res
+        for t in threads:
+            t.join()
+
+    def hosts(self) -> Dict[str, List[str]]:
+        """Regional host -> platforms currently open."""
+        out: Dict[str, List[str]] = {}
+        for p in sorted(self.clients):
+            out.setdefault(REGIONAL[p], []).append(p)
+        return out
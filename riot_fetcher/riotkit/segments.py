@@ -0,0 +1,364 @@
+import mmap
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from .storage import _compact, get_codec, read_record, split_ext
+from .writer import fsync_dir
+
+# Segment record: header, key, payload. The header lets the index be rebuilt from the segments alone.
+RECORD_MAGIC = b"RSG1"
+RECORD_HEAD = struct.Struct("<4sIHI")  # magic, crc32(payload), key length, payload length
+# Index: magic and codec line, then one entry per put (the last entry for a key wins)
+INDEX_MAGIC = b"RIDX1 "
+INDEX_ENTRY = struct.Struct("<HIQI")  # key length, segment, payload offset, payload length
+
+Location = Tuple[int, int, int]  # segment, offset, length
+
+
+class SegmentStore:
+    """Append-only record segments with a key -> (segment, offset, length) index.
+
+    Records are appended to `<prefix>-NNNNNN.seg` files of up to `segment_size` bytes, and
+    each put adds one fixed-size entry to `<prefix>.idx`. Opening the store reads the index
+    into a dict, so get() is one lookup plus a slice of a read-only mmap: only that record
+    is copied and decoded. get_many() and items() read in file order, so loading a large
+    subset is a few sequential passes over big files instead of one open per record.
+
+    A put writes the segment record before its index entry, so a crash leaves at worst an
+    unindexed record tail. On open, a torn index tail is cut off, the intact records past
+    the last indexed one of the active segment are indexed again, and a torn record at its
+    end is truncated, so new records never land behind garbage. A missing index is rebuilt
+    from the segment headers. Putting an existing key appends a new version; compact()
+    rewrites the live records into fresh segments.
+
+    readonly=True never creates, truncates or writes a file (recovery only happens in
+    memory) and put()/compact() raise: readers such as load_corpus use it.
+
+    The codec is fixed when the store is created (stored in the index header). "json" is
+    written without indentation.
+    """
+
+    def __init__(self, root, prefix: str = "match", codec: str = "json", segment_size: int = 256 << 20, fsync: bool = False,
+                 readonly: bool = False):
+        self.root = Path(root)
+        self.prefix = prefix
+        self.segment_size = segment_size
+        self.fsync = fsync
+        self.readonly = readonly
+        if not readonly:
+            self.root.mkdir(parents=True, exist_ok=True)
+        self.index: Dict[str, Location] = {}
+        self.maps: Dict[int, mmap.mmap] = {}
+        self.lock = threading.Lock()
+        self.out = self.idx_out = None
+        if self.index_path.exists():
+            codec = self._load_index()
+        elif self.segments():
+            codec = self.rebuild_index(codec)
+        elif readonly:
+            raise FileNotFoundError(f"no segment store at {self.index_path}")
+        else:
+            self._write_index({}, codec)
+        self.codec = get_codec(codec)
+        self.active = max(self.segments(), default=1)
+        self._recover_tail()
+        if not readonly:
+            self._open_active(self.active)
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / f"{self.prefix}.idx"
+
+    def segment_path(self, n: int) -> Path:
+        return self.root / f"{self.prefix}-{n:06d}.seg"
+
+    def segments(self) -> List[int]:
+        head, out = f"{self.prefix}-", []
+        for entry in os.scandir(self.root):
+            if entry.name.startswith(head) and entry.name.endswith(".seg"):
+                num = entry.name[len(head):-4]
+                if num.isdigit():
+                    out.append(int(num))
+        return sorted(out)
+
+    # Index
+
+    def _load_index(self) -> str:
+        with open(self.index_path, "rb") as fh:
+            raw = fh.read()
+        if not raw.startswith(INDEX_MAGIC) or b"\n" not in raw:
+            raise ValueError(f"not a segment index: {self.index_path}")
+        header_end = raw.index(b"\n") + 1
+        codec = raw[len(INDEX_MAGIC):header_end - 1].decode()
+        pos, end, size = header_end, len(raw), INDEX_ENTRY.size
+        unpack, index = INDEX_ENTRY.unpack_from, self.index
+        while pos + size <= end:
+            klen, seg, off, length = unpack(raw, pos)
+            if pos + size + klen > end:
+                break
+            index[raw[pos + size:pos + size + klen].decode()] = (seg, off, length)
+            pos += size + klen
+        if pos != end and not self.readonly:
+            with open(self.index_path, "r+b") as fh:
+                fh.truncate(pos)
+        return codec
+
+    def _write_index(self, index: Dict[str, Location], codec: str):
+        """Replace the index file atomically with the given entries."""
+        tmp = f"{self.index_path}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(INDEX_MAGIC + codec.encode() + b"\n")
+            for key, (seg, off, length) in index.items():
+                k = key.encode()
+                fh.write(INDEX_ENTRY.pack(len(k), seg, off, length) + k)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, self.index_path)
+        fsync_dir(str(self.root))
+
+    def rebuild_index(self, codec: Optional[str] = None) -> str:
+        """Recreate the index by scanning every segment (later records win); returns the codec."""
+        if codec is None:
+            codec = self.codec.name
+        self.index = {}
+        for seg in self.segments():
+            for key, off, length in self._scan(seg):
+                self.index[key] = (seg, off, length)
+        if not self.readonly:
+            self._write_index(self.index, codec)
+        return codec
+
+    # Segments
+
+    def _recover_tail(self):
+        """Index the intact records past the last indexed one of the active segment, then cut off a torn record."""
+        path = self.segment_path(self.active)
+        if not path.exists():
+            return
+        end = max((off + length for seg, off, length in self.index.values() if seg == self.active), default=0)
+        found = list(self._scan(self.active, end))
+        for key, off, length in found:
+            self.index[key] = (self.active, off, length)
+            end = off + length
+        if self.readonly:
+            return
+        if found:
+            with open(self.index_path, "ab") as fh:
+                for key, off, length in found:
+                    k = key.encode()
+                    fh.write(INDEX_ENTRY.pack(len(k), self.active, off, length) + k)
+        if os.path.getsize(path) > end:
+            with open(path, "r+b") as fh:
+                fh.truncate(end)
+
+    def _open_active(self, seg: int):
+        self.active = seg
+        self.out = open(self.segment_path(seg), "ab")
+        self.out_size = self.out.tell()
+        self.idx_out = open(self.index_path, "ab")
+
+    def _roll(self):
+        self.out.close()
+        self.active += 1
+        self.out = open(self.segment_path(self.active), "ab")
+        self.out_size = 0
+
+    def _map(self, seg: int, end: int) -> mmap.mmap:
+        mm = self.maps.get(seg)
+        if mm is None or end > len(mm):
+            # the active segment grows: map it again (views of the old map keep it alive)
+            with open(self.segment_path(seg), "rb") as fh:
+                mm = self.maps[seg] = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        return mm
+
+    def _scan(self, seg: int, start: int = 0) -> Iterator[Tuple[str, int, int]]:
+        """(key, payload offset, payload length) of every intact record of a segment from start, stopping at a torn tail."""
+        path = self.segment_path(seg)
+        if os.path.getsize(path) <= start:
+            return
+        with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos, end, size = start, len(mm), RECORD_HEAD.size
+            while pos + size <= end:
+                magic, crc, klen, length = RECORD_HEAD.unpack_from(mm, pos)
+                off = pos + size + klen
+                if magic != RECORD_MAGIC or off + length > end or zlib.crc32(mm[off:off + length]) != crc:
+                    break
+                yield mm[pos + size:off].decode(), off, length
+                pos = off + length
+
+    # Records
+
+    def _encode(self, payload) -> bytes:
+        return _compact(payload) if self.codec.name == "json" else self.codec.dumps(payload)
+
+    def _append(self, key: str, data: bytes):
+        if self.readonly:
+            raise RuntimeError(f"segment store {self.root} is open read-only")
+        k = key.encode()
+        if self.out_size and self.out_size + RECORD_HEAD.size + len(k) + len(data) > self.segment_size:
+            self._roll()
+        self.out.write(RECORD_HEAD.pack(RECORD_MAGIC, zlib.crc32(data), len(k), len(data)) + k)
+        self.out.write(data)
+        off = self.out_size + RECORD_HEAD.size + len(k)
+        self.out_size = off + len(data)
+        self.idx_out.write(INDEX_ENTRY.pack(len(k), self.active, off, len(data)) + k)
+        self.index[key] = (self.active, off, len(data))
+
+    def _sync(self):
+        # segment first: an index entry must never point past the end of its segment
+        self.out.flush()
+        if self.fsync:
+            os.fsync(self.out.fileno())
+        self.idx_out.flush()
+        if self.fsync:
+            os.fsync(self.idx_out.fileno())
+
+    def put(self, key: str, payload):
+        data = self._encode(payload)
+        with self.lock:
+            self._append(key, data)
+            self._sync()
+
+    def put_many(self, items: Iterable[Tuple[str, object]]) -> int:
+        """Append many records with one flush at the end; returns the count."""
+        n = 0
+        with self.lock:
+            for key, payload in items:
+                self._append(key, self._encode(payload))
+                n += 1
+            self._sync()
+        return n
+
+    def get_raw(self, key: str) -> memoryview:
+        """Encoded bytes of a record as a view into the segment map (no copy). Valid while the store is open."""
+        seg, off, length = self.index[key]
+        return memoryview(self._map(seg, off + length))[off:off + length]
+
+    def get(self, key: str, default=None):
+        loc = self.index.get(key)
+        if loc is None:
+            return default
+        seg, off, length = loc
+        return self.codec.loads(self._map(seg, off + length)[off:off + length])
+
+    def get_many(self, keys: Iterable[str]) -> Iterator[Tuple[str, object]]:
+        """(key, payload) for the keys present, in file order rather than request order."""
+        locs = sorted((self.index[k], k) for k in keys if k in self.index)
+        for (seg, off, length), key in locs:
+            yield key, self.codec.loads(self._map(seg, off + length)[off:off + length])
+
+    def items(self) -> Iterator[Tuple[str, object]]:
+        return self.get_many(list(self.index))
+
+    def values(self) -> Iterator[object]:
+        for _, payload in self.items():
+            yield payload
+
+    def keys(self) -> Iterator[str]:
+        return iter(list(self.index))
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def stats(self) -> Dict:
+        segs = self.segments()
+        return {
+            "records": len(self.index),
+            "segments": len(segs),
+            "bytes": sum(os.path.getsize(self.segment_path(s)) for s in segs),
+            "live_bytes": sum(length for _, _, length in self.index.values()),
+        }
+
+    def compact(self) -> Dict:
+        """Copy the live records into new segments, swap the index, delete the old segments.
+
+        Superseded versions and unindexed tails are dropped. Records are copied as encoded
+        bytes, in key order. A crash before the index swap leaves the old store intact.
+        """
+        if self.readonly:
+            raise RuntimeError(f"segment store {self.root} is open read-only")
+        with self.lock:
+            before = self.stats()
+            old = self.segments()
+            self._sync()
+            self.out.close()
+            self.idx_out.close()
+            first = self.active + 1
+            self.active, self.out_size = first, 0
+            self.out = open(self.segment_path(first), "ab")
+            index: Dict[str, Location] = {}
+            for key in sorted(self.index):
+                seg, off, length = self.index[key]
+                data = self._map(seg, off + length)[off:off + length]
+                k = key.encode()
+                if self.out_size and self.out_size + RECORD_HEAD.size + len(k) + length > self.segment_size:
+                    os.fsync(self.out.fileno())
+                    self._roll()
+                self.out.write(RECORD_HEAD.pack(RECORD_MAGIC, zlib.crc32(data), len(k), length) + k)
+                self.out.write(data)
+                index[key] = (self.active, self.out_size + RECORD_HEAD.size + len(k), length)
+                self.out_size += RECORD_HEAD.size + len(k) + length
+            self.out.flush()
+            os.fsync(self.out.fileno())
+            self.out.close()
+            self._write_index(index, self.codec.name)
+            self.index = index
+            self._close_maps()
+            for seg in old:
+                os.remove(self.segment_path(seg))
+            self._open_active(self.active)
+            after = self.stats()
+        return {"records": after["records"], "segments_before": before["segments"], "segments_after": after["segments"],
+                "bytes_before": before["bytes"], "bytes_after": after["bytes"]}
+
+    def _close_maps(self):
+        for mm in self.maps.values():
+            try:
+                mm.close()
+            except BufferError:
+                pass  # a get_raw() view is still alive: the map closes when it is released
+        self.maps = {}
+
+    def close(self):
+        with self.lock:
+            if self.out is not None:
+                self._sync()
+                self.out.close()
+                self.idx_out.close()
+            self._close_maps()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def is_segment_dir(directory, prefix: str = "match") -> bool:
+    return os.path.exists(os.path.join(directory, f"{prefix}.idx"))
+
+
+def pack_dir(directory, out, kind: str = "match", codec: str = "json", segment_size: int = 256 << 20) -> Dict:
+    """Append every `<kind>_*` record file of a directory (any storage codec) to the segment store at out."""
+    head = kind + "_"
+    stats = {"packed": 0, "skipped": 0, "bytes_before": 0}
+
+    def records():
+        for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+            stem, ext = split_ext(entry.name)
+            if ext is None or not stem.startswith(head):
+                stats["skipped"] += 1
+                continue
+            stats["bytes_before"] += entry.stat().st_size
+            yield stem[len(head):], read_record(entry.path)
+
+    with SegmentStore(out, kind, codec, segment_size) as st:
+        stats["packed"] = st.put_many(records())
+        stats.update(segments=st.stats()["segments"], bytes_after=st.stats()["bytes"])
+    return stats
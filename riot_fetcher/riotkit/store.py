@@ -0,0 +1,180 @@
+import gzip
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+from .storage import read_record, split_ext
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    match_id TEXT PRIMARY KEY,
+    platform TEXT,
+    queue_id INTEGER,
+    game_mode TEXT,
+    game_version TEXT,
+    patch TEXT,
+    game_creation INTEGER,
+    game_duration INTEGER,
+    raw BLOB
+);
+CREATE TABLE IF NOT EXISTS participants (
+    match_id TEXT NOT NULL,
+    participant_id INTEGER NOT NULL,
+    puuid TEXT,
+    team_id INTEGER,
+    champion_id INTEGER,
+    champion_name TEXT,
+    team_position TEXT,
+    win INTEGER,
+    kills INTEGER,
+    deaths INTEGER,
+    assists INTEGER,
+    gold_earned INTEGER,
+    total_damage INTEGER,
+    vision_score INTEGER,
+    cs INTEGER,
+    PRIMARY KEY (match_id, participant_id)
+);
+CREATE INDEX IF NOT EXISTS ix_matches_queue_patch ON matches (queue_id, patch);
+CREATE INDEX IF NOT EXISTS ix_matches_version ON matches (game_version);
+CREATE INDEX IF NOT EXISTS ix_matches_creation ON matches (game_creation);
+CREATE INDEX IF NOT EXISTS ix_participants_puuid ON participants (puuid, match_id);
+CREATE INDEX IF NOT EXISTS ix_participants_champion ON participants (champion_id);
+CREATE INDEX IF NOT EXISTS ix_participants_champion_name ON participants (champion_name);
+"""
+
+PARTICIPANT_COLUMNS = (
+    "match_id", "participant_id", "puuid", "team_id", "champion_id", "champion_name", "team_position",
+    "win", "kills", "deaths", "assists", "gold_earned", "total_damage", "vision_score", "cs",
+)
+
+
+def patch_of(game_version: Optional[str]) -> Optional[str]:
+    if not game_version:
+        return None
+    return ".".join(game_version.split(".")[:2])
+
+
+def match_row(m: Dict, keep_raw: bool = True):
+    info = m.get("info", {})
+    mid = m.get("metadata", {}).get("matchId")
+    raw = gzip.compress(json.dumps(m, separators=(",", ":"), ensure_ascii=False).encode("utf-8")) if keep_raw else None
+    return (mid, info.get("platformId"), info.get("queueId"), info.get("gameMode"), info.get("gameVersion"),
+            patch_of(info.get("gameVersion")), info.get("gameCreation"), info.get("gameDuration"), raw)
+
+
+def participant_rows(m: Dict) -> List[tuple]:
+    mid = m.get("metadata", {}).get("matchId")
+    out = []
+    for i, p in enumerate(m.get("info", {}).get("participants", []), 1):
+        out.append((mid, p.get("participantId", i), p.get("puuid"), p.get("teamId"), p.get("championId"),
+                    p.get("championName"), p.get("teamPosition"), int(bool(p.get("win"))), p.get("kills", 0),
+                    p.get("deaths", 0), p.get("assists", 0), p.get("goldEarned", 0),
+                    p.get("totalDamageDealtToChampions", 0), p.get("visionScore", 0),
+                    p.get("totalMinionsKilled", 0) + p.get("neutralMinionsKilled", 0)))
+    return out
+
+
+class MatchStore:
+    """SQLite index of match-v5 payloads, safe to share between threads."""
+
+    def __init__(self, path: str, keep_raw: bool = True):
+        self.path = str(path)
+        self.keep_raw = keep_raw
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def add_matches(self, matches: Iterable[Dict]) -> int:
+        n = 0
+        with self.lock, self.db:
+            for m in matches:
+                if not m.get("metadata", {}).get("matchId"):
+                    continue
+                self.db.execute("INSERT OR REPLACE INTO matches VALUES (?,?,?,?,?,?,?,?,?)", match_row(m, self.keep_raw))
+                self.db.executemany(f"INSERT OR REPLACE INTO participants VALUES ({','.join('?' * len(PARTICIPANT_COLUMNS))})", participant_rows(m))
+                n += 1
+        return n
+
+    def add_match(self, match: Dict) -> bool:
+        return self.add_matches([match]) == 1
+
+    def has_match(self, match_id: str) -> bool:
+        with self.lock:
+            return self.db.execute("SELECT 1 FROM matches WHERE match_id=?", (match_id,)).fetchone() is not None
+
+    def match_ids(self) -> Set[str]:
+        with self.lock:
+            return {r[0] for r in self.db.execute("SELECT match_id FROM matches")}
+
+    def get_match(self, match_id: str) -> Optional[Dict]:
+        with self.lock:
+            r = self.db.execute("SELECT raw FROM matches WHERE match_id=?", (match_id,)).fetchone()
+        if r is None or r[0] is None:
+            return None
+        return json.loads(gzip.decompress(r[0]))
+
+    def find_matches(self, puuid: Optional[str] = None, queue_id: Optional[int] = None, patch: Optional[str] = None,
+                     champion: Optional[str] = None, since: Optional[int] = None, until: Optional[int] = None,
+                     limit: Optional[int] = None) -> List[str]:
+        sql = "SELECT DISTINCT m.match_id, m.game_creation FROM matches m"
+        where, args = [], []
+        if puuid is not None or champion is not None:
+            sql += " JOIN participants p ON p.match_id = m.match_id"
+        if puuid is not None:
+            where.append("p.puuid = ?"); args.append(puuid)
+        if champion is not None:
+            col = "p.champion_id" if isinstance(champion, int) else "p.champion_name"
+            where.append(f"{col} = ?"); args.append(champion)
+        if queue_id is not None:
+            where.append("m.queue_id = ?"); args.append(queue_id)
+        if patch is not None:
+            where.append("m.patch = ?"); args.append(patch)
+        if since is not None:
+            where.append("m.game_creation >= ?"); args.append(since)
+        if until is not None:
+            where.append("m.game_creation < ?"); args.append(until)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY m.game_creation DESC"
+        if limit is not None:
+            sql += " LIMIT ?"; args.append(limit)
+        with self.lock:
+            return [r[0] for r in self.db.execute(sql, args)]
+
+    def participants(self, match_id: Optional[str] = None, puuid: Optional[str] = None) -> List[Dict]:
+        sql = f"SELECT {','.join(PARTICIPANT_COLUMNS)} FROM participants"
+        where, args = [], []
+        if match_id is not None:
+            where.append("match_id = ?"); args.append(match_id)
+        if puuid is not None:
+            where.append("puuid = ?"); args.append(puuid)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        with self.lock:
+            return [dict(zip(PARTICIPANT_COLUMNS, r)) for r in self.db.execute(sql, args)]
+
+    def import_dir(self, directory, batch: int = 200) -> int:
+        n, buf = 0, []
+        for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+            if entry.name.startswith("match_") and split_ext(entry.name)[1]:
+                buf.append(read_record(entry.path))
+                if len(buf) >= batch:
+                    n += self.add_matches(buf); buf = []
+        return n + self.add_matches(buf)
@@ -0,0 +1,196 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+FSYNC_POLICIES = ("none", "batch", "always")
+
+
+def fsync_dir(directory: str):
+    """Persist a rename: fsync the directory entry (no-op where directories cannot be opened)."""
+    try:
+        fd = os.open(directory or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: str, data: bytes, fsync: bool = False) -> str:
+    """Write data to path via a temp file and os.replace: readers see the old file or the new one, never a partial one."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+        if fsync:
+            fh.flush()
+            os.fsync(fh.fileno())
+    os.replace(tmp, path)
+    if fsync:
+        fsync_dir(os.path.dirname(path))
+    return path
+
+
+class _Write:
+    __slots__ = ("path", "payload", "codec", "future")
+
+    def __init__(self, path: str, payload: Any, codec):
+        self.path = path
+        self.payload = payload
+        self.codec = codec
+        self.future: Future = Future()
+
+
+class BackgroundWriter:
+    """Serialize and write records on a background thread.
+
+    submit() queues (path, payload, codec) and returns at once with a Future for the path;
+    the writer thread encodes with codec.dumps and commits each file atomically (temp file,
+    then os.replace), so a crash leaves either the previous file or the new one plus a stray
+    `.tmp`. The queue holds at most `max_pending` records: when disk falls behind, submit()
+    blocks and slows the fetchers down instead of buffering without bound.
+
+    Up to `batch` queued records are written together. `fsync` chooses durability:
+    "none" (atomic against process crashes, the OS decides when data hits the disk),
+    "batch" (fsync every file of a batch, then each directory once after the renames) or
+    "always" (fsync each file and its directory before the next one).
+
+    Payloads waiting in the queue are readable with pending(path), so a RecordStore using
+    the writer still finds records it has just saved. A failed write sets its Future's
+    exception and is also returned by the next flush().
+    """
+
+    def __init__(self, max_pending: int = 64, batch: int = 16, fsync: str = "none", name: str = "record-writer"):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"unknown fsync policy {fsync!r} (choose from {', '.join(FSYNC_POLICIES)})")
+        self.batch = max(1, batch)
+        self.fsync = fsync
+        self.q: "queue.Queue[Optional[_Write]]" = queue.Queue(maxsize=max(1, max_pending))
+        self.lock = threading.Lock()
+        self.queued: Dict[str, _Write] = {}
+        self.stats = {"written": 0, "bytes": 0, "batches": 0, "errors": 0, "blocked_s": 0.0, "write_s": 0.0}
+        self.failed: List[Tuple[str, Exception]] = []
+        self.closed = False
+        self.log = logging.getLogger("riot")
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, path: str, payload: Any, codec) -> Future:
+        if self.closed:
+            raise RuntimeError("writer is closed")
+        w = _Write(str(path), payload, codec)
+        with self.lock:
+            self.queued[w.path] = w
+        t = time.perf_counter()
+        self.q.put(w)
+        blocked = time.perf_counter() - t
+        if blocked > 0.001:
+            with self.lock:
+                self.stats["blocked_s"] += blocked
+        return w.future
+
+    def pending(self, path: str) -> Tuple[bool, Any]:
+        """(True, payload) if path is queued and not yet on disk."""
+        with self.lock:
+            w = self.queued.get(str(path))
+        return (True, w.payload) if w is not None else (False, None)
+
+    def flush(self) -> List[Tuple[str, Exception]]:
+        """Block until everything submitted so far is on disk; returns the (path, error) of writes that failed since the last flush."""
+        self.q.join()
+        with self.lock:
+            failed, self.failed = self.failed, []
+        return failed
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.q.put(None)
+        self.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        while True:
+            items = [self.q.get()]
+            while len(items) < self.batch:
+                try:
+                    items.append(self.q.get_nowait())
+                except queue.Empty:
+                    break
+            stop = items[-1] is None
+            writes = [w for w in items if w is not None]
+            if writes:
+                self._commit(writes)
+            for _ in items:
+                self.q.task_done()
+            if stop:
+                return
+
+    def _commit(self, writes: List[_Write]):
+        t = time.perf_counter()
+        staged: List[Tuple[_Write, str, int]] = []
+        # the same path twice in a batch: only the last payload is written
+        latest = {w.path: w for w in writes}
+        for w in writes:
+            if latest[w.path] is not w:
+                self._done(w, None, w.path)
+                continue
+            try:
+                data = w.codec.dumps(w.payload)
+                if self.fsync == "always":
+                    atomic_write(w.path, data, fsync=True)
+                    self._done(w, None, w.path, len(data))
+                    continue
+                tmp = f"{w.path}.tmp"
+                with open(tmp, "wb") as fh:
+                    fh.write(data)
+                    if self.fsync == "batch":
+                        fh.flush()
+                        os.fsync(fh.fileno())
+                staged.append((w, tmp, len(data)))
+            except Exception as e:
+                self._done(w, e, w.path)
+        done, dirs = [], set()
+        for w, tmp, n in staged:
+            try:
+                os.replace(tmp, w.path)
+                dirs.add(os.path.dirname(w.path))
+                done.append((w, n))
+            except Exception as e:
+                self._done(w, e, w.path)
+        if self.fsync == "batch":
+            for d in dirs:
+                fsync_dir(d)
+        for w, n in done:
+            self._done(w, None, w.path, n)
+        with self.lock:
+            self.stats["batches"] += 1
+            self.stats["write_s"] += time.perf_counter() - t
+
+    def _done(self, w: _Write, error: Optional[Exception], path: str, nbytes: int = 0):
+        with self.lock:
+            if self.queued.get(w.path) is w:
+                del self.queued[w.path]
+            if error is None:
+                self.stats["written"] += 1
+                self.stats["bytes"] += nbytes
+            else:
+                self.stats["errors"] += 1
+                self.failed.append((path, error))
+        if error is None:
+            w.future.set_result(path)
+        else:
+            self.log.error("write failed path=%s: %s", path, error)
+            w.future.set_exception(error)
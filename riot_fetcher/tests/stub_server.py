@@ -0,0 +1,72 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+
+class StubRiotServer:
+    """Local HTTP/1.1 keep-alive stand-in for the Riot API.
+
+    Clients point at it with base_url=server.base_url. The first path segment is the
+    routing host (euw1, europe, ...). `routes` maps a path (without host) to a
+    (status, payload, headers) tuple or to a list of them served in order. A bytes payload is
+    sent as-is; subclasses can override respond(host, path, query) to serve computed responses.
+    """
+
+    def __init__(self, routes=None, default=None, port=0):
+        self.routes = dict(routes or {})
+        self.default = default
+        self.requests = []
+        self.connections = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with stub.lock:
+                    stub.connections += 1
+
+            def do_GET(self):
+                host, _, rest = self.path.lstrip("/").partition("/")
+                rest, _, qs = rest.partition("?")
+                status, payload, headers = stub.respond(host, "/" + rest, dict(parse_qsl(qs)))
+                if isinstance(payload, bytes):
+                    body = payload
+                else:
+                    body = json.dumps(payload).encode() if payload is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}/{{host}}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def respond(self, host, path, query=None):
+        with self.lock:
+            self.requests.append((host, path))
+            r = self.routes.get(path)
+            if isinstance(r, list):
+                r = r.pop(0) if len(r) > 1 else r[0]
+        if r is None:
+            r = self.default(host, path) if self.default else (404, {"status": {"status_code": 404}}, None)
+        return r
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -1,9 +1,41 @@
+import os
+import sys
 import json
+import time
+import importlib
+import asyncio
+import tempfile
+import threading
 import unittest
+from collections import Counter
 from unittest.mock import patch, MagicMock
 from riotkit.client import RiotClient
+from riotkit.ratelimit import RateLimiter, parse_limits
 from riotkit.fetcher import fetch_profile, parse_riot_id, diagnose
-from riotkit.endpoints import champion_rotation, champion_mastery_all, match_timeline
+from riotkit.endpoints import champion_rotation, champion_mastery_all, match_timeline, match_by_id, match_ids_by_puuid
+from riotkit import RiotError, aio
+from riotkit.storage import RecordStore, migrate, read_record, write_record
+from riotkit.store import MatchStore, patch_of
+from riotkit.io import store_match
+from riotkit.aggregate import StatsAggregator, iter_match_files, iter_store_matches
+from riotkit.crawler import CrawlConfig, Crawler, Frontier
+from riotkit.cache import DiskCache, ResponseCache, cache_key
+from riotkit.batch import operation, read_ids, run_batch
+from riotkit import ladder
+from riotkit.regions import RegionRouter, platform_of
+from riotkit.metrics import Histogram
+from tests.stub_server import StubRiotServer
+
+try:
+    import numpy as np
+    from riotkit import frames
+except ImportError:
+    np = None
+
+try:
+    from riotkit import analytics
+except ImportError:
+    analytics = None
 
 class UnitTests(unittest.TestCase):
     def make_client(self):
@@ -34,6 +66,38 @@ class UnitTests(unittest.TestCase):
         self.assertEqual(len(r["matches"]), 2)
         self.assertEqual(r["account"]["gameName"], "G")
 
+    def test_fetch_profile_concurrent_keeps_order(self):
+        import threading, time
+        ids = [f"EUW1_{i}" for i in range(12)]
+        state = {"active": 0, "peak": 0}
+        lock = threading.Lock()
+
+        def route(host, path):
+            if path.startswith("/riot/account/v1/accounts/by-riot-id/"):
+                return 200, {"puuid": "P", "gameName": "G", "tagLine": "T"}, None
+            if path.startswith("/lol/summoner/v4/summoners/by-puuid/"):
+                return 200, {"puuid": "P", "summonerLevel": 30}, None
+            if path.endswith("/ids"):
+                return 200, ids, None
+            mid = path.rsplit("/", 1)[1]
+            if mid == "EUW1_5":
+                return 404, {"status": {"status_code": 404}}, None
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.002 * (12 - int(mid.split("_")[1])))
+            with lock:
+                state["active"] -= 1
+            return 200, {"info": {"gameDuration": 1, "participants": [{"puuid": "P", "kills": 1}, {"puuid": "X"}]}}, None
+
+        with StubRiotServer(default=route) as server:
+            c = RiotClient("RGAPI-test", "euw1", "europe", base_url=server.base_url, limiter=RateLimiter(default_app_limits="1000:1"))
+            r = fetch_profile(c, "G#T", 12, workers=4)
+        self.assertEqual([m["match_id"] for m in r["matches"]], [i for i in ids if i != "EUW1_5"])
+        self.assertEqual(r["matches"][0]["participant"], {"puuid": "P", "kills": 1})
+        self.assertEqual(r["summoner"]["summonerLevel"], 30)
+        self.assertGreater(state["peak"], 1)
+
     @patch("riotkit.fetcher.status_probe")
     def test_diagnose(self, mock_status):
         mock_status.return_value = {"id": "EUW1"}
@@ -63,3 +127,1307 @@ class UnitTests(unittest.TestCase):
         c = self.make_client()
         result = match_timeline(c, "test-match-id")
         self.assertIn("frames", result)
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 100.0
+
+    def __call__(self):
+        return self.t
+
+    def sleep(self, w):
+        self.t += w
+
+
+def fake_response(status=200, payload=None, headers=None):
+    r = MagicMock()
+    r.status_code = status
+    r.headers = headers or {}
+    r.text = json.dumps(payload) if payload is not None else ""
+    r.json.return_value = payload
+    return r
+
+
+class RateLimiterTests(unittest.TestCase):
+    def make_limiter(self, **kw):
+        clock = FakeClock()
+        return RateLimiter(clock=clock, sleep=clock.sleep, **kw), clock
+
+    def test_parse_limits(self):
+        self.assertEqual(parse_limits("20:1,100:120"), [(20, 1), (100, 120)])
+        self.assertEqual(parse_limits(None), [])
+
+    def test_bucket_waits_for_oldest_token(self):
+        lim, clock = self.make_limiter(margin=0, default_app_limits="2:1")
+        self.assertEqual(lim.try_acquire("euw1", "m"), 0)
+        self.assertEqual(lim.try_acquire("euw1", "m"), 0)
+        self.assertGreater(lim.try_acquire("euw1", "m"), 0.9)
+        self.assertGreater(lim.acquire("euw1", "m"), 0.9)
+        self.assertEqual(lim.try_acquire("europe", "m"), 0)
+
+    def test_headers_update_limits_and_counts(self):
+        lim, clock = self.make_limiter(margin=0)
+        lim.update("euw1", "match_by_id", {
+            "X-App-Rate-Limit": "500:10", "X-App-Rate-Limit-Count": "1:10",
+            "X-Method-Rate-Limit": "3:10", "X-Method-Rate-Limit-Count": "3:10",
+        })
+        self.assertEqual(lim.snapshot()["app"]["euw1"], {"500:10": 1})
+        self.assertGreater(lim.try_acquire("euw1", "match_by_id"), 9)
+        self.assertEqual(lim.try_acquire("euw1", "match_timeline"), 0)
+
+    def test_penalize_application_blocks_host(self):
+        lim, clock = self.make_limiter()
+        lim.penalize("kr", "m", 5, "application")
+        self.assertAlmostEqual(lim.try_acquire("kr", "other"), 5)
+        self.assertEqual(lim.try_acquire("asia", "m"), 0)
+
+    def test_client_respects_retry_after_then_succeeds(self):
+        lim, clock = self.make_limiter()
+        c = RiotClient("RGAPI-test", "euw1", "europe", limiter=lim)
+        c.s = MagicMock()
+        c.s.get.side_effect = [
+            fake_response(429, headers={"Retry-After": "3", "X-Rate-Limit-Type": "method"}),
+            fake_response(200, {"freeChampionIds": [1]}, {"X-App-Rate-Limit": "20:1", "X-App-Rate-Limit-Count": "2:1"}),
+        ]
+        t0 = clock.t
+        result = champion_rotation(c)
+        self.assertEqual(result["freeChampionIds"], [1])
+        self.assertGreaterEqual(clock.t - t0, 3)
+
+
+def match_route(host, path):
+    if path.startswith("/lol/match/v5/matches/"):
+        return 200, {"metadata": {"matchId": path.rsplit("/", 1)[1]}, "info": {"participants": []}}, {"X-App-Rate-Limit": "1000:1"}
+    return None
+
+
+@unittest.skipIf(aio.aiohttp is None, "aiohttp not installed")
+class AsyncClientTests(unittest.TestCase):
+    def make_client(self, server, **kw):
+        return aio.AsyncRiotClient("RGAPI-test", "euw1", "europe", base_url=server.base_url, **kw)
+
+    def test_concurrent_requests_reuse_pooled_connections(self):
+        async def run(server):
+            async with self.make_client(server, pool_size=4, limiter=RateLimiter(default_app_limits="1000:1")) as c:
+                return await asyncio.gather(*[aio.match_by_id(c, f"EUW1_{i}") for i in range(40)])
+
+        with StubRiotServer(default=match_route) as server:
+            results = asyncio.run(run(server))
+        self.assertEqual([r["metadata"]["matchId"] for r in results], [f"EUW1_{i}" for i in range(40)])
+        self.assertLessEqual(server.connections, 4)
+        self.assertEqual({h for h, _ in server.requests}, {"europe"})
+
+    def test_retry_after_429_and_client_error(self):
+        routes = {
+            "/lol/platform/v3/champion-rotations": [(429, None, {"Retry-After": "0"}), (200, {"freeChampionIds": [7]}, None)],
+        }
+
+        async def run(server):
+            async with self.make_client(server) as c:
+                rot = await aio.champion_rotation(c)
+                with self.assertRaises(RiotError):
+                    await aio.summoner_by_puuid(c, "missing")
+                return rot
+
+        with StubRiotServer(routes) as server:
+            rot = asyncio.run(run(server))
+        self.assertEqual(rot["freeChampionIds"], [7])
+        self.assertEqual(server.requests[:2], [("euw1", "/lol/platform/v3/champion-rotations")] * 2)
+
+    def test_sync_client_against_stub(self):
+        with StubRiotServer(default=match_route) as server:
+            c = RiotClient("RGAPI-test", "kr", "asia", base_url=server.base_url)
+            self.assertEqual(match_by_id(c, "KR_1")["metadata"]["matchId"], "KR_1")
+        self.assertEqual(server.requests, [("asia", "/lol/match/v5/matches/KR_1")])
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def test_matches_cached_on_disk_only_and_ids_not_cached(self):
+        with tempfile.TemporaryDirectory() as d, StubRiotServer(default=lambda h, p: match_route(h, p) or (200, ["KR_1"], None)) as server:
+            for _ in range(2):
+                c = RiotClient("RGAPI-test", "kr", "asia", base_url=server.base_url, cache=ResponseCache(DiskCache(d)))
+                self.assertEqual(match_by_id(c, "KR_1")["metadata"]["matchId"], "KR_1")
+                self.assertEqual(match_by_id(c, "KR_1")["metadata"]["matchId"], "KR_1")
+                match_ids_by_puuid(c, "P", 0, 5)
+            self.assertEqual(c.cache.stats()["disk_hits"], 2)
+            self.assertEqual(c.cache.stats()["size"], 0)  # never held in memory
+            self.assertIsNotNone(c.cache.disk.get(cache_key(c.regional_url("/lol/match/v5/matches/KR_1"))).expires)
+            self.assertFalse(ResponseCache().cacheable("match_timeline"))
+        self.assertEqual(server.requests.count(("asia", "/lol/match/v5/matches/KR_1")), 1)
+        self.assertEqual(server.requests.count(("asia", "/lol/match/v5/matches/by-puuid/P/ids")), 2)
+
+    def test_ttl_expiry_and_etag_revalidation(self):
+        clock = FakeClock()
+        routes = {"/lol/platform/v3/champion-rotations": [
+            (200, {"freeChampionIds": [1]}, {"ETag": '"v1"'}),
+            (304, None, None),
+            (200, {"freeChampionIds": [2]}, None),
+        ]}
+        with StubRiotServer(routes) as server:
+            c = RiotClient("RGAPI-test", "euw1", "europe", base_url=server.base_url, cache=ResponseCache(ttls={"champion_rotation": 60}, clock=clock))
+            self.assertEqual(champion_rotation(c)["freeChampionIds"], [1])
+            clock.t += 30
+            champion_rotation(c)
+            clock.t += 60
+            self.assertEqual(champion_rotation(c)["freeChampionIds"], [1])
+            self.assertEqual(c.cache.stats()["revalidated"], 1)
+            clock.t += 61
+            self.assertEqual(champion_rotation(c)["freeChampionIds"], [2])
+        self.assertEqual(len(server.requests), 3)
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_items=2)
+        for k in ("a", "b", "c"):
+            cache.store("summoner_by_puuid", k, {"k": k})
+        self.assertIsNone(cache.lookup("summoner_by_puuid", "a"))
+        self.assertEqual(cache.lookup("summoner_by_puuid", "c").payload, {"k": "c"})
+        st = cache.stats()
+        self.assertEqual((st["evictions"], st["hits"], st["misses"], st["size"]), (1, 1, 1, 2))
+        self.assertFalse(cache.cacheable("match_ids_by_puuid"))
+
+
+class BatchTests(unittest.TestCase):
+    def test_read_ids_skips_blanks_comments_and_duplicates(self):
+        import io
+        self.assertEqual(list(read_ids(io.StringIO("KR_1\n\n# header\nKR_2  # note\nKR_1\n"))), ["KR_1", "KR_2"])
+        self.assertEqual(list(read_ids(io.StringIO("KR_1\nKR_1\n"), dedup=False)), ["KR_1", "KR_1"])
+
+    def test_batch_command_closes_its_files(self):
+        import builtins
+        import main
+        opened = []
+        real_open = builtins.open
+
+        def tracking_open(*a, **kw):
+            fh = real_open(*a, **kw)
+            opened.append(fh)
+            return fh
+
+        with tempfile.TemporaryDirectory() as d:
+            src, dst = os.path.join(d, "ids.txt"), os.path.join(d, "out.jsonl")
+            with open(src, "w", encoding="utf-8") as fh:
+                fh.write("KR_1\nKR_1\n")
+            with patch("main.make_client", return_value="client"), patch("riotkit.endpoints.match_by_id", side_effect=lambda c, i: {"id": i}), patch("builtins.open", tracking_open):
+                main.main(["batch", "match-get", "--input", src, "--output", dst, "--no-dedup"])
+            self.assertTrue(opened and all(fh.closed for fh in opened))
+            with open(dst, encoding="utf-8") as fh:
+                self.assertEqual([json.loads(l)["id"] for l in fh], ["KR_1", "KR_1"])
+
+    def test_run_batch_over_one_pooled_client(self):
+        fn = operation("match-get")
+        with StubRiotServer(default=lambda h, p: (404, {}, None) if p.endswith("/KR_bad") else match_route(h, p)) as server:
+            c = RiotClient("RGAPI-test", "kr", "asia", base_url=server.base_url, pool_size=4, limiter=RateLimiter(default_app_limits="1000:1"))
+            ids = [f"KR_{i}" for i in range(30)] + ["KR_bad"]
+            out = {i: (data, err) for i, data, err in run_batch(lambda i: fn(c, i), iter(ids), workers=4)}
+        self.assertIs(fn, match_by_id)
+        self.assertEqual(set(out), set(ids))
+        self.assertEqual(out["KR_7"][0]["metadata"]["matchId"], "KR_7")
+        self.assertIsInstance(out["KR_bad"][1], RiotError)
+        self.assertLessEqual(server.connections, 4)
+
+
+class CommandRegistryTests(unittest.TestCase):
+    def test_registry_matches_modules(self):
+        import main
+        from riotkit.batch import OPERATIONS
+        from riotkit.storage import CODECS
+        self.assertEqual(main.BATCH_OPS, tuple(sorted(OPERATIONS)))
+        self.assertEqual(main.CODEC_NAMES, tuple(sorted(CODECS)))
+        for c in main.COMMANDS:
+            if isinstance(c.target, str):
+                self.assertTrue(callable(main.resolve(c.target)), c.target)
+        self.assertEqual(len({(c.name, c.sub) for c in main.COMMANDS}), len(main.COMMANDS))
+
+    def test_dispatch_endpoint_command(self):
+        import io
+        import contextlib
+        import main
+        buf = io.StringIO()
+        with patch("main.make_client", return_value="client"), patch("riotkit.endpoints.champion_mastery_top", return_value=[{"championId": 1}]) as top, contextlib.redirect_stdout(buf):
+            main.main(["cm", "top", "--puuid", "P", "--count", "2", "--stdout"])
+        top.assert_called_once_with("client", "P", 2)
+        self.assertEqual(json.loads(buf.getvalue()), [{"championId": 1}])
+
+    def test_help_does_not_import_requests(self):
+        import subprocess
+        import sys
+        code = "import sys, main; main.build_parser().format_help(); print('requests' in sys.modules)"
+        out = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), capture_output=True, text=True, check=True)
+        self.assertEqual(out.stdout.strip(), "False")
+
+
+class LadderTests(unittest.TestCase):
+    PAGES = {("GOLD", "I"): 3, ("GOLD", "II"): 1, ("SILVER", "I"): 0, ("SILVER", "II"): 2}
+
+    def entries(self, c, queue, tier, division, page):
+        if page > self.PAGES[(tier, division)]:
+            return []
+        out = [{"puuid": f"{tier}{division}-{page}-{i}", "rank": division, "leaguePoints": 10 * i, "wins": 5, "losses": 3} for i in range(2)]
+        if (tier, division, page) == ("GOLD", "I", 2):
+            out.append({"puuid": "GOLDI-1-0", "rank": division})
+        return out
+
+    def crawl(self, **kw):
+        apex = lambda c, queue: {"leagueId": "L1", "tier": "CHALLENGER", "queue": queue, "entries": [{"puuid": "TOP", "leaguePoints": 1000}]}
+        with patch.object(ladder, "APEX", (("CHALLENGER", apex),)):
+            lc = ladder.LadderCrawler(None, ("RANKED_SOLO_5x5",), ("GOLD", "SILVER"), ("I", "II"), workers=3, **kw)
+            with patch.object(lc, "entries", side_effect=self.entries) as calls:
+                return lc, lc.run(), calls
+
+    def test_pages_until_empty_dedup_and_apex(self):
+        lc, rows, calls = self.crawl()
+        keys = {ladder.row_key(r) for r in rows}
+        self.assertEqual(len(rows), 2 * sum(self.PAGES.values()) + 1)
+        self.assertIn(("RANKED_SOLO_5x5", "TOP"), keys)
+        top = next(r for r in rows if r[3] == "TOP")
+        self.assertEqual((top[1], top[5], top[6]), ("CHALLENGER", "L1", 1000))
+        self.assertEqual(lc.stats["duplicates"], 1)
+        self.assertGreaterEqual(lc.stats["empty_pages"], 4)
+        self.assertLessEqual(calls.call_count, sum(self.PAGES.values()) + 4 * 3)
+        _, full, _ = self.crawl(apex=False)
+        lc, rows, _ = self.crawl(max_pages=1, apex=False)
+        self.assertEqual(len(rows), 2 * 3)
+        # SILVER I ended on an empty page; the others were stopped by the cap
+        self.assertEqual(sorted(lc.lost), [("RANKED_SOLO_5x5", "GOLD", "I", 2), ("RANKED_SOLO_5x5", "GOLD", "II", 2),
+                                           ("RANKED_SOLO_5x5", "SILVER", "II", 2)])
+        d = ladder.diff_snapshots(ladder.to_columns(full), ladder.to_columns(rows), lc.lost)
+        self.assertEqual((d["counts"]["removed"], d["counts"]["unverified"]), (0, len(full) - len(rows)))
+
+    def test_snapshots_are_columnar_and_diffed(self):
+        _, rows, _ = self.crawl()
+        with tempfile.TemporaryDirectory() as d:
+            snaps = ladder.LadderSnapshots(d, "euw1")
+            first = snaps.save(rows)
+            self.assertNotIn("diff", first)
+            saved = snaps.snapshots.load(snaps.latest())
+            self.assertEqual(ladder.from_columns(saved["columns"]), [tuple(r) for r in rows])
+            moved = [r[:6] + (r[6] + 1,) + r[7:] if r[3] == "TOP" else r for r in rows if r[3] != "GOLDII-1-0"]
+            moved.append(("RANKED_SOLO_5x5", "IRON", "IV", "NEW", None, None, 0, 0, 0, False, False, False, False))
+            with patch("riotkit.ladder.time.strftime", return_value="29990101T000000Z"):
+                second = snaps.save(moved)
+            self.assertEqual(second["counts"], {"added": 1, "changed": 1, "removed": 1, "unverified": 0})
+            diff = snaps.diffs.load("29990101T000000Z")
+            self.assertEqual(diff["added"]["puuid"], ["NEW"])
+            self.assertEqual(diff["changed"]["league_points"], [1001])
+            self.assertEqual(diff["removed"], [["RANKED_SOLO_5x5", "GOLDII-1-0"]])
+
+    def test_failed_pages_are_retried_then_lost_not_removed(self):
+        calls = Counter()
+
+        def flaky(c, queue, tier, division, page):
+            calls[(tier, division, page)] += 1
+            if (tier, division) == ("GOLD", "I") and page == 2:
+                raise RiotError("client 404 not found")
+            if (tier, division) == ("SILVER", "II"):
+                raise RiotError("max retries")
+            if (tier, division, page) == ("GOLD", "II", 1) and calls[(tier, division, page)] == 1:
+                raise RiotError("max retries")
+            return self.entries(c, queue, tier, division, page)
+
+        _, full, _ = self.crawl(apex=False)
+        lc = ladder.LadderCrawler(None, ("RANKED_SOLO_5x5",), ("GOLD", "SILVER"), ("I", "II"), apex=False, workers=3, retries=2)
+        with patch.object(lc, "entries", side_effect=flaky):
+            rows = lc.run()
+        self.assertEqual(calls[("GOLD", "I", 2)], 1)  # a 4xx is not retried
+        self.assertEqual(calls[("SILVER", "II", 1)], 3)  # first try + 2 retries, then the bracket is given up
+        self.assertEqual(calls[("GOLD", "II", 1)], 2)  # a transient error is retried
+        self.assertIn("GOLDII-1-0", {r[3] for r in rows})
+        self.assertEqual(sorted(lc.lost), [("RANKED_SOLO_5x5", "GOLD", "I", 2), ("RANKED_SOLO_5x5", "SILVER", "II", 1)])
+        d = ladder.diff_snapshots(ladder.to_columns(full), ladder.to_columns(rows), lc.lost)
+        self.assertEqual(d["counts"]["removed"], 0)
+        self.assertEqual(d["counts"]["unverified"], len(full) - len(rows))
+        self.assertIn(["RANKED_SOLO_5x5", "SILVERII-1-0"], d["unverified"])
+
+
+class RegionRouterTests(unittest.TestCase):
+    def test_platform_of(self):
+        self.assertEqual(platform_of("EUW1_123"), "euw1")
+        self.assertEqual(platform_of("KR_9"), "kr")
+        with self.assertRaises(ValueError):
+            platform_of("123")
+
+    def test_routes_by_prefix_and_regions_run_in_parallel(self):
+        import time
+
+        def route(host, path):
+            if host == "europe":
+                time.sleep(0.15)
+            return match_route(host, path)
+
+        ids = ["EUW1_1", "EUN1_2", "EUW1_3", "KR_1", "KR_2", "KR_3", "NA1_1", "XX_1"]
+        with StubRiotServer(default=route) as server:
+            router = RegionRouter("RGAPI-test", base_url=server.base_url, limiter=RateLimiter(default_app_limits="1000:1"))
+            out = list(router.map(match_by_id, ids, workers=1))
+        by_id = {i: (data, err) for i, data, err in out}
+        self.assertIsInstance(by_id["XX_1"][1], ValueError)
+        self.assertEqual(by_id["EUN1_2"][0]["metadata"]["matchId"], "EUN1_2")
+        self.assertEqual(router.hosts(), {"americas": ["na1"], "asia": ["kr"], "europe": ["eun1", "euw1"]})
+        self.assertEqual({h for h, _ in server.requests}, {"europe", "asia", "americas"})
+        finished = [i for i, _, err in out if err is None]
+        self.assertEqual([platform_of(i) for i in finished[-3:]], ["euw1", "eun1", "euw1"])
+
+
+class SingleFlightTests(unittest.TestCase):
+    def test_concurrent_callers_share_one_call(self):
+        import threading, time
+        from riotkit.flight import SingleFlight
+        sf, calls, out = SingleFlight(), [], []
+        barrier = threading.Barrier(6)
+
+        def fn():
+            calls.append(1)
+            time.sleep(0.05)
+            return {"v": len(calls)}
+
+        def worker():
+            barrier.wait()
+            out.append(sf.do("k", fn))
+
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(shared for _, shared in out), [False] + [True] * 5)
+        self.assertTrue(all(r is out[0][0] for r, _ in out))
+        self.assertEqual(sf.stats, {"calls": 1, "shared": 5})
+        self.assertEqual(sf.in_flight(), 0)
+        self.assertEqual(sf.do("k", fn), ({"v": 2}, False))
+
+    def test_error_reaches_every_waiter(self):
+        import threading, time
+        from riotkit.flight import SingleFlight
+        sf, errors = SingleFlight(), []
+        started = threading.Event()
+
+        def fn():
+            started.set()
+            time.sleep(0.05)
+            raise RiotError("client 404")
+
+        def follower():
+            started.wait()
+            try:
+                sf.do("k", fn)
+            except RiotError as e:
+                errors.append(e)
+
+        t = threading.Thread(target=follower)
+        t.start()
+        with self.assertRaises(RiotError):
+            sf.do("k", fn)
+        t.join()
+        self.assertEqual(len(errors), 1)
+
+    def test_async_cancelled_caller_does_not_cancel_the_others(self):
+        from riotkit.flight import AsyncSingleFlight
+        sf, calls = AsyncSingleFlight(), []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return {"v": 1}
+
+        async def main():
+            leader = asyncio.ensure_future(asyncio.wait_for(sf.do("k", fn), 0.05))
+            await asyncio.sleep(0.01)
+            out = await asyncio.gather(leader, sf.do("k", fn), return_exceptions=True)
+            # once its only caller gives up, the shared call is cancelled too
+            lone = asyncio.ensure_future(sf.do("j", fn))
+            await asyncio.sleep(0.01)
+            task = sf.calls["j"].task
+            lone.cancel()
+            await asyncio.gather(lone, return_exceptions=True)
+            await asyncio.sleep(0)
+            return out, task.cancelled(), dict(sf.calls)
+
+        out, cancelled, left = asyncio.run(main())
+        self.assertIsInstance(out[0], asyncio.TimeoutError)
+        self.assertEqual(out[1], ({"v": 1}, True))
+        self.assertEqual((len(calls), cancelled, left), (2, True, {}))
+
+    def test_client_coalesces_identical_requests(self):
+        import threading, time
+        from concurrent.futures import ThreadPoolExecutor
+
+        def route(host, path):
+            time.sleep(0.05)
+            return match_route(host, path)
+
+        with StubRiotServer(default=route) as server:
+            c = RiotClient("RGAPI-test", "euw1", "europe", base_url=server.base_url, limiter=RateLimiter(default_app_limits="1000:1"))
+            with ThreadPoolExecutor(8) as pool:
+                results = list(pool.map(lambda i: match_by_id(c, "EUW1_1" if i < 6 else "EUW1_2"), range(8)))
+            paths = [p for _, p in server.requests]
+        self.assertEqual(sorted(paths), ["/lol/match/v5/matches/EUW1_1", "/lol/match/v5/matches/EUW1_2"])
+        self.assertEqual([r["metadata"]["matchId"] for r in results], ["EUW1_1"] * 6 + ["EUW1_2"] * 2)
+        st = c.stats()
+        self.assertEqual((st["totals"]["requests"], st["totals"]["coalesced"]), (2, 6))
+        self.assertIn('riot_coalesced_total{method="match_by_id"} 6', c.metrics.prometheus())
+
+    @unittest.skipIf(aio.aiohttp is None, "aiohttp not installed")
+    def test_async_client_coalesces(self):
+        async def run(server):
+            async with aio.AsyncRiotClient("RGAPI-test", "euw1", "europe", base_url=server.base_url) as c:
+                out = await asyncio.gather(*[aio.match_by_id(c, "EUW1_1") for _ in range(5)])
+                return out, c.stats()["totals"]
+
+        with StubRiotServer(default=match_route) as server:
+            out, totals = asyncio.run(run(server))
+        self.assertEqual(len(server.requests), 1)
+        self.assertEqual((len(out), totals["coalesced"]), (5, 4))
+
+
+class ConcurrencyControllerTests(unittest.TestCase):
+    def make(self, **kw):
+        from riotkit.adaptive import ConcurrencyController
+        now = [0.0]
+        return ConcurrencyController(clock=lambda: now[0], **kw), now
+
+    def test_aimd_grows_when_saturated_and_halves_on_429(self):
+        ctl, now = self.make(initial=2, max_limit=8, decrease=0.5)
+        self.assertEqual([ctl.try_acquire("europe") for _ in range(3)], [True, True, False])
+        for _ in range(20):
+            while ctl.hosts["europe"].inflight:
+                ctl.release("europe", 0.05)
+            now[0] += 0.1
+            while ctl.try_acquire("europe"):
+                pass
+        while ctl.hosts["europe"].inflight:
+            ctl.release("europe", 0.05)
+        grown = ctl.snapshot()["europe"]["limit"]
+        self.assertGreater(grown, 4)
+        self.assertLessEqual(grown, 8)
+        ctl.acquire("europe")
+        ctl.acquire("europe")
+        ctl.release("europe", 0.05, "throttled")
+        ctl.release("europe", 0.05, "throttled")  # same burst: cut once
+        self.assertEqual(ctl.snapshot()["europe"]["limit"], round(grown / 2, 2))
+        self.assertEqual(ctl.snapshot()["europe"]["cuts"], 1)
+        ctl.release("asia", 0.05)  # unknown host starts at initial
+        self.assertEqual(ctl.snapshot()["asia"]["limit"], 2)
+
+    def test_circuit_opens_per_host_then_probes(self):
+        from riotkit.adaptive import CircuitOpenError
+        ctl, now = self.make(failure_threshold=3, cooldown=10)
+        for _ in range(3):
+            ctl.acquire("kr")
+            ctl.release("kr", 0.1, "error")
+        with self.assertRaises(CircuitOpenError) as cm:
+            ctl.acquire("kr")
+        self.assertAlmostEqual(cm.exception.retry_in, 10)
+        ctl.acquire("euw1")  # other hosts are unaffected
+        now[0] += 10
+        ctl.acquire("kr")  # half-open: one probe
+        with self.assertRaises(CircuitOpenError):
+            ctl.acquire("kr")
+        ctl.release("kr", 0.1, "error")  # failed probe: open again, longer cooldown
+        now[0] += 10
+        with self.assertRaises(CircuitOpenError):
+            ctl.acquire("kr")
+        now[0] += 10
+        ctl.acquire("kr")
+        ctl.release("kr", 0.1)
+        self.assertEqual((ctl.snapshot()["kr"]["state"], ctl.snapshot()["kr"]["trips"]), ("closed", 2))
+
+    def test_client_fails_fast_once_circuit_opens(self):
+        from riotkit.adaptive import CircuitOpenError, ConcurrencyController
+        routes = {"/lol/platform/v3/champion-rotations": [(503, {}, None)] * 3}
+        with StubRiotServer(routes) as server, patch("riotkit.client.backoff", return_value=0):
+            ctl = ConcurrencyController(failure_threshold=2, cooldown=60)
+            c = RiotClient("RGAPI-test", "euw1", "europe", base_url=server.base_url, controller=ctl)
+            with self.assertRaises(CircuitOpenError):
+                champion_rotation(c)
+            self.assertEqual(len(server.requests), 2)
+            self.assertEqual(c.stats()["concurrency"]["euw1"]["state"], "open")
+            self.assertIn('riot_circuit_open{host="euw1"} 1', c.metrics.prometheus(controller=ctl))
+
+
+    def test_crawl_waits_out_a_5xx_burst_and_loses_nothing(self):
+        from riotkit.adaptive import ConcurrencyController
+        ids = [f"KR_{i}" for i in range(12)]
+        errors = [6]
+
+        def route(host, path):
+            if path == "/lol/match/v5/matches/by-puuid/A/ids":
+                return 200, ids, None
+            with lock:
+                if errors[0]:
+                    errors[0] -= 1
+                    return 503, {}, None
+            mid = path.rsplit("/", 1)[1]
+            return 200, make_match(mid, ["A"]), None
+
+        lock = threading.Lock()
+        with StubRiotServer(default=route) as server, patch("riotkit.client.backoff", return_value=0), \
+                tempfile.TemporaryDirectory() as d:
+            ctl = ConcurrencyController(failure_threshold=2, cooldown=0.05)
+            c = RiotClient("RGAPI-test", "kr", "asia", base_url=server.base_url, controller=ctl)
+            with MatchStore(os.path.join(d, "m.sqlite")) as st:
+                cr = Crawler(c, st, Frontier(os.path.join(d, "f.sqlite")), CrawlConfig(workers=4, max_hops=0))
+                cr.seed(["A"])
+                out = cr.run()
+                cr.frontier.close()
+                self.assertEqual(st.match_ids(), set(ids))
+            self.assertEqual(errors, [0])
+            self.assertGreaterEqual(ctl.snapshot()["asia"]["trips"], 1)
+            self.assertEqual((out["errors"], out["frontier"]["frontier_matches"]), (0, {"done": 12}))
+
+
+class MetricsTests(unittest.TestCase):
+    def test_histogram_quantiles(self):
+        h = Histogram()
+        for v in [0.01] * 50 + [0.2] * 45 + [3.0] * 4 + [42.0]:
+            h.observe(v)
+        self.assertEqual((h.quantile(0.5), h.quantile(0.9), h.quantile(0.99), h.quantile(1.0)), (0.025, 0.25, 5.0, 42.0))
+        self.assertEqual(h.to_dict()["buckets"]["+Inf"], 1)
+
+    def test_client_records_requests_429_and_hooks(self):
+        routes = {"/lol/platform/v3/champion-rotations": [(429, None, {"Retry-After": "0", "X-Rate-Limit-Type": "method"}), (200, {"freeChampionIds": [7]}, None)]}
+        events = []
+        with StubRiotServer(routes) as server:
+            c = RiotClient("RGAPI-test", "euw1", "europe", base_url=server.base_url)
+            c.metrics.add_hook(events.append)
+            champion_rotation(c)
+            st = c.stats()
+            ep = st["endpoints"]["champion_rotation"]
+            self.assertEqual((ep["requests"], ep["status"], ep["retries"], ep["rate_limited"]), (2, {"200": 1, "429": 1}, 1, 1))
+            self.assertEqual(ep["bytes"], len(json.dumps({"freeChampionIds": [7]})))
+            self.assertEqual(st["totals"]["requests"], 2)
+            self.assertIn("euw1", st["rate_limits"]["app"])
+            self.assertEqual([e["event"] for e in events], ["response", "rate_limited", "response"])
+            text = c.metrics.prometheus(c.limiter)
+            self.assertIn('riot_requests_total{method="champion_rotation",status="429"} 1', text)
+            self.assertIn('riot_request_latency_seconds_count{method="champion_rotation"} 2', text)
+            self.assertIn('riot_rate_limit_used{scope="app",host="euw1"', text)
+            import urllib.request
+            httpd = c.metrics.serve(0, limiter=c.limiter)
+            try:
+                body = urllib.request.urlopen(f"http://127.0.0.1:{httpd.server_address[1]}/metrics.json").read()
+            finally:
+                httpd.shutdown()
+            self.assertEqual(json.loads(body)["totals"]["rate_limited"], 1)
+
+
+class MockRiotTests(unittest.TestCase):
+    def make_data(self, d):
+        matches = RecordStore(os.path.join(d, "matches"), "match", "json")
+        for i, mid in enumerate(["EUW1_1", "EUW1_2", "EUW1_3"]):
+            m = make_match(mid, ["p1", "p2"], queue_id=440 if i == 1 else 420, creation=(i + 1) * 1000_000)
+            m["info"]["participants"][0].update(riotIdGameName="Ahri Main", riotIdTagline="EUW")
+            matches.save(mid, m)
+        RecordStore(os.path.join(d, "timelines"), "timeline", "gzip").save("EUW1_1", {"metadata": {"matchId": "EUW1_1"}, "info": {"frames": []}})
+
+    def test_replay_serves_fetch_profile_and_timelines(self):
+        from benchmarks.mock_riot import ReplayRiotServer
+        with tempfile.TemporaryDirectory() as d:
+            self.make_data(d)
+            with ReplayRiotServer(d) as server:
+                c = RiotClient("RGAPI-test", "euw1", "europe", base_url=server.base_url)
+                out = fetch_profile(c, "Ahri Main#euw", 2)
+                self.assertEqual([m["match_id"] for m in out["matches"]], ["EUW1_3", "EUW1_2"])
+                self.assertEqual(out["matches"][0]["participant"]["puuid"], "p1")
+                self.assertEqual(match_ids_by_puuid(c, "p1", 0, 20, queue=420, start_time=1500), ["EUW1_3"])
+                self.assertEqual(match_timeline(c, "EUW1_1")["metadata"]["matchId"], "EUW1_1")
+                with self.assertRaises(RiotError):
+                    match_by_id(c, "EUW1_404")
+
+    def test_fault_injection(self):
+        from benchmarks.mock_riot import ReplayRiotServer
+        with tempfile.TemporaryDirectory() as d:
+            self.make_data(d)
+            server = ReplayRiotServer(d, p429=1.0, retry_after=3)
+            server.httpd.server_close()
+            status, _, headers = server.respond("europe", "/lol/match/v5/matches/EUW1_1")
+            self.assertEqual((status, headers["Retry-After"], headers["X-Rate-Limit-Type"]), (429, "3", "method"))
+            server.p429, server.p5xx = 0.0, 1.0
+            self.assertEqual(server.respond("europe", "/lol/match/v5/matches/EUW1_1")[0], 503)
+            server.p5xx, server.enforce = 0.0, True
+            server.windows = [(1, 10.0)]
+            self.assertEqual(server.respond("europe", "/lol/match/v5/matches/EUW1_1")[0], 429)
+            self.assertEqual(server.respond("asia", "/lol/match/v5/matches/EUW1_1")[0], 200)
+            self.assertEqual(server.faults, {"429": 1, "503": 1, "429_enforced": 1})
+
+
+class StorageTests(unittest.TestCase):
+    def test_record_store_roundtrip_any_codec(self):
+        with tempfile.TemporaryDirectory() as d:
+            payload = {"info": {"frames": [{"timestamp": i} for i in range(50)]}, "name": "é"}
+            write_record(os.path.join(d, "timeline_M0"), payload, "json")
+            store = RecordStore(d, "timeline", "gzip")
+            f = store.save("M1", payload)
+            self.assertTrue(f.endswith(".json.gz"))
+            self.assertEqual(store.load("M1"), payload)
+            self.assertEqual(store.load("M0"), payload)
+            self.assertEqual(sorted(store.keys()), ["M0", "M1"])
+            self.assertFalse(store.exists("M2"))
+
+    def test_migrate_converts_and_shrinks(self):
+        with tempfile.TemporaryDirectory() as d:
+            payload = {"frames": [{"participantFrames": {str(p): {"totalGold": p * 100, "xp": p} for p in range(1, 11)}} for _ in range(30)]}
+            write_record(os.path.join(d, "timeline_M1"), payload, "json")
+            stats = migrate(d, "gzip")
+            self.assertEqual(stats["converted"], 1)
+            self.assertLess(stats["bytes_after"] * 10, stats["bytes_before"])
+            self.assertEqual(os.listdir(d), ["timeline_M1.json.gz"])
+            self.assertEqual(read_record(os.path.join(d, "timeline_M1.json.gz")), payload)
+            self.assertEqual(migrate(d, "gzip")["skipped"], 1)
+
+
+class SegmentStoreTests(unittest.TestCase):
+    def test_put_get_roll_and_reopen(self):
+        from riotkit.segments import SegmentStore
+        with tempfile.TemporaryDirectory() as d:
+            with SegmentStore(d, segment_size=200) as st:
+                for i in range(6):
+                    st.put(f"KR_{i}", {"metadata": {"matchId": f"KR_{i}"}, "pad": "x" * 50})
+                st.put("KR_2", {"v": 2})
+                self.assertGreater(st.stats()["segments"], 2)
+                self.assertEqual(st.get("KR_2"), {"v": 2})
+                self.assertEqual(bytes(st.get_raw("KR_2")), b'{"v":2}')
+                self.assertEqual([k for k, _ in st.get_many(["KR_5", "KR_0", "nope"])], ["KR_0", "KR_5"])
+            with SegmentStore(d) as st:
+                self.assertEqual((len(st), st.get("KR_2"), st.get("KR_4")["metadata"]["matchId"]), (6, {"v": 2}, "KR_4"))
+                self.assertIsNone(st.get("KR_9"))
+
+    def test_torn_tails_and_lost_index_recover(self):
+        from riotkit.segments import INDEX_ENTRY, SegmentStore
+        with tempfile.TemporaryDirectory() as d:
+            with SegmentStore(d, codec="gzip") as st:
+                st.put_many((f"KR_{i}", {"i": i}) for i in range(3))
+                seg = st.segment_path(st.active)
+            intact = os.path.getsize(seg)
+            with open(os.path.join(d, "match.idx"), "ab") as fh:
+                fh.write(b"\x05\x00\x01")  # torn index entry
+            with open(seg, "ab") as fh:
+                fh.write(b"RSG1\x00\x00")  # torn record
+            with SegmentStore(d) as st:
+                self.assertEqual(([v for v in st.values()], st.codec.name), ([{"i": 0}, {"i": 1}, {"i": 2}], "gzip"))
+                self.assertEqual(os.path.getsize(seg), intact)  # the torn record is cut off before appending
+                st.put("KR_3", {"i": 3})
+            os.remove(os.path.join(d, "match.idx"))
+            with SegmentStore(d) as st:
+                self.assertEqual(sorted(st.keys()), ["KR_0", "KR_1", "KR_2", "KR_3"])
+                st.put("KR_4", {"i": 4})
+            idx = os.path.join(d, "match.idx")
+            with open(idx, "r+b") as fh:  # crash between the record and its index entry
+                fh.truncate(os.path.getsize(idx) - INDEX_ENTRY.size - len(b"KR_4"))
+            with SegmentStore(d) as st:
+                self.assertEqual(st.get("KR_4"), {"i": 4})
+                self.assertEqual(len(st), 5)
+
+    def test_readonly_never_writes(self):
+        from riotkit.corpus import load_corpus
+        from riotkit.segments import SegmentStore
+
+        def files(d):
+            out = {}
+            for f in os.listdir(d):
+                with open(os.path.join(d, f), "rb") as fh:
+                    out[f] = fh.read()
+            return out
+
+        with tempfile.TemporaryDirectory() as d:
+            with self.assertRaises(FileNotFoundError):
+                SegmentStore(os.path.join(d, "none"), readonly=True)
+            self.assertFalse(os.path.exists(os.path.join(d, "none")))
+            with SegmentStore(d) as st:
+                st.put_many((f"KR_{i}", {"i": i}) for i in range(3))
+                seg = st.segment_path(st.active)
+            with open(os.path.join(d, "match.idx"), "r+b") as fh:
+                fh.truncate(os.path.getsize(os.path.join(d, "match.idx")) - 1)  # torn index entry for KR_2
+            with open(seg, "ab") as fh:
+                fh.write(b"RSG1\x00\x00")  # torn record
+            before = files(d)
+            with SegmentStore(d, readonly=True) as st:
+                self.assertEqual(dict(st.items()), {f"KR_{i}": {"i": i} for i in range(3)})
+                with self.assertRaises(RuntimeError):
+                    st.put("KR_9", {})
+            self.assertEqual(list(load_corpus(d, "match", workers=1)), [{"i": i} for i in range(3)])
+            self.assertEqual(files(d), before)
+
+    def test_compact_and_pack_dir(self):
+        from riotkit.segments import SegmentStore, pack_dir
+        with tempfile.TemporaryDirectory() as d:
+            src = RecordStore(os.path.join(d, "files"), "match", "json")
+            for i in range(4):
+                src.save(f"KR_{i}", {"metadata": {"matchId": f"KR_{i}"}, "info": {"participants": []}})
+            out = os.path.join(d, "seg")
+            self.assertEqual(pack_dir(src.root, out, segment_size=100)["packed"], 4)
+            self.assertEqual([m["metadata"]["matchId"] for m in iter_match_files(out)], [f"KR_{i}" for i in range(4)])
+            with SegmentStore(out) as st:
+                st.put("KR_0", {"metadata": {"matchId": "KR_0"}, "v": 2})
+                res = st.compact()
+                self.assertEqual((res["records"], res["segments_after"]), (4, 1))
+                self.assertLess(res["bytes_after"], res["bytes_before"])
+                self.assertEqual(st.get("KR_0")["v"], 2)
+                st.put("KR_4", {"v": 4})
+            self.assertEqual(sorted(f for f in os.listdir(out)), ["match-000005.seg", "match.idx"])
+            with SegmentStore(out) as st:
+                self.assertEqual(len(st), 5)
+
+
+class BackgroundWriterTests(unittest.TestCase):
+    class SlowCodec:
+        name, ext = "json", ".json"
+
+        def __init__(self, gate=None, fail=()):
+            import threading
+            self.gate = gate or threading.Event()
+            self.fail = fail
+
+        def dumps(self, payload):
+            self.gate.wait(5)
+            if payload.get("id") in self.fail:
+                raise ValueError("unserializable")
+            return json.dumps(payload).encode()
+
+    def test_store_reads_queued_records_and_flush_commits_them(self):
+        from riotkit.writer import BackgroundWriter
+        with tempfile.TemporaryDirectory() as d, BackgroundWriter(max_pending=8, batch=4) as w:
+            codec = self.SlowCodec()
+            store = RecordStore(d, "match", "json", w)
+            store.codec = codec
+            paths = [store.save(f"M{i}", {"id": i}) for i in range(5)]
+            self.assertEqual(store.load("M3"), {"id": 3})  # still queued: served from memory
+            self.assertTrue(store.exists("M4"))
+            self.assertFalse(any(os.path.exists(p) for p in paths))
+            codec.gate.set()
+            w.flush()
+            self.assertEqual([read_record(p) for p in paths], [{"id": i} for i in range(5)])
+            self.assertEqual(sorted(os.listdir(d)), sorted(os.path.basename(p) for p in paths))
+            self.assertEqual(w.stats["written"], 5)
+            self.assertLessEqual(w.stats["batches"], 3)
+
+    def test_full_queue_blocks_and_failures_leave_no_file(self):
+        import threading
+        from riotkit.writer import BackgroundWriter
+        with tempfile.TemporaryDirectory() as d:
+            codec = self.SlowCodec(fail=(1,))
+            w = BackgroundWriter(max_pending=2, batch=1, fsync="batch")
+            futures = [w.submit(os.path.join(d, f"r{i}.json"), {"id": i}, codec) for i in range(3)]  # one taken, two queued
+            blocked = threading.Thread(target=lambda: futures.append(w.submit(os.path.join(d, "r3.json"), {"id": 3}, codec)))
+            blocked.start()
+            blocked.join(0.1)
+            self.assertTrue(blocked.is_alive())
+            codec.gate.set()
+            blocked.join()
+            self.assertEqual([p for p, _ in w.flush()], [os.path.join(d, "r1.json")])
+            self.assertEqual(w.flush(), [])
+            w.close()
+            self.assertIsInstance(futures[1].exception(), ValueError)
+            self.assertEqual(sorted(os.listdir(d)), ["r0.json", "r2.json", "r3.json"])
+            self.assertEqual((w.stats["written"], w.stats["errors"]), (3, 1))
+            self.assertGreater(w.stats["blocked_s"], 0.05)
+
+    def test_save_json_is_atomic_with_or_without_writer(self):
+        from riotkit.io import save_json
+        from riotkit.writer import BackgroundWriter
+        with tempfile.TemporaryDirectory() as d:
+            f = save_json("match", "get/KR 1", {"a": "é"}, data_root=d)
+            with BackgroundWriter() as w:
+                g = save_json("match", "get_KR_2", {"b": 2}, data_root=d, writer=w)
+            self.assertEqual(sorted(os.listdir(os.path.join(d, "match"))), sorted([os.path.basename(f), os.path.basename(g)]))
+            with open(f, encoding="utf-8") as fh:
+                self.assertEqual(json.load(fh), {"a": "é"})
+
+
+def make_timeline(n_frames=3, n_players=10):
+    return {
+        "metadata": {"matchId": "KR_1"},
+        "info": {
+            "frameInterval": 60000,
+            "participants": [{"participantId": p, "puuid": f"P{p}"} for p in range(1, n_players + 1)],
+            "frames": [{
+                "timestamp": fi * 60000,
+                "participantFrames": {str(p): {"totalGold": 500 + fi * p, "xp": fi * 10, "minionsKilled": fi, "position": {"x": p, "y": -p}} for p in range(1, n_players + 1)},
+                "events": [
+                    {"type": "ITEM_PURCHASED", "participantId": 2, "itemId": 1055, "timestamp": fi * 60000 + 5},
+                    {"type": "CHAMPION_KILL", "killerId": 3, "victimId": 7, "assistingParticipantIds": [1, 4], "bounty": 300, "position": {"x": 10, "y": 20}, "timestamp": fi * 60000 + 9},
+                ],
+            } for fi in range(n_frames)],
+        },
+    }
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class FrameTests(unittest.TestCase):
+    def test_extract_shapes_and_values(self):
+        a = frames.extract(make_timeline())
+        gold = frames.PARTICIPANT_STATS.index("totalGold")
+        self.assertEqual(a["stats"].shape, (3, 10, len(frames.PARTICIPANT_STATS)))
+        self.assertEqual(a["stats"][2, 4, gold], 510)
+        self.assertEqual(a["stats"][1, 0, frames.PARTICIPANT_STATS.index("position.y")], -1)
+        kills = a["events"][a["events"]["type"] == frames.EVENT_CODES["CHAMPION_KILL"]]
+        self.assertEqual(len(kills), 3)
+        self.assertEqual((kills[0]["participant"], kills[0]["victim"], kills[0]["assists"], kills[0]["value"]), (3, 7, 0b10010, 300))
+        self.assertEqual(a["puuids"][9], "P10")
+
+    def test_load_frames_writes_and_reuses_npz(self):
+        with tempfile.TemporaryDirectory() as d:
+            raw = write_record(os.path.join(d, "timeline_KR_1"), make_timeline(), "gzip")
+            first = frames.load_frames(raw)
+            self.assertTrue(os.path.exists(os.path.join(d, "timeline_KR_1.npz")))
+            with patch("riotkit.frames.read_record") as mock_read:
+                again = frames.load_frames(raw)
+                mock_read.assert_not_called()
+            np.testing.assert_array_equal(first["stats"], again["stats"])
+            self.assertEqual(str(again["match_id"]), "KR_1")
+            self.assertEqual(frames.build_cache(d), 1)
+
+
+class ProjectionTests(unittest.TestCase):
+    def bloated_match(self):
+        m = make_match("EUW1_1", [f"P{i}" for i in range(10)])
+        m["info"]["teams"] = [{"teamId": 100, "win": True, "bans": [], "feats": {"EPIC_MONSTER_KILL": {}},
+                               "objectives": {"baron": {"first": True, "kills": 1}, "tower": {"first": False, "kills": 7}}}]
+        for p in m["info"]["participants"]:
+            p.update(perks={"styles": []}, spell1Casts=40, challenges={"kda": 3.5, "abilityUses": 200, "12AssistStreakCount": 0})
+        return m
+
+    def test_match_projection_keeps_schema_fields_only(self):
+        from riotkit.projection import MATCH
+        m = self.bloated_match()
+        c = MATCH(m)
+        p = c["info"]["participants"][0]
+        self.assertNotIn("perks", p)
+        self.assertNotIn("spell1Casts", p)
+        self.assertEqual(p["challenges"], {"kda": 3.5})
+        self.assertEqual(p["kills"], 0)
+        self.assertEqual(c["info"]["teams"][0], {"teamId": 100, "win": True, "bans": [], "objectives": {"baron": {"kills": 1}, "tower": {"kills": 7}}})
+        self.assertEqual(MATCH(c), c)
+        self.assertEqual(StatsAggregator().add_matches([c]).result(), StatsAggregator().add_matches([m]).result())
+
+    def test_list_and_wildcard_paths(self):
+        from riotkit.projection import Projection
+        proj = Projection(["a.b", "a.c.d", "m.*.x", "a.c"])
+        self.assertEqual(proj({"a": [{"b": 1, "z": 2, "c": {"d": 3, "e": 4}}, 5], "m": {"1": {"x": 1, "y": 2}}, "q": 0}),
+                         {"a": [{"b": 1, "c": {"d": 3, "e": 4}}, 5], "m": {"1": {"x": 1}}})
+
+    @unittest.skipIf(np is None, "numpy not installed")
+    def test_timeline_projection_keeps_frame_arrays(self):
+        from riotkit.projection import TIMELINE
+        t = make_timeline()
+        for f in t["info"]["frames"]:
+            for pf in f["participantFrames"].values():
+                pf["championStats"] = {"armor": 30}
+                pf["damageStats"] = {"totalDamageDoneToChampions": 900, "magicDamageDone": 5}
+            f["events"][1]["victimDamageReceived"] = [{"basic": True, "name": "Ahri"}] * 20
+        c = TIMELINE(t)
+        self.assertNotIn("victimDamageReceived", c["info"]["frames"][0]["events"][1])
+        self.assertEqual(c["info"]["frames"][0]["participantFrames"]["1"]["damageStats"], {"totalDamageDoneToChampions": 900})
+        a, b = frames.extract(t), frames.extract(c)
+        for k in ("stats", "events", "puuids", "timestamps"):
+            np.testing.assert_array_equal(a[k], b[k])
+
+    def test_project_dir_keeps_raw_copy(self):
+        from riotkit.projection import COLD_CODEC, project_dir
+        from riotkit.storage import get_codec
+        with tempfile.TemporaryDirectory() as d:
+            src, raw = os.path.join(d, "matches"), os.path.join(d, "raw")
+            RecordStore(src, "match", "json").save("EUW1_1", self.bloated_match())
+            stats = project_dir(src, "match", raw)
+            self.assertEqual(stats["projected"], 1)
+            self.assertLess(stats["bytes_after"], stats["bytes_before"])
+            self.assertNotIn("perks", read_record(os.path.join(src, "match_EUW1_1.json"))["info"]["participants"][0])
+            full = read_record(os.path.join(raw, "match_EUW1_1" + get_codec(COLD_CODEC).ext))
+            self.assertEqual(full["info"]["participants"][0]["spell1Casts"], 40)
+            again = project_dir(src, "match", raw)  # a second run must not replace the raw copy with projected data
+            self.assertEqual((again["projected"], again["unchanged"], again["raw_bytes"]), (0, 1, 0))
+            self.assertEqual(read_record(os.path.join(raw, "match_EUW1_1" + get_codec(COLD_CODEC).ext)), full)
+
+
+def make_match(mid, puuids, queue_id=420, version="15.20.717.2831", creation=1000, champions=None):
+    champions = champions or ["Ahri"] * len(puuids)
+    return {
+        "metadata": {"matchId": mid, "participants": list(puuids)},
+        "info": {
+            "platformId": mid.split("_")[0], "queueId": queue_id, "gameVersion": version, "gameCreation": creation,
+            "gameDuration": 1800, "gameMode": "CLASSIC",
+            "participants": [{
+                "participantId": i + 1, "puuid": p, "teamId": 100 if i < 5 else 200, "championId": 100 + i,
+                "championName": champions[i], "teamPosition": "MIDDLE", "win": i < 5, "kills": i, "deaths": 1,
+                "assists": 2, "goldEarned": 1000 * (i + 1), "totalDamageDealtToChampions": 5000,
+                "visionScore": 10, "totalMinionsKilled": 150, "neutralMinionsKilled": 4,
+            } for i, p in enumerate(puuids)],
+        },
+    }
+
+
+class MatchStoreTests(unittest.TestCase):
+    def test_patch_of(self):
+        self.assertEqual(patch_of("15.20.717.2831"), "15.20")
+        self.assertIsNone(patch_of(None))
+
+    def test_indexed_queries(self):
+        with tempfile.TemporaryDirectory() as d, MatchStore(os.path.join(d, "m.sqlite")) as st:
+            st.add_matches([
+                make_match("KR_1", ["A", "B"], creation=1),
+                make_match("KR_2", ["A", "C"], queue_id=450, creation=2),
+                make_match("KR_3", ["A", "B"], version="15.19.1.1", creation=3, champions=["Zed", "Ahri"]),
+            ])
+            self.assertTrue(st.has_match("KR_2"))
+            self.assertEqual(st.find_matches(puuid="A", queue_id=420, patch="15.20"), ["KR_1"])
+            self.assertEqual(st.find_matches(puuid="A"), ["KR_3", "KR_2", "KR_1"])
+            self.assertEqual(st.find_matches(champion="Zed"), ["KR_3"])
+            self.assertEqual(st.find_matches(since=2, limit=1), ["KR_3"])
+            self.assertEqual(st.get_match("KR_2")["info"]["queueId"], 450)
+            row = st.participants(match_id="KR_1", puuid="B")[0]
+            self.assertEqual((row["team_id"], row["cs"], row["win"]), (100, 154, 1))
+
+    def test_import_dir_and_io_store_match(self):
+        with tempfile.TemporaryDirectory() as d:
+            write_record(os.path.join(d, "match_KR_1"), make_match("KR_1", ["A"]), "json")
+            write_record(os.path.join(d, "match_KR_2"), make_match("KR_2", ["B"]), "gzip")
+            db = os.path.join(d, "m.sqlite")
+            store_match(make_match("KR_3", ["C"]), db)
+            with MatchStore(db) as st:
+                self.assertEqual(st.import_dir(d), 2)
+                self.assertEqual(st.match_ids(), {"KR_1", "KR_2", "KR_3"})
+
+
+class ModelTests(unittest.TestCase):
+    def test_match_decoding_and_teammates(self):
+        from riotkit.models import Match, load_matches
+        m = make_match("EUW1_1", [f"P{i}" for i in range(10)], champions=[f"C{i % 2}" for i in range(10)])
+        m["info"]["teams"] = [{"teamId": 100, "win": True, "bans": [{"championId": 7, "pickTurn": 1}], "objectives": {"dragon": {"kills": 3}}}, {"teamId": 200, "bans": None}]
+        m["info"]["participants"][0]["challenges"] = {"killParticipation": 0.5}
+        match = Match.from_api(m)
+        self.assertEqual((match.match_id, match.queue_id, match.patch, match.game_duration), ("EUW1_1", 420, "15.20", 1800))
+        p = match.participants[0]
+        self.assertEqual((p.puuid, p.team_id, p.win, p.kills, p.cs, p.kill_participation), ("P0", 100, True, 0, 154, 0.5))
+        self.assertIsNone(match.participants[1].kill_participation)
+        self.assertEqual([t.puuid for t in match.teammates("P0")], ["P1", "P2", "P3", "P4"])
+        self.assertEqual(match.teammates("nobody"), [])
+        self.assertEqual((match.teams[0].bans, match.teams[0].dragons, match.teams[1].bans, match.teams[1].win), ((7,), 3, (), False))
+        self.assertIs(match.participants[2].champion_name, Match.from_api(m).participants[4].champion_name)
+        with self.assertRaises(AttributeError):
+            p.extra = 1
+        self.assertEqual(match.to_dict()["participants"][0]["gold_earned"], 1000)
+        with tempfile.TemporaryDirectory() as d:
+            write_record(os.path.join(d, "match_EUW1_1"), m, "gzip")
+            self.assertEqual(load_matches(d), [match])
+
+    def test_timeline_decoding(self):
+        from riotkit.models import Timeline
+        t = Timeline.from_api(make_timeline())
+        self.assertEqual((t.match_id, len(t.frames), t.puuids[9]), ("KR_1", 3, "P10"))
+        f = t.frames[2]
+        self.assertEqual([pf.participant_id for pf in f.participants], list(range(1, 11)))
+        self.assertEqual((f.participants[4].total_gold, f.participants[0].y), (510, -1))
+        kill = f.events[1]
+        self.assertEqual((kill.type, kill.actor, kill.victim_id, kill.assisting, kill.x, kill.bounty), ("CHAMPION_KILL", 3, 7, (1, 4), 10, 300))
+        self.assertEqual((f.events[0].actor, f.events[0].item_id), (2, 1055))
+
+
+class AggregateTests(unittest.TestCase):
+    def test_streaming_aggregates(self):
+        agg = StatsAggregator().add_matches(iter([
+            make_match("KR_1", ["A", "B"], champions=["Ahri", "Zed"]),
+            make_match("KR_2", ["A", "C"], champions=["Zed", "Ahri"]),
+        ]))
+        r = agg.result()
+        self.assertEqual(agg.matches, 2)
+        self.assertEqual(r["player_stats"]["A"]["matches_played"], 2)
+        self.assertEqual(r["player_stats"]["A"]["total_gold"], 2000)
+        self.assertEqual(sorted(r["player_stats"]["A"]["champions_played"]), ["Ahri", "Zed"])
+        self.assertEqual(r["champion_stats"]["Zed"], {"times_played": 2, "total_kills": 1, "total_deaths": 2, "total_assists": 4})
+        self.assertEqual([m["matchId"] for m in r["match_analysis"]], ["KR_1", "KR_2"])
+        self.assertEqual(StatsAggregator(keep_match_rows=False).add_matches([make_match("KR_1", ["A"])]).result()["match_analysis"], [])
+
+    def test_iterate_files_and_store(self):
+        with tempfile.TemporaryDirectory() as d:
+            write_record(os.path.join(d, "match_KR_1"), make_match("KR_1", ["A"]), "json")
+            write_record(os.path.join(d, "match_KR_2"), make_match("KR_2", ["A"]), "gzip")
+            write_record(os.path.join(d, "timeline_KR_1"), {}, "json")
+            self.assertEqual([m["metadata"]["matchId"] for m in iter_match_files(d)], ["KR_1", "KR_2"])
+            with MatchStore(os.path.join(d, "m.sqlite")) as st:
+                st.import_dir(d)
+                self.assertEqual(StatsAggregator().add_matches(iter_store_matches(st)).matches, 2)
+
+
+class CrawlerTests(unittest.TestCase):
+    GRAPH = {
+        "A": ["KR_1", "KR_2"],
+        "B": ["KR_3"],
+        "C": [],
+        "E": ["KR_4"],
+    }
+    MATCHES = {
+        "KR_1": make_match("KR_1", ["A", "B", "C"]),
+        "KR_2": make_match("KR_2", ["A", "D"], queue_id=450),
+        "KR_3": make_match("KR_3", ["B", "E"]),
+        "KR_4": make_match("KR_4", ["E", "F"]),
+    }
+
+    def crawl(self, d, **cfg):
+        with patch("riotkit.crawler.match_ids_by_puuid", side_effect=lambda c, p, s, n, queue=None: self.GRAPH.get(p, [])[:n]), \
+             patch("riotkit.crawler.match_by_id", side_effect=lambda c, m: self.MATCHES[m]) as mock_match:
+            with MatchStore(os.path.join(d, "m.sqlite")) as st:
+                cr = Crawler(None, st, Frontier(os.path.join(d, "f.sqlite")), CrawlConfig(workers=2, **cfg))
+                cr.seed(["A"])
+                out = cr.run()
+                cr.frontier.close()
+                return out, st.match_ids(), mock_match.call_count
+
+    def test_hops_queue_filter_and_resume(self):
+        with tempfile.TemporaryDirectory() as d:
+            out, stored, calls = self.crawl(d, max_hops=1, queues=(420,))
+            self.assertEqual(stored, {"KR_1", "KR_3"})
+            self.assertEqual((out["matches"], out["filtered"], out["players"]), (3, 1, 3))
+            self.assertEqual(out["frontier"]["players"], {"done": 3})
+            out, _, calls = self.crawl(d, max_hops=1, queues=(420,))
+            self.assertEqual((out["matches"], calls), (0, 0))
+
+    def test_fanout_budget_and_priority(self):
+        with tempfile.TemporaryDirectory() as d:
+            out, stored, _ = self.crawl(d, max_hops=3, fanout=1, max_matches=1)
+            self.assertEqual(stored, {"KR_2"})
+            f = Frontier(os.path.join(d, "f.sqlite"))
+            self.assertEqual([m for m, _, _ in f.next_matches(5)], ["KR_1"])
+            self.assertEqual(len(f.next_players(5)), 1)
+            f.add_matches([("KR_9", 0, 9), ("KR_10", 0, 10), ("KR_11", 1, 11)])
+            self.assertEqual([m for m, _, _ in f.next_matches(3)], ["KR_10", "KR_9", "KR_1"])
+            f.close()
+
+    def test_seed_priority_and_player_score_pick_the_budgeted_matches(self):
+        graph = {"LO": ["KR_51", "KR_50"], "HI": ["KR_5"], "X": ["KR_8"], "Y": ["KR_7"]}
+        matches = {m: make_match(m, ps) for m, ps in
+                   {"KR_5": ["HI", "X"], "KR_50": ["LO"], "KR_51": ["LO", "Y"], "KR_7": ["Y"], "KR_8": ["X"]}.items()}
+        with patch("riotkit.crawler.match_ids_by_puuid", side_effect=lambda c, p, s, n, queue=None: graph[p]), \
+             patch("riotkit.crawler.match_by_id", side_effect=lambda c, m: matches[m]) as mock_match, \
+             tempfile.TemporaryDirectory() as d, MatchStore(os.path.join(d, "m.sqlite")) as st:
+            score = lambda m, p: 100.0 if p["puuid"] == "Y" else 0.0
+            cr = Crawler(None, st, Frontier(os.path.join(d, "f.sqlite")), CrawlConfig(workers=1, max_hops=1, max_matches=4, player_score=score))
+            cr.seed(["LO"])
+            cr.seed(["HI"], priority=10)
+            cr.run()
+            cr.frontier.close()
+        # HI's old match before LO's newer ones; in hop 1, Y (met by LO, score 100) before X (met by HI)
+        self.assertEqual([c.args[1] for c in mock_match.call_args_list], ["KR_5", "KR_51", "KR_50", "KR_7"])
+
+    def test_failed_listing_marks_the_player_failed(self):
+        def listing(c, p, s, n, queue=None):
+            if p == "B":
+                raise RiotError("max retries")
+            return self.GRAPH.get(p, [])[:n]
+
+        with patch("riotkit.crawler.match_ids_by_puuid", side_effect=listing), \
+             patch("riotkit.crawler.match_by_id", side_effect=lambda c, m: self.MATCHES[m]), \
+             tempfile.TemporaryDirectory() as d, MatchStore(os.path.join(d, "m.sqlite")) as st:
+            cr = Crawler(None, st, Frontier(os.path.join(d, "f.sqlite")), CrawlConfig(workers=2, max_hops=1))
+            cr.seed(["A"])
+            out = cr.run()
+            cr.frontier.close()
+        self.assertEqual(out["frontier"]["players"], {"done": 3, "failed": 1})
+        self.assertEqual((out["players"], out["errors"]), (3, 1))
+
+
+class CorpusTests(unittest.TestCase):
+    def test_process_pool_matches_sequential_for_files_and_segments(self):
+        from riotkit.corpus import load_corpus, participant_rows, to_match
+        from riotkit.segments import pack_dir
+        with tempfile.TemporaryDirectory() as d:
+            files = RecordStore(os.path.join(d, "files"), "match", "gzip")
+            matches = [make_match(f"KR_{i}", [f"P{i}", f"P{i + 1}"]) for i in range(7)]
+            for m in matches:
+                files.save(m["metadata"]["matchId"], m)
+            pack_dir(files.root, os.path.join(d, "seg"), segment_size=4000)
+            for src in (files.root, os.path.join(d, "seg")):
+                self.assertEqual(list(load_corpus(src, workers=1)), matches)
+                self.assertEqual(list(load_corpus(src, workers=2, chunk=2)), matches)
+                rows = [r for rs in load_corpus(src, "match", participant_rows, workers=2, chunk=3) for r in rs]
+                self.assertEqual([r[0] for r in rows[:4]], ["KR_0", "KR_0", "KR_1", "KR_1"])
+            got = list(load_corpus(files.root, "match", to_match, workers=2))
+            self.assertEqual([m.match_id for m in got], [f"KR_{i}" for i in range(7)])
+            self.assertEqual(list(load_corpus(files.root, "timeline")), [])
+
+
+@unittest.skipIf(analytics is None, "pandas not installed")
+class AnalyticsTests(unittest.TestCase):
+    def matches(self):
+        return [
+            make_match("KR_1", ["A", "B"], champions=["Ahri", "Zed"]),
+            make_match("KR_2", ["A", "C"], queue_id=450, version="15.19.1.1", champions=["Zed", "Ahri"]),
+            make_match("KR_3", ["", "C"], champions=["Lux", "Ahri"]),
+        ]
+
+    def test_load_frame_matches_flatten(self):
+        with tempfile.TemporaryDirectory() as d:
+            store = RecordStore(d, "match", "json")
+            for m in self.matches():
+                store.save(m["metadata"]["matchId"], m)
+            self.assertTrue(analytics.load_frame(d, workers=2).equals(analytics.flatten(self.matches())))
+
+    def test_matches_streaming_aggregator(self):
+        expected = StatsAggregator().add_matches(self.matches()).result()
+        got = analytics.complete_analysis(analytics.flatten(self.matches()))
+        norm = lambda d: {k: dict(v, champions_played=sorted(v["champions_played"])) for k, v in d.items()}
+        self.assertEqual(norm(got["player_stats"]), norm(expected["player_stats"]))
+        self.assertEqual(got["champion_stats"], expected["champion_stats"])
+        self.assertEqual(got["match_analysis"], expected["match_analysis"])
+        json.dumps(got)
+
+    def test_breakdowns_and_store_frame(self):
+        df = analytics.flatten(self.matches())
+        got = analytics.complete_analysis(df, keep_match_rows=False)
+        self.assertEqual(got["match_analysis"], [])
+        self.assertEqual(got["by_queue"]["450"]["games"], 2)
+        self.assertEqual(got["by_patch"]["15.20"]["games"], 4)
+        self.assertEqual(got["by_position"]["MIDDLE"]["win_rate"], 1.0)
+        with tempfile.TemporaryDirectory() as d, MatchStore(os.path.join(d, "m.sqlite")) as st:
+            st.add_matches(self.matches())
+            sf = analytics.store_frame(st)
+        self.assertEqual(list(sf.columns), list(analytics.COLUMNS))
+        self.assertEqual(analytics.complete_analysis(sf)["match_analysis"], analytics.match_rows(df))
+
+
+class BridgeStub(StubRiotServer):
+    """Accounts, match lists (honouring startTime), matches and timelines of a small player graph."""
+
+    def __init__(self, games, missing=()):
+        super().__init__()
+        self.games = games  # match ID -> (gameCreation in seconds, puuids)
+        self.missing = set(missing)
+        self.listings = []
+
+    def respond(self, host, path, query=None):
+        with self.lock:
+            self.requests.append((host, path))
+        parts = path.strip("/").split("/")
+        if path.startswith("/riot/account/v1/accounts/by-riot-id/"):
+            return 200, {"puuid": parts[-2].upper()}, None
+        if path.endswith("/ids"):
+            with self.lock:
+                self.listings.append((parts[-2], query.get("startTime")))
+            since = int(query.get("startTime", 0))
+            ids = sorted((m for m, (t, ps) in self.games.items() if parts[-2] in ps and t >= since), key=lambda m: -self.games[m][0])
+            return 200, ids[:int(query["count"])], None
+        if path.endswith("/timeline"):
+            return 200, make_timeline(), None
+        if parts[-1] in self.missing:
+            return 404, {}, None
+        return 200, make_match(parts[-1], self.games[parts[-1]][1]), None
+
+
+class BridgeTests(unittest.TestCase):
+    """fetcher_bridge.KRAnalysis against a BridgeStub, in a scratch analysis_data/."""
+
+    @classmethod
+    def setUpClass(cls):
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+        cls.bridge = importlib.import_module("fetcher_bridge")
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def run_bridge(self, server, workers=2, db_path="", **kw):
+        with patch.dict(os.environ, {"RIOT_API_KEY": "RGAPI-test"}):
+            a = self.bridge.KRAnalysis("Me#KR", match_depth=5, workers=workers, db_path=db_path, **kw)
+        a.client = RiotClient("RGAPI-test", "kr", "asia", base_url=server.base_url)
+        a.run_analysis()
+        return a
+
+    def read(self, *path):
+        with open(os.path.join("analysis_data", *path), encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_incremental_listing_resume_and_manifest(self):
+        old = int(time.time()) - 10 * 86400
+        games = {"KR_1": (old, ["ME", "T1"]), "KR_2": (old + 1, ["ME", "T2"]), "KR_3": (old, ["T1", "X"]),
+                 "KR_4": (old, ["T2", "Y"]), "KR_5": (old, ["T2"])}
+        with BridgeStub(games, missing={"KR_5"}) as server:
+            self.run_bridge(server)
+            self.assertTrue(all(since is None for _, since in server.listings))
+        manifest = self.read("crawl_manifest.json")["players"]
+        self.assertEqual(set(manifest), {"ME", "T1"})  # KR_5 failed: T2 is listed in full again next run
+        self.assertEqual(self.read("analysis", "complete_analysis.json")["summary"]["total_matches"], 4)
+
+        os.remove(os.path.join("analysis_data", "timelines", "timeline_KR_2.json.gz"))
+        games["KR_6"] = (int(time.time()), ["ME", "T2"])
+        with BridgeStub(games) as server:
+            self.run_bridge(server, incremental=True)
+            listings = dict(server.listings)
+            fetched = [p.split("/")[5:] for _, p in server.requests if p.startswith("/lol/match/v5/matches/KR_")]
+        self.assertEqual(listings["ME"], str(manifest["ME"] - 3600))
+        self.assertIsNone(listings["T2"])
+        self.assertEqual({p[0] for p in fetched if len(p) == 1}, {"KR_5", "KR_6"})
+        # KR_2 is resumed: saved match, missing timeline
+        self.assertEqual({p[0] for p in fetched if len(p) == 2}, {"KR_2", "KR_5", "KR_6"})
+        self.assertEqual(self.read("analysis", "complete_analysis.json")["summary"]["total_matches"], 6)
+        manifest2 = self.read("crawl_manifest.json")["players"]
+        self.assertEqual(set(manifest2), {"ME", "T1", "T2"})
+        self.assertEqual(manifest2["T1"], manifest["T1"])
+
+    def test_run_closes_the_writer_and_the_store(self):
+        import sqlite3
+        games = {"KR_1": (int(time.time()), ["ME", "T1"])}
+        with BridgeStub(games) as server:
+            a = self.run_bridge(server, db_path="matches.sqlite")
+        self.assertFalse(a.writer.thread.is_alive())
+        with self.assertRaises(sqlite3.ProgrammingError):
+            a.store.match_ids()
+        with MatchStore("matches.sqlite") as st:
+            self.assertEqual(st.match_ids(), {"KR_1"})
+        a.close()
+
+    def test_no_match_rows_reaches_the_live_aggregator(self):
+        games = {"KR_1": (int(time.time()), ["ME", "T1"])}
+        with BridgeStub(games) as server:
+            a = self.run_bridge(server, keep_match_rows=False)
+        analysis = self.read("analysis", "complete_analysis.json")
+        self.assertEqual((analysis["summary"]["total_matches"], analysis["match_analysis"]), (1, []))
+        self.assertEqual(a.aggregator.match_analysis, [])
+
+    def test_from_disk_stream_engine_projects_in_workers(self):
+        from riotkit.aggregate import AGGREGATED
+        matches = [make_match(f"KR_{i}", ["A", "B", f"P{i}"], champions=["Ahri", "Zed", "Lux"]) for i in range(5)]
+        store = RecordStore(os.path.join("analysis_data", "matches"), "match", "json")
+        for m in matches:
+            store.save(m["metadata"]["matchId"], m)
+        expected = StatsAggregator().add_matches(matches).result()
+        self.assertEqual(StatsAggregator().add_matches(AGGREGATED(m) for m in matches).result(), expected)
+        got = self.bridge.analyze_saved_matches("analysis_data", workers=2)
+        self.assertEqual(got["summary"]["total_matches"], 5)
+        self.assertEqual({k: got[k] for k in expected}, expected)
+
+    def test_failed_write_keeps_match_and_player_out_of_the_manifest(self):
+        old = int(time.time()) - 10 * 86400
+        games = {"KR_1": (old, ["ME", "T1"]), "KR_2": (old + 1, ["ME", "T2"]), "KR_3": (old, ["T1"]), "KR_4": (old, ["T2"])}
+        os.makedirs(os.path.join("analysis_data", "matches", "match_KR_4.json"))  # the rename onto it fails
+        with BridgeStub(games) as server:
+            a = self.run_bridge(server)
+        self.assertEqual(a.downloaded_matches, {"KR_1", "KR_2", "KR_3"})
+        self.assertEqual(a.downloaded_timelines, {"KR_1", "KR_2", "KR_3", "KR_4"})
+        self.assertEqual(a.writer.stats["errors"], 1)
+        self.assertEqual(set(self.read("crawl_manifest.json")["players"]), {"ME", "T1"})
+
+    def test_overlapping_teammates_download_each_match_once(self):
+        now = int(time.time())
+        team = ["ME", "T1", "T2", "T3", "T4"]
+        # every teammate lists the same shared games while the player's own games are still downloading
+        games = {f"KR_{i}": (now - i, team) for i in range(1, 4)}
+        games.update({f"KR_{i}": (now - i, team[1:]) for i in range(10, 12)})
+        with BridgeStub(games) as server:
+            respond = server.respond
+
+            def slow(host, path, query=None):
+                time.sleep(0.01)
+                return respond(host, path, query)
+
+            server.respond = slow
+            a = self.run_bridge(server, workers=8)
+            fetched = Counter(p.split("/", 5)[5] for _, p in server.requests if p.startswith("/lol/match/v5/matches/KR_"))
+        self.assertEqual(len(server.listings), 5)
+        self.assertEqual(set(fetched), {m for m in games} | {m + "/timeline" for m in games})
+        self.assertEqual(set(fetched.values()), {1})
+        self.assertEqual(a.downloaded_matches, set(games))
+        self.assertEqual(self.read("analysis", "complete_analysis.json")["summary"]["total_matches"], 5)